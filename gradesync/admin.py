@@ -6,9 +6,17 @@ from .forms import UserAdminForm
 from .models import (
     Batch,
     BatchAdmin,
+    BatchSemesterMetrics,
+    BatchSemesterMetricsAdmin,
     Department,
+    DepartmentSemesterMetrics,
+    DepartmentSemesterMetricsAdmin,
     Score,
     ScoreAdmin,
+    ScrapeJob,
+    ScrapeJobAdmin,
+    ScrapeResultCache,
+    ScrapeResultCacheAdmin,
     Section,
     SectionAdmin,
     Semester,
@@ -135,3 +143,7 @@ admin.site.register(Score, ScoreAdmin)
 admin.site.register(StudentPerformance, StudentPerformanceAdmin)
 admin.site.register(SubjectMetrics, SubjectMetricsAdmin)
 admin.site.register(SemesterMetrics, SemesterMetricsAdmin)
+admin.site.register(BatchSemesterMetrics, BatchSemesterMetricsAdmin)
+admin.site.register(DepartmentSemesterMetrics, DepartmentSemesterMetricsAdmin)
+admin.site.register(ScrapeResultCache, ScrapeResultCacheAdmin)
+admin.site.register(ScrapeJob, ScrapeJobAdmin)
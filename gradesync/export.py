@@ -0,0 +1,156 @@
+"""
+Streaming bulk export of scores as CSV, Parquet or Arrow IPC.
+
+Rows are read from a values() iterator and encoded a chunk at a time, every
+chunk is sent as soon as it is written, so an export of the whole department
+holds one chunk in memory instead of the table, its model instances and a JSON
+document.
+"""
+
+import csv
+import io
+import itertools
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+# {column: values() lookup}
+SCORE_COLUMNS = {
+    "usn": "student__usn",
+    "section": "student__section__section_name",
+    "semester": "semester__semester_number",
+    "sub_code": "subject__sub_code",
+    "credits": "subject__credits",
+    "internal": "internal",
+    "external": "external",
+    "total": "total",
+    "grade": "grade",
+}
+SCORE_SCHEMA = pa.schema(
+    [
+        ("usn", pa.string()),
+        ("section", pa.string()),
+        ("semester", pa.int32()),
+        ("sub_code", pa.string()),
+        ("credits", pa.int32()),
+        ("internal", pa.int32()),
+        ("external", pa.int32()),
+        ("total", pa.int32()),
+        ("grade", pa.string()),
+    ]
+)
+
+
+class ExportRenderer(BaseRenderer):
+    """
+    Negotiates an export format (?format= or Accept), the export itself is
+    streamed by the view. Only error responses go through render(), they are
+    sent as JSON.
+    """
+
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = "application/json"
+        return JSONRenderer().render(data)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class ParquetRenderer(ExportRenderer):
+    media_type = "application/vnd.apache.parquet"
+    format = "parquet"
+
+
+class ArrowRenderer(ExportRenderer):
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+
+
+class ChunkSink(io.RawIOBase):
+    """A write-only file whose written bytes are taken out after every chunk."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def row_chunks(queryset, columns, size):
+    """Lists of value tuples, `size` rows at a time."""
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=size)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+def _record_batch(chunk, schema):
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array(column, type=field.type)
+            for column, field in zip(zip(*chunk), schema)
+        ],
+        schema=schema,
+    )
+
+
+def csv_stream(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def parquet_stream(chunks, schema):
+    """One row group per chunk."""
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(_record_batch(chunk, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def arrow_stream(chunks, schema):
+    """The Arrow IPC stream format, one record batch per chunk."""
+    sink = ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(_record_batch(chunk, schema))
+            yield sink.take()
+    yield sink.take()
+
+
+def score_export_stream(queryset, file_format):
+    """The encoded chunks of `queryset`'s scores in `file_format`."""
+    chunks = row_chunks(queryset, SCORE_COLUMNS, settings.EXPORT_CHUNK_SIZE)
+    if file_format == "parquet":
+        return parquet_stream(chunks, SCORE_SCHEMA)
+    if file_format == "arrow":
+        return arrow_stream(chunks, SCORE_SCHEMA)
+    return csv_stream(chunks, list(SCORE_COLUMNS))
@@ -0,0 +1,113 @@
+"""
+Sparse fieldsets: `?fields=` picks the columns of a list, `?expand=` nests
+related objects, and the queryset only loads what the serializer will read.
+
+`?fields=id,total` keeps these fields of every row. `?expand=subject` renders a
+related object with its summary serializer instead of its id, among the
+serializer's `expandable_fields`. An empty `?expand=` turns off the expansions a
+serializer makes by default (`default_expand`).
+
+The view then narrows its queryset to the model columns behind the remaining
+fields with only(), and joins the expanded relations with select_related().
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _split(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _field_paths(serializer, prefix=""):
+    """
+    The only() and select_related() paths of a serializer's fields.
+
+    None if a field reads anything but model columns and forward relations
+    (a method, a property, a reverse relation), only() can't be derived then.
+    """
+    model = serializer.Meta.model
+    only, related = [], []
+    for field in serializer.fields.values():
+        if field.source == "*" or isinstance(field, serializers.ListSerializer):
+            return None
+        current, path = model, prefix
+        *relations, name = field.source.split(".")
+        try:
+            for relation in relations:
+                model_field = current._meta.get_field(relation)
+                if not (model_field.many_to_one or model_field.one_to_one):
+                    return None
+                path += relation
+                only.append(path)
+                related.append(path)
+                current, path = model_field.related_model, path + "__"
+            model_field = current._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+
+        only.append(path + name)
+        if isinstance(field, serializers.BaseSerializer):
+            nested = _field_paths(field, f"{path}{name}__")
+            if nested is None:
+                return None
+            related.append(path + name)
+            only += nested[0]
+            related += nested[1]
+    return only, related
+
+
+class SparseFieldsMixin:
+    """
+    Serializer side, takes `fields` and `expand` (lists of names, None for the
+    defaults) as keyword arguments.
+    """
+
+    # {field: serializer class rendering the related object}
+    expandable_fields = {}
+    default_expand = ()
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.default_expand if expand is None else expand
+        for name in expand:
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def optimize_queryset(cls, queryset, fields=None, expand=None):
+        """Load only the columns and relations the serializer reads."""
+        paths = _field_paths(cls(fields=fields, expand=expand))
+        if paths is None:
+            return queryset
+        only, related = paths
+        return queryset.select_related(None).select_related(*related).only(*only)
+
+
+class SparseFieldsViewMixin:
+    """View side, passes `?fields=` and `?expand=` of GET requests on."""
+
+    def sparse_fields(self):
+        request = getattr(self, "request", None)
+        if request is None or request.method != "GET":
+            return None, None
+        params = request.query_params
+        fields = _split(params["fields"]) if "fields" in params else None
+        expand = _split(params["expand"]) if "expand" in params else None
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs["fields"], kwargs["expand"] = self.sparse_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self.sparse_fields()
+        if fields is None and expand is None:
+            return queryset
+        return self.get_serializer_class().optimize_queryset(queryset, fields, expand)
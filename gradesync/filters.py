@@ -2,6 +2,8 @@ import django_filters
 
 from gradesync.models import (
     Batch,
+    BatchSemesterMetrics,
+    DepartmentSemesterMetrics,
     Score,
     Section,
     Semester,
@@ -122,3 +124,33 @@ class SemesterMetricsFilter(django_filters.FilterSet):
             "fail_3_subs": ["exact", "lt", "gt"],
             "fail_greater_3_subs": ["exact", "lt", "gt"],
         }
+
+
+class BatchSemesterMetricsFilter(django_filters.FilterSet):
+    class Meta:
+        model = BatchSemesterMetrics
+        fields = {
+            "batch": ["exact"],
+            "batch__dept": ["exact"],
+            "semester": ["exact"],
+            "semester__semester_number": ["exact"],
+            "num_students": ["exact", "lt", "gt"],
+            "avg_sgpa": ["exact", "lt", "gt"],
+            "total_backlogs": ["exact", "lt", "gt"],
+            "pass_percentage": ["exact", "lt", "gt"],
+            "fail_percentage": ["exact", "lt", "gt"],
+        }
+
+
+class DepartmentSemesterMetricsFilter(django_filters.FilterSet):
+    class Meta:
+        model = DepartmentSemesterMetrics
+        fields = {
+            "department": ["exact"],
+            "semester_number": ["exact", "lt", "gt"],
+            "num_students": ["exact", "lt", "gt"],
+            "avg_sgpa": ["exact", "lt", "gt"],
+            "total_backlogs": ["exact", "lt", "gt"],
+            "pass_percentage": ["exact", "lt", "gt"],
+            "fail_percentage": ["exact", "lt", "gt"],
+        }
@@ -0,0 +1,233 @@
+"""
+Apply an edited score to the metrics as an old -> new delta.
+
+A teacher correcting one mark changes a handful of counters: the grade bucket
+of the subject, the totals, maybe a backlog. Those are shifted in place with F()
+expressions, which costs a fixed number of queries whatever the size of the
+section. Anything a delta can't express (a new or moved score, a change of the
+highest score, missing rows) falls back to the full recompute of
+gradesync.metrics.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from utils.response_cache import invalidate, score_tags
+
+from .metrics import is_deferred, mark_dirty, mark_score_dirty
+from .models import (
+    SemesterMetrics,
+    Student,
+    StudentPerformance,
+    Subject,
+    SubjectMetrics,
+    grade_point,
+)
+
+GRADE_COUNTS = {
+    "FCD": "fcd_count",
+    "FC": "fc_count",
+    "SC": "sc_count",
+    "F": "fail_count",
+    "A": "absent_count",
+}
+BACKLOG_GRADES = ("F", "A")
+FAIL_BUCKETS = ["pass_count", "fail_1_sub", "fail_2_subs", "fail_3_subs"]
+
+
+def _fail_bucket(fails):
+    return FAIL_BUCKETS[fails] if fails < len(FAIL_BUCKETS) else "fail_greater_3_subs"
+
+
+def _percent(count, total):
+    return round(count / total * 100, 2)
+
+
+class ScoreDelta:
+    """The old and new side of an edited score."""
+
+    def __init__(self, score):
+        old = score.loaded_values
+        self.score = score
+        self.old_total, self.new_total = old["total"], score.total
+        self.old_grade, self.new_grade = old["grade"], score.grade
+        self.total = self.new_total - self.old_total
+        self.backlogs = (self.new_grade in BACKLOG_GRADES) - (
+            self.old_grade in BACKLOG_GRADES
+        )
+
+    def counts(self):
+        """`{count_field: change}` of the subject's grade buckets."""
+        counts = {}
+        for grade, change in ((self.old_grade, -1), (self.new_grade, 1)):
+            if grade in GRADE_COUNTS:
+                field = GRADE_COUNTS[grade]
+                counts[field] = counts.get(field, 0) + change
+        return {field: change for field, change in counts.items() if change}
+
+
+def _is_delta(score):
+    """Whether a saved score can be applied as a delta."""
+    old = getattr(score, "loaded_values", None)
+    if settings.METRICS_MODE != "incremental" or old is None or is_deferred():
+        return False
+    return all(
+        old[name] == getattr(score, name)
+        for name in ("student_id", "semester_id", "subject_id")
+    )
+
+
+def _apply_performance(delta, credits):
+    """
+    Shift the student's semester performance and cgpa.
+
+    Returns the performance as it was before the edit and the change of its
+    sgpa, or None if it has to be recomputed.
+    """
+    score = delta.score
+    performance = (
+        StudentPerformance.objects.select_for_update()
+        .select_related("semester", "student")
+        .filter(student=score.student_id, semester=score.semester_id)
+        .first()
+    )
+    if performance is None or performance.credits <= 0:
+        return None
+
+    points = (grade_point(delta.new_total) - grade_point(delta.old_total)) * credits
+    total = performance.total + delta.total
+    num_backlogs = performance.num_backlogs + delta.backlogs
+    sgpa = StudentPerformance._sgpa(
+        performance.credit_points + points, performance.credits
+    )
+    StudentPerformance.objects.filter(pk=performance.pk).update(
+        total=F("total") + delta.total,
+        credit_points=F("credit_points") + points,
+        num_backlogs=F("num_backlogs") + delta.backlogs,
+        sgpa=sgpa,
+        percentage=StudentPerformance._percentage(
+            total, performance.semester.num_subjects
+        ),
+    )
+
+    # cgpa is the mean sgpa of the student's semesters, num_backlogs counts the
+    # semesters with a backlog
+    semesters = StudentPerformance.objects.filter(student=score.student_id).count()
+    flip = (num_backlogs > 0) - (performance.num_backlogs > 0)
+    Student.objects.filter(pk=score.student_id).update(
+        cgpa=F("cgpa") + (sgpa - performance.sgpa) / semesters,
+        num_backlogs=F("num_backlogs") + flip,
+    )
+    return performance, sgpa - performance.sgpa
+
+
+def _apply_subject_metrics(delta, section_id):
+    score = delta.score
+    key = (score.subject_id, score.semester_id, section_id)
+    metrics = (
+        SubjectMetrics.objects.select_for_update()
+        .select_related("section")
+        .filter(
+            subject=score.subject_id, semester=score.semester_id, section=section_id
+        )
+        .first()
+    )
+    total_students = metrics.section.num_students if metrics else 0
+    if total_students <= 0:
+        mark_dirty("subject_metrics", *key)
+        return
+
+    # the highest score only moves up by a delta, a drop or tie of the top
+    # score needs the other students' scores
+    highest = {}
+    if delta.new_total > metrics.highest_score:
+        highest = {
+            "highest_score": delta.new_total,
+            "highest_scorer_id": score.student_id,
+        }
+    elif delta.total and (
+        delta.old_total >= metrics.highest_score
+        or delta.new_total == metrics.highest_score
+    ):
+        mark_dirty("subject_metrics", *key)
+        return
+
+    counts = delta.counts()
+    for field, change in counts.items():
+        setattr(metrics, field, getattr(metrics, field) + change)
+    passed = metrics.fcd_count + metrics.fc_count + metrics.sc_count
+    SubjectMetrics.objects.filter(pk=metrics.pk).update(
+        total_score=F("total_score") + delta.total,
+        num_backlogs=F("num_backlogs") + delta.backlogs,
+        avg_score=round((metrics.total_score + delta.total) / total_students, 2),
+        pass_percentage=_percent(passed, total_students),
+        fail_percentage=_percent(metrics.fail_count, total_students),
+        absent_percentage=_percent(metrics.absent_count, total_students),
+        **{field: F(field) + change for field, change in counts.items()},
+        **highest,
+    )
+
+
+def _apply_semester_metrics(delta, performance, sgpa_change, section_id):
+    """Move the student between the pass / fail buckets and shift the sgpa sum."""
+    score = delta.score
+    if not performance.student.active:
+        return
+    metrics = (
+        SemesterMetrics.objects.select_for_update()
+        .filter(semester=score.semester_id, section=section_id)
+        .first()
+    )
+    total_students = metrics.pass_count + metrics.total_backlogs if metrics else 0
+    if total_students <= 0:
+        mark_dirty("semester_metrics", score.semester_id, section_id)
+        return
+
+    counts = {}
+    old_bucket = _fail_bucket(performance.num_backlogs)
+    new_bucket = _fail_bucket(performance.num_backlogs + delta.backlogs)
+    if old_bucket != new_bucket:
+        counts = {old_bucket: -1, new_bucket: 1}
+    flip = (new_bucket != "pass_count") - (old_bucket != "pass_count")
+    pass_count = metrics.pass_count + counts.get("pass_count", 0)
+
+    SemesterMetrics.objects.filter(pk=metrics.pk).update(
+        total_sgpa=F("total_sgpa") + sgpa_change,
+        total_backlogs=F("total_backlogs") + flip,
+        avg_sgpa=round((metrics.total_sgpa + sgpa_change) / total_students, 2),
+        pass_percentage=_percent(pass_count, total_students),
+        fail_percentage=_percent(total_students - pass_count, total_students),
+        **{field: F(field) + change for field, change in counts.items()},
+    )
+    mark_dirty("batch_rollup", score.semester_id)
+
+
+def apply_score_change(score):
+    """
+    Apply an edited score to every metric it feeds, or mark them dirty.
+
+    Called after the score was saved. Returns whether it was applied as a delta.
+    """
+    if not _is_delta(score):
+        mark_score_dirty(score)
+        return False
+
+    delta = ScoreDelta(score)
+    if not delta.total and delta.old_grade == delta.new_grade:
+        return True
+
+    with transaction.atomic():
+        credits = Subject.objects.values_list("credits", flat=True).get(
+            pk=score.subject_id
+        )
+        applied = _apply_performance(delta, credits)
+        if applied is None:
+            mark_score_dirty(score)
+            return False
+        performance, sgpa_change = applied
+        section_id = performance.student.section_id
+        _apply_subject_metrics(delta, section_id)
+        _apply_semester_metrics(delta, performance, sgpa_change, section_id)
+        invalidate(score_tags([section_id], score.semester_id, [score.student_id]))
+    return True
@@ -0,0 +1,170 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gradesync.models import (
+    Batch,
+    Department,
+    Score,
+    Section,
+    Semester,
+    SemesterMetrics,
+    Student,
+    StudentPerformance,
+    Subject,
+    SubjectMetrics,
+    User,
+)
+from utils.scraper_drf import calculate_grade
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Time the hot score and metrics lookups on a generated dataset and print
+    their query plans. The dataset is created in a transaction that is rolled
+    back. Run it before and after a migration to compare, e.g.
+    `manage.py migrate gradesync 0010` then `manage.py migrate`.
+    """
+
+    help = "Benchmark the hot lookups on a generated dataset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scores", type=int, default=50000)
+        parser.add_argument("--subjects", type=int, default=8)
+        parser.add_argument("--sections", type=int, default=10)
+        parser.add_argument(
+            "--repeat", type=int, default=50, help="Runs of every lookup"
+        )
+        parser.add_argument(
+            "--no-plans", action="store_true", help="Only print the timings"
+        )
+
+    def seed(self, num_scores, num_subjects, num_sections):
+        department = Department.objects.create(dept_name="Benchmark")
+        batch = Batch.objects.create(
+            dept=department,
+            batch_name="Benchmark",
+            batch_start_year=2021,
+            batch_end_year=2025,
+        )
+        semester = Semester.objects.create(batch=batch, semester_number=5)
+        sections = Section.objects.bulk_create(
+            Section(batch=batch, section_name=chr(ord("A") + index))
+            for index in range(num_sections)
+        )
+        subjects = Subject.objects.bulk_create(
+            Subject(
+                semester=semester,
+                sub_name=f"Subject {index}",
+                sub_code=f"21BM{index:02}",
+                credits=4,
+            )
+            for index in range(num_subjects)
+        )
+        num_students = num_scores // num_subjects
+        users = User.objects.bulk_create(
+            User(username=f"1BM21CS{index:05}", password="!")
+            for index in range(num_students)
+        )
+        students = Student.objects.bulk_create(
+            Student(
+                user=user,
+                batch=batch,
+                section=sections[index % num_sections],
+                semester=semester,
+                usn=user.username,
+            )
+            for index, user in enumerate(users)
+        )
+        Score.objects.bulk_create(
+            (
+                self.score(student, semester, subject, (index * 7 + offset * 13) % 101)
+                for index, student in enumerate(students)
+                for offset, subject in enumerate(subjects)
+            ),
+            batch_size=5000,
+        )
+        return semester, sections, subjects[-1], students[len(students) // 2]
+
+    def score(self, student, semester, subject, total):
+        # graded like scraped marks: FCD, FC or SC when passed, F when failed
+        result = "P" if total >= 40 else "F"
+        return Score(
+            student=student,
+            semester=semester,
+            subject=subject,
+            internal=0,
+            external=total,
+            total=total,
+            grade=calculate_grade(total, result),
+        )
+
+    def recompute_metrics(self, semester, sections):
+        for section in sections:
+            StudentPerformance.calculate_section(semester, section)
+            SubjectMetrics.calculate_section_metrics(semester, section)
+        SemesterMetrics.calculate_semester_metrics(semester)
+
+    def lookups(self, semester, section, subject, student):
+        return {
+            "Score by (student, semester)": lambda: Score.objects.filter(
+                student=student, semester=semester
+            ),
+            "Score by (subject, semester, section)": lambda: Score.objects.filter(
+                subject=subject, semester=semester, student__section=section
+            ),
+            "Score by semester and section": lambda: Score.objects.filter(
+                semester=semester, student__section=section
+            ),
+            "StudentPerformance by (student, semester)": lambda: (
+                StudentPerformance.objects.filter(student=student, semester=semester)
+            ),
+            "SubjectMetrics by (subject, semester, section)": lambda: (
+                SubjectMetrics.objects.filter(
+                    subject=subject, semester=semester, section=section
+                )
+            ),
+            "SemesterMetrics by (semester, section)": lambda: (
+                SemesterMetrics.objects.filter(semester=semester, section=section)
+            ),
+            "Student by usn": lambda: Student.objects.filter(usn=student.usn),
+        }
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                semester, sections, subject, student = self.seed(
+                    options["scores"], options["subjects"], options["sections"]
+                )
+                self.stdout.write(
+                    f"Seeded {Score.objects.count()} scores "
+                    f"in {time.perf_counter() - start:.2f}s"
+                )
+                start = time.perf_counter()
+                self.recompute_metrics(semester, sections)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Section metrics recompute: {time.perf_counter() - start:.2f}s"
+                    )
+                )
+
+                lookups = self.lookups(semester, sections[-1], subject, student)
+                for label, lookup in lookups.items():
+                    start = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        list(lookup())
+                    elapsed = (time.perf_counter() - start) / options["repeat"]
+                    self.stdout.write(
+                        self.style.SUCCESS(f"{label}: {elapsed * 1000:.3f}ms")
+                    )
+                    if not options["no_plans"]:
+                        self.stdout.write(lookup().explain())
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utils.result_cache import purge_expired
+
+
+class Command(BaseCommand):
+    """
+    Delete the cached scrape results older than SCRAPE_CACHE_TTL.
+    Scrape jobs purge them when they complete, this is for cron or after
+    lowering the TTL.
+    """
+
+    help = "Delete expired cached scrape results"
+
+    def handle(self, *args, **options):
+        deleted, _ = purge_expired()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} cached results older than "
+                f"{settings.SCRAPE_CACHE_TTL}s"
+            )
+        )
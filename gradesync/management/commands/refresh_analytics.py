@@ -0,0 +1,103 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gradesync.models import (
+    BatchSemesterMetrics,
+    Department,
+    DepartmentSemesterMetrics,
+    Section,
+    Semester,
+    SemesterMetrics,
+    Student,
+    StudentPerformance,
+    SubjectMetrics,
+)
+from utils.response_cache import invalidate, score_tags
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the analytics tables from the scores.
+    Sections: student performances, cgpa/backlogs, subject and semester metrics.
+    Batches and departments: rollups of the sections' semester metrics.
+    Every step is a handful of bulk queries per section or semester, meant to
+    run once after a scrape instead of per saved row.
+    """
+
+    help = "Rebuild section, batch and department metrics"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch", type=int, action="append", help="Only refresh these batch ids"
+        )
+        parser.add_argument(
+            "--semester",
+            type=int,
+            action="append",
+            help="Only refresh these semester ids",
+        )
+        parser.add_argument(
+            "--rollups-only",
+            action="store_true",
+            help="Keep the section metrics, only rebuild the batch and department rollups",
+        )
+
+    def timed(self, label, func, *args):
+        start = time.perf_counter()
+        with transaction.atomic():
+            rows = func(*args)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label}: {rows} rows in {elapsed:.2f}s")
+        return rows
+
+    def refresh_sections(self, semesters):
+        rows = 0
+        for semester in semesters:
+            sections = list(Section.objects.filter(batch=semester.batch_id))
+            for section in sections:
+                rows += len(StudentPerformance.calculate_section(semester, section))
+                rows += len(SubjectMetrics.calculate_section_metrics(semester, section))
+            students = Student.objects.filter(section__in=sections)
+            rows += Student.bulk_rollup(students)
+            rows += len(SemesterMetrics.calculate_semester_metrics(semester))
+            invalidate(
+                score_tags(
+                    section_ids=[section.pk for section in sections],
+                    semester_id=semester.pk,
+                    student_ids=students.values_list("pk", flat=True),
+                )
+            )
+        return rows
+
+    def handle(self, *args, **options):
+        semesters = Semester.objects.all()
+        if options["batch"]:
+            semesters = semesters.filter(batch__in=options["batch"])
+        if options["semester"]:
+            semesters = semesters.filter(pk__in=options["semester"])
+        semesters = list(semesters.select_related("batch").order_by("pk"))
+        if not semesters:
+            self.stdout.write("No semesters to refresh")
+            return
+
+        start = time.perf_counter()
+        if not options["rollups_only"]:
+            self.timed("Sections", self.refresh_sections, semesters)
+        self.timed("Batches", lambda: len(BatchSemesterMetrics.refresh(semesters)))
+        departments = Department.objects.filter(
+            pk__in={semester.batch.dept_id for semester in semesters}
+        )
+        self.timed(
+            "Departments",
+            lambda: len(DepartmentSemesterMetrics.refresh(departments)),
+        )
+        for semester in semesters:
+            invalidate(score_tags(semester_id=semester.pk))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed analytics of {len(semesters)} semesters "
+                f"in {time.perf_counter() - start:.2f}s"
+            )
+        )
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gradesync.models import ScrapeJob
+from gradesync.tasks import run_scrape_job, start_scrape_job
+from utils.scraper_drf import resumable_scrape_jobs
+
+
+class Command(BaseCommand):
+    """
+    Resume scrape jobs left unfinished by a crash or deploy.
+    Only students that weren't scraped yet are scraped again.
+    """
+
+    help = "Resume interrupted scrape jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-minutes",
+            type=int,
+            default=settings.SCRAPE_JOB_STALE_AFTER // 60,
+            help="Minutes without progress before a job counts as interrupted",
+        )
+        parser.add_argument(
+            "--job", type=int, action="append", help="Only resume these job ids"
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Resume jobs even if they made progress recently",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help="Scrape in this process instead of queueing the jobs",
+        )
+
+    def handle(self, *args, **options):
+        if options["force"]:
+            jobs = ScrapeJob.objects.filter(
+                status__in=[ScrapeJob.PENDING, ScrapeJob.RUNNING, ScrapeJob.FAILED]
+            )
+        else:
+            jobs = resumable_scrape_jobs(options["stale_minutes"] * 60)
+        if options["job"]:
+            jobs = jobs.filter(pk__in=options["job"])
+
+        job_ids = list(jobs.values_list("pk", flat=True))
+        if not job_ids:
+            self.stdout.write("No scrape jobs to resume")
+            return
+
+        # threads die with this command, so only a task queue can outlive it
+        sync = options["sync"] or settings.TASK_BACKEND != "django_q"
+        for job_id in job_ids:
+            if not sync:
+                start_scrape_job(ScrapeJob.objects.get(pk=job_id))
+                self.stdout.write(f"Queued scrape job {job_id}")
+                continue
+
+            self.stdout.write(f"Resuming scrape job {job_id}")
+            job = run_scrape_job(job_id)
+            style = (
+                self.style.SUCCESS
+                if job.status == ScrapeJob.COMPLETED
+                else self.style.ERROR
+            )
+            self.stdout.write(style(f"Scrape job {job_id}: {job.status}"))
@@ -0,0 +1,228 @@
+"""
+Deferred, coalesced recomputation of the derived fields and metric tables.
+
+Signals only record which rows went stale (the "dirty set"). Every stale row is
+recomputed once when the surrounding transaction commits, or right away in
+autocommit mode, so editing every score of a section no longer recomputes the
+section's metrics after each single save. With METRICS_FLUSH = "queue" the dirty
+set is handed to the task queue instead of being recomputed in the request.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from utils.on_commit import OnCommitOnce
+from utils.response_cache import ALL, invalidate, score_tags
+
+from .models import (
+    Batch,
+    BatchSemesterMetrics,
+    Department,
+    DepartmentSemesterMetrics,
+    Score,
+    Section,
+    Semester,
+    SemesterMetrics,
+    Student,
+    StudentPerformance,
+    SubjectMetrics,
+)
+
+
+def _section_count(section_id):
+    section = Section.objects.filter(pk=section_id).first()
+    if section:
+        section.count_num_students()
+
+
+def _batch_count(batch_id):
+    batch = Batch.objects.filter(pk=batch_id).first()
+    if batch:
+        batch.count_num_students()
+
+
+def _performance(student_id, semester_id):
+    if Student.objects.filter(pk=student_id).exists():
+        performance, _ = StudentPerformance.objects.get_or_create(
+            student_id=student_id, semester_id=semester_id
+        )
+        performance.calculate_all()
+
+
+def _student(student_id):
+    Student.bulk_rollup(Student.objects.filter(pk=student_id))
+
+
+def _subject_metrics(subject_id, semester_id, section_id):
+    if Section.objects.filter(pk=section_id).exists():
+        metrics, _ = SubjectMetrics.objects.get_or_create(
+            subject_id=subject_id, semester_id=semester_id, section_id=section_id
+        )
+        metrics.calculate_metrics()
+
+
+def _semester_metrics(semester_id, section_id):
+    if Section.objects.filter(pk=section_id).exists():
+        metrics, _ = SemesterMetrics.objects.get_or_create(
+            semester_id=semester_id, section_id=section_id
+        )
+        metrics.calculate_metrics()
+    mark_dirty("batch_rollup", semester_id)
+
+
+def _batch_rollup(semester_id):
+    semesters = Semester.objects.filter(pk=semester_id)
+    BatchSemesterMetrics.refresh(semesters)
+    invalidate(score_tags(semester_id=semester_id))
+    for department_id in semesters.values_list("batch__dept", flat=True):
+        mark_dirty("department_rollup", department_id)
+
+
+def _department_rollup(department_id):
+    DepartmentSemesterMetrics.refresh(Department.objects.filter(pk=department_id))
+    invalidate([ALL])
+
+
+# recomputed in this order, later kinds read the fields of the earlier ones
+RECOMPUTE = {
+    "section_count": _section_count,
+    "batch_count": _batch_count,
+    "performance": _performance,
+    "student": _student,
+    "subject_metrics": _subject_metrics,
+    "semester_metrics": _semester_metrics,
+    "batch_rollup": _batch_rollup,
+    "department_rollup": _department_rollup,
+}
+
+_state = threading.local()
+
+
+def _dirty():
+    if not hasattr(_state, "dirty"):
+        _state.dirty = {kind: set() for kind in RECOMPUTE}
+        # (student_id, semester_id, subject_id) of scores whose section is unknown
+        _state.scores = set()
+        # sections of students being deleted, their scores are flushed after
+        _state.sections = {}
+        _state.deferred = 0
+        _state.flushing = False
+    return _state.dirty
+
+
+def _mark_sections(dirty, scores, sections):
+    for student_id, semester_id, subject_id in scores:
+        section_id = sections.get(student_id)
+        if section_id is not None:
+            dirty["subject_metrics"].add((subject_id, semester_id, section_id))
+            dirty["semester_metrics"].add((semester_id, section_id))
+
+
+def _resolve_scores(dirty):
+    """Mark the section metrics of the dirty scores, one query for their sections."""
+    scores, _state.scores = _state.scores, set()
+    sections, _state.sections = _state.sections, {}
+    if not scores:
+        return
+    missing = {student_id for student_id, _, _ in scores} - set(sections)
+    if missing:
+        sections.update(
+            Student.objects.filter(pk__in=missing).values_list("pk", "section_id")
+        )
+    _mark_sections(dirty, scores, sections)
+
+
+def _take():
+    dirty = _dirty()
+    _resolve_scores(dirty)
+    keys = {kind: list(dirty[kind]) for kind in RECOMPUTE if dirty[kind]}
+    for kind in RECOMPUTE:
+        dirty[kind] = set()
+    return keys
+
+
+def mark_dirty(kind, *key):
+    """Record a stale row, e.g. `mark_dirty("semester_metrics", semester_id, section_id)`."""
+    _dirty()[kind].add(key)
+    if not (_state.flushing or _state.deferred):
+        _flush_on_commit.schedule()
+
+
+def mark_score_dirty(score):
+    """
+    Mark the rows a saved or deleted score feeds stale.
+
+    The section metrics need the student's section, unless the student is
+    loaded already it is looked up for every dirty score at once when flushing.
+    """
+    key = (score.student_id, score.semester_id, score.subject_id)
+    if Score.student.is_cached(score):
+        _mark_sections(_dirty(), [key], {score.student_id: score.student.section_id})
+    else:
+        _dirty()
+        _state.scores.add(key)
+    mark_dirty("performance", score.student_id, score.semester_id)
+
+
+def remember_section(student):
+    """Keep the section of a student being deleted for its scores' flush."""
+    _dirty()
+    _state.sections[student.pk] = student.section_id
+
+
+def is_deferred():
+    """Whether the current thread is inside a `deferred_metrics()` block."""
+    _dirty()
+    return bool(_state.deferred)
+
+
+@contextmanager
+def deferred_metrics():
+    """Hold every recomputation until the block exits, even in autocommit mode."""
+    _dirty()
+    _state.deferred += 1
+    try:
+        yield
+    finally:
+        _state.deferred -= 1
+    if not _state.deferred and not _state.flushing and any(_dirty().values()):
+        _flush_on_commit.schedule()
+
+
+def flush():
+    """Recompute every dirty row, or queue them with METRICS_FLUSH = "queue"."""
+    keys = _take()
+    if not keys:
+        return
+    if settings.METRICS_FLUSH == "queue":
+        from .tasks import dispatch, recompute_dirty_task
+
+        dispatch(recompute_dirty_task, keys)
+    else:
+        recompute(keys)
+
+
+_flush_on_commit = OnCommitOnce(flush)
+
+
+def recompute(keys):
+    """
+    Recompute `{kind: [key, ...]}` once per key.
+
+    Saves made while recomputing mark rows of later kinds dirty again (e.g. a
+    StudentPerformance marks its student), those are drained in the same pass.
+    """
+    _dirty()
+    _state.flushing = True
+    try:
+        while keys:
+            for kind, recompute_row in RECOMPUTE.items():
+                pending = set(map(tuple, keys.get(kind, ()))) | _dirty()[kind]
+                _dirty()[kind] = set()
+                for key in pending:
+                    recompute_row(*key)
+            keys = _take()
+    finally:
+        _state.flushing = False
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gradesync", "0005_rename_sem_number_semester_semester_number_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScrapeResultCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("usn", models.CharField(max_length=10)),
+                ("result_url", models.URLField()),
+                ("payload", models.JSONField()),
+                ("content_hash", models.CharField(max_length=64)),
+                ("fetched_at", models.DateTimeField()),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("usn", "result_url"), name="unique_scrape_cache_usn_url"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gradesync", "0007_scrapejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scrapejob",
+            name="attempts",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:13
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+GRADE_POINTS = Case(
+    When(total__gte=90, then=Value(10)),
+    When(total__gte=80, then=Value(9)),
+    When(total__gte=70, then=Value(8)),
+    When(total__gte=60, then=Value(7)),
+    When(total__gte=50, then=Value(6)),
+    When(total__gte=40, then=Value(5)),
+    default=Value(0),
+)
+
+
+def _sum(queryset, group, expression, output_field=None):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group)
+            .annotate(value=Sum(expression))
+            .values("value")
+        ),
+        0,
+        output_field=output_field or models.IntegerField(),
+    )
+
+
+def backfill_partial_sums(apps, schema_editor):
+    Score = apps.get_model("gradesync", "Score")
+    StudentPerformance = apps.get_model("gradesync", "StudentPerformance")
+    SubjectMetrics = apps.get_model("gradesync", "SubjectMetrics")
+    SemesterMetrics = apps.get_model("gradesync", "SemesterMetrics")
+
+    scores = Score.objects.filter(
+        student=OuterRef("student"), semester=OuterRef("semester")
+    )
+    StudentPerformance.objects.update(
+        credits=_sum(scores, "student", "subject__credits"),
+        credit_points=_sum(scores, "student", GRADE_POINTS * F("subject__credits")),
+    )
+    SubjectMetrics.objects.update(
+        total_score=_sum(
+            Score.objects.filter(
+                subject=OuterRef("subject"),
+                semester=OuterRef("semester"),
+                student__section=OuterRef("section"),
+            ),
+            "subject",
+            "total",
+        )
+    )
+    SemesterMetrics.objects.update(
+        total_sgpa=_sum(
+            StudentPerformance.objects.filter(
+                semester=OuterRef("semester"),
+                student__section=OuterRef("section"),
+                student__active=True,
+            ),
+            "semester",
+            "sgpa",
+            output_field=models.FloatField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gradesync", "0008_scrapejob_attempts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="semestermetrics",
+            name="total_sgpa",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name="studentperformance",
+            name="credit_points",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="studentperformance",
+            name="credits",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="subjectmetrics",
+            name="total_score",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_partial_sums, migrations.RunPython.noop),
+    ]
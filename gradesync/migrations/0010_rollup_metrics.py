@@ -0,0 +1,123 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gradesync", "0009_metric_partial_sums"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BatchSemesterMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("num_sections", models.IntegerField(default=0)),
+                ("num_students", models.IntegerField(default=0)),
+                ("total_sgpa", models.FloatField(default=0.0)),
+                (
+                    "avg_sgpa",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=4),
+                ),
+                ("total_backlogs", models.IntegerField(default=0)),
+                (
+                    "pass_percentage",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                (
+                    "fail_percentage",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                ("pass_count", models.IntegerField(default=0)),
+                ("fail_1_sub", models.IntegerField(default=0)),
+                ("fail_2_subs", models.IntegerField(default=0)),
+                ("fail_3_subs", models.IntegerField(default=0)),
+                ("fail_greater_3_subs", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradesync.batch",
+                    ),
+                ),
+                (
+                    "semester",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradesync.semester",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("semester",), name="unique_batch_semester_metrics"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DepartmentSemesterMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("num_sections", models.IntegerField(default=0)),
+                ("num_students", models.IntegerField(default=0)),
+                ("total_sgpa", models.FloatField(default=0.0)),
+                (
+                    "avg_sgpa",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=4),
+                ),
+                ("total_backlogs", models.IntegerField(default=0)),
+                (
+                    "pass_percentage",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                (
+                    "fail_percentage",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                ("pass_count", models.IntegerField(default=0)),
+                ("fail_1_sub", models.IntegerField(default=0)),
+                ("fail_2_subs", models.IntegerField(default=0)),
+                ("fail_3_subs", models.IntegerField(default=0)),
+                ("fail_greater_3_subs", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("semester_number", models.IntegerField()),
+                (
+                    "department",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="gradesync.department",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("department", "semester_number"),
+                        name="unique_department_semester_metrics",
+                    )
+                ],
+            },
+        ),
+    ]
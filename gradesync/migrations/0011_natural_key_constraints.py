@@ -0,0 +1,83 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:24
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+# model: natural key the new unique constraint is on
+NATURAL_KEYS = {
+    "Score": ["student", "semester", "subject"],
+    "StudentPerformance": ["student", "semester"],
+    "SubjectMetrics": ["subject", "semester", "section"],
+    "SemesterMetrics": ["semester", "section"],
+}
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep the newest row of every natural key, the metrics are recomputed anyway."""
+    for model_name, fields in NATURAL_KEYS.items():
+        model = apps.get_model("gradesync", model_name)
+        duplicates = (
+            model.objects.order_by()
+            .values(*fields)
+            .annotate(rows=Count("pk"), newest=Max("pk"))
+            .filter(rows__gt=1)
+        )
+        for duplicate in duplicates:
+            newest = duplicate.pop("newest")
+            duplicate.pop("rows")
+            model.objects.filter(**duplicate).exclude(pk=newest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("gradesync", "0010_rollup_metrics"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="student",
+            name="usn",
+            field=models.CharField(
+                db_index=True, default="-", max_length=10, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="score",
+            index=models.Index(
+                fields=["subject", "semester"], name="score_subject_semester_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="score",
+            index=models.Index(
+                fields=["semester", "student"], name="score_semester_student_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="score",
+            constraint=models.UniqueConstraint(
+                fields=("student", "semester", "subject"),
+                name="unique_score_student_semester_subject",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="semestermetrics",
+            constraint=models.UniqueConstraint(
+                fields=("semester", "section"), name="unique_semester_metrics"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="studentperformance",
+            constraint=models.UniqueConstraint(
+                fields=("student", "semester"), name="unique_student_performance"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="subjectmetrics",
+            constraint=models.UniqueConstraint(
+                fields=("subject", "semester", "section"), name="unique_subject_metrics"
+            ),
+        ),
+    ]
@@ -1,7 +1,38 @@
 from django.contrib import admin
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.db.models import Avg, Prefetch, Sum
+from django.db.models import (
+    Avg,
+    Case,
+    Count,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+# VTU grade points of a subject total, weighted by the subject's credits in the SGPA
+GRADE_POINT_CUTOFFS = [(90, 10), (80, 9), (70, 8), (60, 7), (50, 6), (40, 5)]
+GRADE_POINTS = Case(
+    *[
+        When(total__gte=cutoff, then=Value(point))
+        for cutoff, point in GRADE_POINT_CUTOFFS
+    ],
+    default=Value(0),
+)
+
+
+def grade_point(total):
+    """Python twin of GRADE_POINTS for a single total."""
+    for cutoff, point in GRADE_POINT_CUTOFFS:
+        if total >= cutoff:
+            return point
+    return 0
 
 
 class Department(models.Model):
@@ -51,6 +82,12 @@ class BatchAdmin(admin.ModelAdmin):
         "batch_start_year",
         "batch_end_year",
     )
+    actions = ["rollup_students"]
+
+    @admin.action(description="Recompute CGPA and backlogs of the students")
+    def rollup_students(self, request, queryset):
+        count = Student.bulk_rollup(Student.objects.filter(batch__in=queryset))
+        self.message_user(request, f"Recomputed CGPA and backlogs of {count} students.")
 
 
 class Section(models.Model):
@@ -117,7 +154,7 @@ class Student(models.Model):
     semester = models.ForeignKey(
         Semester, on_delete=models.CASCADE
     )  # to indicate the current semester of the student
-    usn = models.CharField(max_length=10, default="-", null=True)
+    usn = models.CharField(max_length=10, default="-", null=True, db_index=True)
     cgpa = models.FloatField(default=0.0)
     active = models.BooleanField(default=True)
     num_backlogs = models.IntegerField(default=0)
@@ -125,6 +162,33 @@ class Student(models.Model):
     def __str__(self):
         return self.user.username
 
+    @classmethod
+    def bulk_rollup(cls, students=None):
+        """
+        Recompute `cgpa` and `num_backlogs` of many students at once.
+
+        One aggregate query over their StudentPerformance rows and one
+        bulk_update, instead of two queries and two saves per student.
+        `students` is a queryset, e.g. `Student.objects.filter(batch=batch)`,
+        and defaults to every student.
+        """
+        students = list(
+            (cls.objects.all() if students is None else students)
+            .order_by()
+            .annotate(
+                avg_sgpa=Avg("studentperformance__sgpa"),
+                backlog_semesters=Count(
+                    "studentperformance",
+                    filter=Q(studentperformance__num_backlogs__gt=0),
+                ),
+            )
+        )
+        for student in students:
+            student.cgpa = student.avg_sgpa or 0.0
+            student.num_backlogs = student.backlog_semesters
+        cls.objects.bulk_update(students, ["cgpa", "num_backlogs"], batch_size=500)
+        return len(students)
+
     def calculate_cgpa(self):
         cgpa = StudentPerformance.objects.filter(student=self).aggregate(
             average=Avg("sgpa")
@@ -152,6 +216,12 @@ class StudentAdmin(admin.ModelAdmin):
         "active",
         "num_backlogs",
     )
+    actions = ["rollup_students"]
+
+    @admin.action(description="Recompute CGPA and backlogs")
+    def rollup_students(self, request, queryset):
+        count = Student.bulk_rollup(queryset)
+        self.message_user(request, f"Recomputed CGPA and backlogs of {count} students.")
 
 
 # Faculty model is not yet implemented. I'm unsure if it is needed or not.
@@ -168,6 +238,26 @@ class Score(models.Model):
     total = models.IntegerField()
     grade = models.CharField(max_length=3)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "semester", "subject"],
+                name="unique_score_student_semester_subject",
+            )
+        ]
+        indexes = [
+            # (student, semester) lookups use the unique constraint's index
+            models.Index(
+                fields=["subject", "semester"], name="score_subject_semester_idx"
+            ),
+            models.Index(
+                fields=["semester", "student"], name="score_semester_student_idx"
+            ),
+        ]
+
+    # fields whose previous value is needed to apply a score edit as a delta
+    TRACKED_FIELDS = ["student_id", "semester_id", "subject_id", "total", "grade"]
+
     def __str__(self):
         return (
             self.student.user.username
@@ -177,6 +267,21 @@ class Score(models.Model):
             + self.subject.sub_name
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_values()
+        return instance
+
+    def remember_values(self):
+        """Snapshot the tracked fields, they are the "old" side of the next save."""
+        # a score loaded with only() has no snapshot, reading the deferred
+        # fields would cost a query per row, its next save is recomputed
+        if self.get_deferred_fields() & set(self.TRACKED_FIELDS):
+            self.loaded_values = None
+            return
+        self.loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
 
 class ScoreAdmin(admin.ModelAdmin):
     list_display = (
@@ -200,6 +305,7 @@ class SubjectMetrics(models.Model):
     pass_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     fail_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     absent_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    total_score = models.IntegerField(default=0)  # partial sum behind avg_score
     fcd_count = models.IntegerField(default=0)
     fc_count = models.IntegerField(default=0)
     sc_count = models.IntegerField(default=0)
@@ -214,6 +320,13 @@ class SubjectMetrics(models.Model):
         related_name="highest_scorer",
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["subject", "semester", "section"], name="unique_subject_metrics"
+            )
+        ]
+
     def __str__(self):
         return (
             self.section.section_name
@@ -223,122 +336,120 @@ class SubjectMetrics(models.Model):
             + str(self.semester.semester_number)
         )
 
-    def _calculate_counts(self, scores):
-        (
-            total_score,
-            num_backlogs,
-            fcd_count,
-            fc_count,
-            sc_count,
-            fail_count,
-            absent_count,
-            highest_score,
-        ) = (0, 0, 0, 0, 0, 0, 0, 0)
-        highest_scorer = None
-
-        for score in scores:
-            total_score += score.total
-            if score.total > highest_score:
-                highest_score = score.total
-                highest_scorer = score.student
-
-            grade = score.grade
-            if grade == "FCD":
-                fcd_count += 1
-            elif grade == "FC":
-                fc_count += 1
-            elif grade == "SC":
-                sc_count += 1
-            elif grade == "F":
-                fail_count += 1
-                num_backlogs += 1
-            elif grade == "A":
-                absent_count += 1
-                num_backlogs += 1
+    METRIC_FIELDS = [
+        "avg_score",
+        "total_score",
+        "num_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+        "absent_percentage",
+        "fcd_count",
+        "fc_count",
+        "sc_count",
+        "fail_count",
+        "absent_count",
+        "highest_score",
+        "highest_scorer",
+    ]
 
-        return (
-            total_score,
-            num_backlogs,
-            fcd_count,
-            fc_count,
-            sc_count,
-            fail_count,
-            absent_count,
-            highest_score,
-            highest_scorer,
-        )
+    @staticmethod
+    def _aggregate_scores(semester_id, section_id, subject_id=None):
+        """
+        Count grades, sum totals and find the top scorer per subject in one query.
 
-    def _update_metrics(
-        self,
-        total_students,
-        total_score,
-        num_backlogs,
-        fcd_count,
-        fc_count,
-        sc_count,
-        fail_count,
-        absent_count,
-        highest_score,
-        highest_scorer,
-    ):
-        self.num_backlogs = num_backlogs
-        self.avg_score = (
-            round(total_score / total_students, 2) if total_students > 0 else 0
+        Returns `{subject_id: counts}`. The top scorer is the first student (by
+        score id) with the highest non zero total.
+        """
+        scores = Score.objects.filter(
+            semester_id=semester_id, student__section_id=section_id
         )
-        self.pass_percentage = (
-            round((fcd_count + fc_count + sc_count) / total_students * 100, 2)
-            if total_students > 0
-            else 0
+        if subject_id is not None:
+            scores = scores.filter(subject_id=subject_id)
+        top_scorer = (
+            scores.filter(subject=OuterRef("subject"), total__gt=0)
+            .order_by("-total", "pk")
+            .values("student")[:1]
         )
-        self.fail_percentage = (
-            round(fail_count / total_students * 100, 2) if total_students > 0 else 0
+        rows = (
+            scores.order_by()
+            .values("subject")
+            .annotate(
+                total_score=Sum("total"),
+                highest_score=Max("total"),
+                fcd_count=Count("pk", filter=Q(grade="FCD")),
+                fc_count=Count("pk", filter=Q(grade="FC")),
+                sc_count=Count("pk", filter=Q(grade="SC")),
+                fail_count=Count("pk", filter=Q(grade="F")),
+                absent_count=Count("pk", filter=Q(grade="A")),
+                highest_scorer=Subquery(top_scorer),
+            )
         )
-        self.absent_percentage = (
-            round(absent_count / total_students * 100, 2) if total_students > 0 else 0
+        return {row.pop("subject"): row for row in rows}
+
+    def _set_metrics(self, total_students, counts):
+        total_score = counts.get("total_score") or 0
+        fcd_count = counts.get("fcd_count", 0)
+        fc_count = counts.get("fc_count", 0)
+        sc_count = counts.get("sc_count", 0)
+        fail_count = counts.get("fail_count", 0)
+        absent_count = counts.get("absent_count", 0)
+
+        self.num_backlogs = fail_count + absent_count
+        self.total_score = total_score
+        self.avg_score = round(total_score / total_students, 2)
+        self.pass_percentage = round(
+            (fcd_count + fc_count + sc_count) / total_students * 100, 2
         )
+        self.fail_percentage = round(fail_count / total_students * 100, 2)
+        self.absent_percentage = round(absent_count / total_students * 100, 2)
         self.fcd_count = fcd_count
         self.fc_count = fc_count
         self.sc_count = sc_count
         self.fail_count = fail_count
         self.absent_count = absent_count
-        self.highest_score = highest_score
-        self.highest_scorer = highest_scorer
-
-        self.save()
+        self.highest_scorer_id = counts.get("highest_scorer")
+        self.highest_score = counts.get("highest_score") or 0
 
     def calculate_metrics(self):
-        scores = Score.objects.filter(
-            subject=self.subject, semester=self.semester, student__section=self.section
-        )
-
         total_students = self.section.num_students
         if total_students == 0:
             return
 
-        (
-            total_score,
-            num_backlogs,
-            fcd_count,
-            fc_count,
-            sc_count,
-            fail_count,
-            absent_count,
-            highest_score,
-            highest_scorer,
-        ) = self._calculate_counts(scores=scores)
-
-        self._update_metrics(
-            total_students=total_students,
-            total_score=total_score,
-            num_backlogs=num_backlogs,
-            fcd_count=fcd_count,
-            fc_count=fc_count,
-            sc_count=sc_count,
-            fail_count=fail_count,
-            absent_count=absent_count,
-            highest_score=highest_score,
-            highest_scorer=highest_scorer,
+        counts = self._aggregate_scores(
+            self.semester_id, self.section_id, subject_id=self.subject_id
+        )
+        self._set_metrics(total_students, counts.get(self.subject_id, {}))
+        self.save()
+
+    @classmethod
+    def calculate_section_metrics(cls, semester, section):
+        """
+        Create or recompute the metrics of every subject of a (semester, section).
+
+        Uses a single GROUP BY pass over the section's scores, then writes the
+        rows with one bulk_create and one bulk_update.
+        """
+        subject_ids = list(
+            Subject.objects.filter(semester=semester).values_list("pk", flat=True)
         )
+        existing = list(cls.objects.filter(semester=semester, section=section))
+        covered = {metrics.subject_id for metrics in existing}
+        missing = [
+            cls(subject_id=subject_id, semester=semester, section=section)
+            for subject_id in subject_ids
+            if subject_id not in covered
+        ]
+
+        total_students = section.num_students
+        if total_students > 0:
+            counts = cls._aggregate_scores(semester.pk, section.pk)
+            for metrics in existing + missing:
+                metrics._set_metrics(total_students, counts.get(metrics.subject_id, {}))
+
+        cls.objects.bulk_create(missing)
+        if total_students > 0 and existing:
+            cls.objects.bulk_update(existing, cls.METRIC_FIELDS)
+        return existing + missing
 
 
 class SubjectMetricsAdmin(admin.ModelAdmin):
@@ -383,144 +494,121 @@ class SemesterMetrics(models.Model):
     fail_greater_3_subs = models.IntegerField(
         default=0
     )  # students with more than 3 backlogs
+    total_sgpa = models.FloatField(default=0.0)  # partial sum behind avg_sgpa
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["semester", "section"], name="unique_semester_metrics"
+            )
+        ]
 
     def __str__(self):
         return f"{self.semester.semester_number}" + " - " + self.section.section_name
 
-    def _calculate_fails(self, scores):
-        """Calculate the number of failed subjects for a given set of scores."""
-        fail_count = 0
-        for score in scores:
-            if score.grade in ["F", "A"]:
-                fail_count += 1
-        return fail_count
-
-    def _calculate_counts(
-        self,
-        fail_count,
-        pass_count,
-        total_backlogs,
-        fail_1_sub,
-        fail_2_subs,
-        fail_3_subs,
-        fail_greater_3_subs,
-    ):
-        """Update counts based on the number of failed subjects."""
-        if fail_count == 0:
-            pass_count += 1
-        else:
-            total_backlogs += 1
-            if fail_count == 1:
-                fail_1_sub += 1
-            elif fail_count == 2:
-                fail_2_subs += 1
-            elif fail_count == 3:
-                fail_3_subs += 1
-            else:
-                fail_greater_3_subs += 1
-
-        return (
-            pass_count,
-            total_backlogs,
-            fail_1_sub,
-            fail_2_subs,
-            fail_3_subs,
-            fail_greater_3_subs,
+    METRIC_FIELDS = [
+        "avg_sgpa",
+        "total_sgpa",
+        "total_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+        "pass_count",
+        "fail_1_sub",
+        "fail_2_subs",
+        "fail_3_subs",
+        "fail_greater_3_subs",
+    ]
+
+    @staticmethod
+    def _student_rows(semester, students):
+        """Annotate students with their sgpa and failed (F or A) subjects of the semester."""
+        fails = (
+            Score.objects.filter(
+                student=OuterRef("pk"), semester=semester, grade__in=["F", "A"]
+            )
+            .order_by()
+            .values("student")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        sgpa = StudentPerformance.objects.filter(
+            student=OuterRef("pk"), semester=semester
+        ).values("sgpa")[:1]
+        return students.filter(active=True).annotate(
+            fails=Coalesce(Subquery(fails), 0),
+            sgpa=Coalesce(Subquery(sgpa), 0.0),
         )
 
-    def _update_metrics(
-        self,
-        total_students,
-        total_sgpa,
-        pass_count,
-        total_backlogs,
-        fail_1_sub,
-        fail_2_subs,
-        fail_3_subs,
-        fail_greater_3_subs,
-    ):
+    @staticmethod
+    def _aggregates():
+        return {
+            "total_students": Count("pk"),
+            "total_sgpa": Sum("sgpa"),
+            "pass_count": Count("pk", filter=Q(fails=0)),
+            "fail_1_sub": Count("pk", filter=Q(fails=1)),
+            "fail_2_subs": Count("pk", filter=Q(fails=2)),
+            "fail_3_subs": Count("pk", filter=Q(fails=3)),
+            "fail_greater_3_subs": Count("pk", filter=Q(fails__gt=3)),
+        }
+
+    def _set_metrics(self, counts):
         """Update the metrics for the semester performance."""
-        self.avg_sgpa = (
-            round(total_sgpa / total_students, 2) if total_students > 0 else 0
-        )
-        self.pass_percentage = (
-            round(pass_count / total_students * 100, 2) if total_students > 0 else 0
-        )
-        self.fail_percentage = (
-            round(total_backlogs / total_students * 100, 2) if total_students > 0 else 0
-        )
+        total_students = counts["total_students"]
+        pass_count = counts["pass_count"]
+        total_backlogs = total_students - pass_count
+
+        self.total_sgpa = counts["total_sgpa"]
+        self.avg_sgpa = round(counts["total_sgpa"] / total_students, 2)
+        self.pass_percentage = round(pass_count / total_students * 100, 2)
+        self.fail_percentage = round(total_backlogs / total_students * 100, 2)
         self.pass_count = pass_count
         self.total_backlogs = total_backlogs
-        self.fail_1_sub = fail_1_sub
-        self.fail_2_subs = fail_2_subs
-        self.fail_3_subs = fail_3_subs
-        self.fail_greater_3_subs = fail_greater_3_subs
-
-        self.save()
+        self.fail_1_sub = counts["fail_1_sub"]
+        self.fail_2_subs = counts["fail_2_subs"]
+        self.fail_3_subs = counts["fail_3_subs"]
+        self.fail_greater_3_subs = counts["fail_greater_3_subs"]
 
     def calculate_metrics(self):
         """Main function to calculate metrics for a given section and semester."""
-        students = Student.objects.filter(section=self.section, active=True)
-        total_students = students.count()
-
-        if total_students == 0:
-            return
-
-        # Prefetch scores for the given semester for all students
-        scores = Score.objects.filter(semester=self.semester)
-        students = students.prefetch_related(
-            Prefetch("score_set", queryset=scores, to_attr="cached_scores")
+        students = Student.objects.filter(section=self.section_id)
+        counts = self._student_rows(self.semester_id, students).aggregate(
+            **self._aggregates()
         )
+        if counts["total_students"] == 0:
+            return
 
-        (
-            total_sgpa,
-            pass_count,
-            total_backlogs,
-            fail_1_sub,
-            fail_2_subs,
-            fail_3_subs,
-            fail_greater_3_subs,
-        ) = (0, 0, 0, 0, 0, 0, 0)
+        self._set_metrics(counts)
+        self.save()
 
-        for student in students:
-            # Use prefetched scores instead of querying the database again
-            student_scores = student.cached_scores
+    @classmethod
+    def calculate_semester_metrics(cls, semester):
+        """
+        Create or recompute the metrics of every section of a semester's batch.
 
-            fail_count = self._calculate_fails(student_scores)
+        All sections are aggregated together in one GROUP BY section query.
+        """
+        students = Student.objects.filter(section__batch=semester.batch_id)
+        rows = (
+            cls._student_rows(semester, students)
+            .order_by()
+            .values("section")
+            .annotate(**cls._aggregates())
+        )
+        counts = {row.pop("section"): row for row in rows}
 
-            print("SemesterMetrics semester: ", self.semester)
-            student_performance = StudentPerformance.objects.get(
-                student=student, semester=self.semester
-            )
-            total_sgpa += student_performance.sgpa
-
-            (
-                pass_count,
-                total_backlogs,
-                fail_1_sub,
-                fail_2_subs,
-                fail_3_subs,
-                fail_greater_3_subs,
-            ) = self._calculate_counts(
-                fail_count=fail_count,
-                pass_count=pass_count,
-                total_backlogs=total_backlogs,
-                fail_1_sub=fail_1_sub,
-                fail_2_subs=fail_2_subs,
-                fail_3_subs=fail_3_subs,
-                fail_greater_3_subs=fail_greater_3_subs,
-            )
+        existing = list(cls.objects.filter(semester=semester, section__in=counts))
+        covered = {metrics.section_id for metrics in existing}
+        missing = [
+            cls(semester=semester, section_id=section_id)
+            for section_id in counts
+            if section_id not in covered
+        ]
+        for metrics in existing + missing:
+            metrics._set_metrics(counts[metrics.section_id])
 
-        self._update_metrics(
-            total_students=total_students,
-            total_sgpa=total_sgpa,
-            pass_count=pass_count,
-            total_backlogs=total_backlogs,
-            fail_1_sub=fail_1_sub,
-            fail_2_subs=fail_2_subs,
-            fail_3_subs=fail_3_subs,
-            fail_greater_3_subs=fail_greater_3_subs,
-        )
+        cls.objects.bulk_create(missing)
+        cls.objects.bulk_update(existing, cls.METRIC_FIELDS)
+        return existing + missing
 
 
 class SemesterMetricsAdmin(admin.ModelAdmin):
@@ -539,6 +627,193 @@ class SemesterMetricsAdmin(admin.ModelAdmin):
     )
 
 
+class RollupMetrics(models.Model):
+    """
+    Semester results of a group of sections, combined from their SemesterMetrics.
+
+    Only the sections' counts and sums are added up, the averages and
+    percentages are derived from those, so a rollup is exact without rescanning
+    any score (averaging the sections' averages would not be).
+    """
+
+    num_sections = models.IntegerField(default=0)
+    num_students = models.IntegerField(default=0)
+    total_sgpa = models.FloatField(default=0.0)
+    avg_sgpa = models.DecimalField(max_digits=4, decimal_places=2, default=0)
+    total_backlogs = models.IntegerField(default=0)
+    pass_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    fail_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    pass_count = models.IntegerField(default=0)
+    fail_1_sub = models.IntegerField(default=0)
+    fail_2_subs = models.IntegerField(default=0)
+    fail_3_subs = models.IntegerField(default=0)
+    fail_greater_3_subs = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    METRIC_FIELDS = [
+        "num_sections",
+        "num_students",
+        "total_sgpa",
+        "avg_sgpa",
+        "total_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+        "pass_count",
+        "fail_1_sub",
+        "fail_2_subs",
+        "fail_3_subs",
+        "fail_greater_3_subs",
+        "updated_at",
+    ]
+    # `{rollup attname: SemesterMetrics lookup}` the sections are grouped by
+    GROUP_BY = {}
+
+    @staticmethod
+    def _aggregates():
+        return {
+            "num_sections": Count("pk"),
+            "num_students": Sum(F("pass_count") + F("total_backlogs")),
+            "total_sgpa": Sum("total_sgpa"),
+            "total_backlogs": Sum("total_backlogs"),
+            "pass_count": Sum("pass_count"),
+            "fail_1_sub": Sum("fail_1_sub"),
+            "fail_2_subs": Sum("fail_2_subs"),
+            "fail_3_subs": Sum("fail_3_subs"),
+            "fail_greater_3_subs": Sum("fail_greater_3_subs"),
+        }
+
+    def _set_metrics(self, sums):
+        for field, value in sums.items():
+            setattr(self, field, value or 0)
+        total_students = self.num_students
+        if total_students == 0:
+            self.avg_sgpa = self.pass_percentage = self.fail_percentage = 0
+            return
+        self.avg_sgpa = round(self.total_sgpa / total_students, 2)
+        self.pass_percentage = round(self.pass_count / total_students * 100, 2)
+        self.fail_percentage = round(self.total_backlogs / total_students * 100, 2)
+
+    def _key(self):
+        return tuple(getattr(self, attname) for attname in self.GROUP_BY)
+
+    @classmethod
+    def _rebuild(cls, section_metrics, rollups):
+        """
+        Rebuild `rollups` (a queryset of this model) from `section_metrics`, the
+        SemesterMetrics rows of every section they cover.
+
+        One GROUP BY query, one bulk_create, one bulk_update and one delete of
+        the rollups left without any section.
+        """
+        lookups = list(cls.GROUP_BY.values())
+        rows = section_metrics.order_by().values(*lookups).annotate(**cls._aggregates())
+        sums = {tuple(row.pop(lookup) for lookup in lookups): row for row in rows}
+
+        existing = list(rollups)
+        stale = [rollup.pk for rollup in existing if rollup._key() not in sums]
+        existing = [rollup for rollup in existing if rollup._key() in sums]
+        covered = {rollup._key() for rollup in existing}
+        missing = [
+            cls(**dict(zip(cls.GROUP_BY, key))) for key in sums if key not in covered
+        ]
+        for rollup in existing + missing:
+            rollup._set_metrics(sums[rollup._key()])
+
+        cls.objects.bulk_create(missing)
+        cls.objects.bulk_update(existing, cls.METRIC_FIELDS)
+        cls.objects.filter(pk__in=stale).delete()
+        return existing + missing
+
+
+class BatchSemesterMetrics(RollupMetrics):
+    """Semester results of a whole batch, every section combined."""
+
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE)
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["semester"], name="unique_batch_semester_metrics"
+            )
+        ]
+
+    GROUP_BY = {"batch_id": "section__batch", "semester_id": "semester"}
+
+    def __str__(self):
+        return self.batch.batch_name + " - " + str(self.semester.semester_number)
+
+    @classmethod
+    def refresh(cls, semesters):
+        """Rebuild the batch rollups of `semesters`, a Semester queryset."""
+        return cls._rebuild(
+            SemesterMetrics.objects.filter(semester__in=semesters),
+            cls.objects.filter(semester__in=semesters),
+        )
+
+
+class BatchSemesterMetricsAdmin(admin.ModelAdmin):
+    list_display = (
+        "batch",
+        "semester",
+        "num_sections",
+        "num_students",
+        "avg_sgpa",
+        "total_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+        "updated_at",
+    )
+
+
+class DepartmentSemesterMetrics(RollupMetrics):
+    """Results of a semester number across every batch of a department."""
+
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    semester_number = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["department", "semester_number"],
+                name="unique_department_semester_metrics",
+            )
+        ]
+
+    GROUP_BY = {
+        "department_id": "section__batch__dept",
+        "semester_number": "semester__semester_number",
+    }
+
+    def __str__(self):
+        return self.department.dept_name + " - " + str(self.semester_number)
+
+    @classmethod
+    def refresh(cls, departments):
+        """Rebuild every semester rollup of `departments`, a Department queryset."""
+        return cls._rebuild(
+            SemesterMetrics.objects.filter(section__batch__dept__in=departments),
+            cls.objects.filter(department__in=departments),
+        )
+
+
+class DepartmentSemesterMetricsAdmin(admin.ModelAdmin):
+    list_display = (
+        "department",
+        "semester_number",
+        "num_sections",
+        "num_students",
+        "avg_sgpa",
+        "total_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+        "updated_at",
+    )
+
+
 class StudentPerformance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
@@ -546,78 +821,220 @@ class StudentPerformance(models.Model):
     percentage = models.FloatField(default=0.0)
     sgpa = models.FloatField(default=0.0)
     num_backlogs = models.IntegerField(default=0)
+    # partial sums behind sgpa: sum of grade points * credits, and of credits
+    credit_points = models.IntegerField(default=0)
+    credits = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "semester"], name="unique_student_performance"
+            )
+        ]
 
     def __str__(self):
         return self.student.user.username + " - " + str(self.semester.semester_number)
 
-    def _calculate_metrics(self, scores):
+    METRIC_FIELDS = [
+        "total",
+        "percentage",
+        "sgpa",
+        "num_backlogs",
+        "credit_points",
+        "credits",
+    ]
+
+    @staticmethod
+    def _aggregate_scores(scores):
         """
-        Loops through scores once to calculate:
-        - Total marks
-        - SGPA
-        - Total credits
-        - Number of backlogs
+        Total marks, SGPA sums and backlogs (F or A) per student in one GROUP BY query.
+
+        Returns `{student_id: (total, credit_points, credits, num_backlogs)}`.
         """
-        total = 0
-        sgpa = 0
-        total_credits = 0
-        num_backlogs = 0
-
-        for score in scores:
-            total += score.total
-            credits = score.subject.credits
-            total_credits += credits
-
-            # Calculate number of backlogs
-            if score.grade in ["F", "A"]:
-                num_backlogs += 1
-
-            # Calculate SGPA component based on score ranges
-            if score.total >= 90:
-                sgpa += 10 * credits
-            elif score.total >= 80:
-                sgpa += 9 * credits
-            elif score.total >= 70:
-                sgpa += 8 * credits
-            elif score.total >= 60:
-                sgpa += 7 * credits
-            elif score.total >= 50:
-                sgpa += 6 * credits
-            elif score.total >= 40:
-                sgpa += 5 * credits
-            else:
-                sgpa += 0
-
-        # Final SGPA calculation
-        sgpa = round(sgpa / total_credits, 2) if total_credits > 0 else 0
-        return total, sgpa, num_backlogs
-
-    def _calculate_percentage(self, total):
+        rows = (
+            scores.order_by()
+            .values("student")
+            .annotate(
+                total_marks=Sum("total"),
+                credits=Sum("subject__credits"),
+                points=Sum(GRADE_POINTS * F("subject__credits")),
+                backlogs=Count("pk", filter=Q(grade__in=["F", "A"])),
+            )
+        )
+        return {
+            row["student"]: (
+                row["total_marks"],
+                row["points"],
+                row["credits"],
+                row["backlogs"],
+            )
+            for row in rows
+        }
+
+    @staticmethod
+    def _percentage(total, num_subjects):
         """
         Calculates percentage based on the total marks.
         """
-        max_total = self.semester.num_subjects * 100
+        max_total = num_subjects * 100
         return round((total / max_total) * 100, 2) if max_total > 0 else 0
 
+    @staticmethod
+    def _sgpa(credit_points, credits):
+        return round(credit_points / credits, 2) if credits > 0 else 0
+
+    def _set_metrics(self, total, credit_points, credits, num_backlogs, num_subjects):
+        self.total = total
+        self.credit_points = credit_points
+        self.credits = credits
+        self.sgpa = self._sgpa(credit_points, credits)
+        self.percentage = self._percentage(total, num_subjects)
+        self.num_backlogs = num_backlogs
+
     def calculate_all(self):
         """
-        Calculates total marks, SGPA, and percentage in one pass through the scores.
+        Calculates total marks, SGPA, and percentage in one aggregate query.
         """
-        scores = Score.objects.filter(student=self.student, semester=self.semester)
+        scores = Score.objects.filter(
+            student=self.student_id, semester=self.semester_id
+        )
+        metrics = self._aggregate_scores(scores).get(self.student_id, (0, 0, 0, 0))
 
-        # Calculate total, SGPA, and total credits in one loop
-        total, sgpa, num_backlogs = self._calculate_metrics(scores)
+        self._set_metrics(*metrics, num_subjects=self.semester.num_subjects)
+        self.save()
 
-        # Calculate percentage
-        percentage = self._calculate_percentage(total)
+    @classmethod
+    def calculate_section(cls, semester, section):
+        """
+        Create or recompute the performance of every student of a section at once.
 
-        # Update fields
-        self.total = total
-        self.sgpa = sgpa
-        self.percentage = percentage
-        self.num_backlogs = num_backlogs
-        self.save()
+        Students with scores but no performance row get one. Signals don't fire
+        for the bulk writes, the students' cgpa and backlogs are left to the caller.
+        """
+        results = cls._aggregate_scores(
+            Score.objects.filter(semester=semester, student__section=section)
+        )
+        existing = list(cls.objects.filter(semester=semester, student__section=section))
+        covered = {performance.student_id for performance in existing}
+        missing = [
+            cls(student_id=student_id, semester=semester)
+            for student_id in results
+            if student_id not in covered
+        ]
+        for performance in existing + missing:
+            performance._set_metrics(
+                *results.get(performance.student_id, (0, 0, 0, 0)),
+                num_subjects=semester.num_subjects,
+            )
+
+        cls.objects.bulk_create(missing)
+        cls.objects.bulk_update(existing, cls.METRIC_FIELDS)
+        return existing + missing
 
 
 class StudentPerformanceAdmin(admin.ModelAdmin):
     list_display = ("student", "semester", "total", "percentage", "sgpa")
+
+
+class ScrapeResultCache(models.Model):
+    """Raw scraped marks of a USN for a result url, reused until SCRAPE_CACHE_TTL expires."""
+
+    usn = models.CharField(max_length=10)
+    result_url = models.URLField()
+    payload = models.JSONField()
+    content_hash = models.CharField(max_length=64)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["usn", "result_url"], name="unique_scrape_cache_usn_url"
+            )
+        ]
+
+    def __str__(self):
+        return self.usn + " - " + self.result_url
+
+
+class ScrapeResultCacheAdmin(admin.ModelAdmin):
+    list_display = ("usn", "result_url", "content_hash", "fetched_at")
+
+
+class ScrapeJob(models.Model):
+    """A section's scrape run, persisted so it can resume after a restart."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (COMPLETED, "Completed"),
+        (FAILED, "Failed"),
+    ]
+
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE)
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    section = models.ForeignKey(Section, on_delete=models.CASCADE)
+    result_url = models.URLField()
+    use_cache = models.BooleanField(default=True)
+    redis_name = models.CharField(max_length=36)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return (
+            self.batch.batch_name
+            + " - "
+            + self.section.section_name
+            + " - "
+            + str(self.semester.semester_number)
+        )
+
+
+class ScrapeJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "batch",
+        "section",
+        "semester",
+        "status",
+        "attempts",
+        "redis_name",
+        "created_at",
+        "updated_at",
+    )
+
+
+class ScrapeJobItem(models.Model):
+    """Checkpoint of one student inside a ScrapeJob."""
+
+    PENDING = "pending"
+    IN_FLIGHT = "in_flight"
+    DONE = "done"
+    FAILED = "failed"
+    STATE_CHOICES = [
+        (PENDING, "Pending"),
+        (IN_FLIGHT, "In flight"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    job = models.ForeignKey(ScrapeJob, on_delete=models.CASCADE, related_name="items")
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=PENDING)
+    error = models.CharField(max_length=100, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "student"], name="unique_scrape_job_student"
+            )
+        ]
+
+    def __str__(self):
+        return str(self.job_id) + " - " + str(self.student.usn) + " - " + self.state
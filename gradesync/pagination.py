@@ -0,0 +1,168 @@
+"""
+Pagination of the list endpoints.
+
+Lists are paginated with cursors by default: a page starts after the ordering
+value of the previous page's last row instead of at an offset, so rows inserted
+while a client pages through (e.g. during a scrape) don't shift or repeat rows.
+`?pagination=keyset` switches a view to its `keyset_ordering` (e.g. usn, id),
+where the `after` token holds every ordering value of the last row and a page
+is a single indexed range scan whatever its depth.
+
+NULLs (e.g. a student without a usn) are paged like any other value: cursors
+read them as an empty string, keyset mode sorts them last.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import CharField, F, Q, TextField, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Coalesce
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# annotation holding the value of a related ordering field, e.g. student__usn
+POSITION = "cursor_position"
+KEYSET = "keyset_{}"
+
+
+def _model_field(model, path):
+    *relations, name = path.split(LOOKUP_SEP)
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _nullable(model, path):
+    return path not in ("pk", "id") and _model_field(model, path).null
+
+
+class CursorPagination(pagination.CursorPagination):
+    page_size_query_param = "page_size"
+    ordering = "id"
+    mode_query_param = "pagination"
+    after_query_param = "after"
+
+    @property
+    def max_page_size(self):
+        return settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """The view's ordering (see OrderingFilter), made total with the id."""
+        ordering_filters = [
+            backend
+            for backend in getattr(view, "filter_backends", [])
+            if hasattr(backend, "get_ordering")
+        ]
+        ordering = None
+        if ordering_filters:
+            ordering = ordering_filters[0]().get_ordering(request, queryset, view)
+        ordering = tuple(ordering or (self.ordering,))
+        if not {"id", "-id", "pk", "-pk"} & set(ordering):
+            ordering += ("id",)
+        if POSITION in queryset.query.annotations:
+            # paginate_queryset put the first field in an annotation
+            first = ordering[0]
+            ordering = (first[: first.startswith("-")] + POSITION,) + ordering[1:]
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = request.query_params.get(self.mode_query_param) == "keyset"
+        if self.keyset:
+            return self.paginate_keyset(queryset, request, view)
+
+        field = self.get_ordering(request, queryset, view)[0].lstrip("-")
+        model_field = _model_field(queryset.model, field) if field != "pk" else None
+        if (
+            model_field is not None
+            and model_field.null
+            and isinstance(model_field, (CharField, TextField))
+        ):
+            # a NULL position would be sent as "None" and compared as a string
+            queryset = queryset.annotate(**{POSITION: Coalesce(F(field), Value(""))})
+        elif LOOKUP_SEP in field:
+            queryset = queryset.annotate(**{POSITION: F(field)})
+        return super().paginate_queryset(queryset, request, view)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if hasattr(instance, POSITION):
+            return str(getattr(instance, POSITION))
+        return super()._get_position_from_instance(instance, ordering)
+
+    def decode_after(self, request, fields):
+        encoded = request.query_params.get(self.after_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_after(self, values):
+        encoded = json.dumps(values, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(encoded).decode("ascii")
+
+    def paginate_keyset(self, queryset, request, view):
+        """
+        A page of rows after the `after` token, ordered by `view.keyset_ordering`.
+
+        (a, b) > (x, y) is spelled `a > x OR (a = x AND b > y)`, which the
+        database answers from an index on the ordering fields. NULLs sort last,
+        so `a > x` also matches a NULL `a`, and nothing is greater than a NULL.
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        fields = list(getattr(view, "keyset_ordering", ("id",)))
+        nullable = {field: _nullable(queryset.model, field) for field in fields}
+
+        queryset = queryset.annotate(
+            **{KEYSET.format(index): F(field) for index, field in enumerate(fields)}
+        ).order_by(
+            *(
+                F(field).asc(nulls_last=True) if nullable[field] else field
+                for field in fields
+            )
+        )
+        after = self.decode_after(request, fields)
+        if after is not None:
+            # matches nothing, e.g. after a row whose every value is NULL
+            condition = Q(pk__in=[])
+            for index, field in enumerate(fields):
+                if after[index] is None:
+                    continue
+                greater = Q(**{f"{field}__gt": after[index]})
+                if nullable[field]:
+                    greater |= Q(**{f"{field}__isnull": True})
+                for prefix, value in zip(fields[:index], after[:index]):
+                    if value is None:
+                        greater &= Q(**{f"{prefix}__isnull": True})
+                    else:
+                        greater &= Q(**{prefix: value})
+                condition |= greater
+            queryset = queryset.filter(condition)
+
+        rows = list(queryset[: self.page_size + 1])
+        self.page = rows[: self.page_size]
+        self.after = None
+        if len(rows) > self.page_size:
+            last = self.page[-1]
+            self.after = [
+                getattr(last, KEYSET.format(index)) for index in range(len(fields))
+            ]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        next_url = None
+        if self.after is not None:
+            next_url = replace_query_param(
+                self.base_url, self.after_query_param, self.encode_after(self.after)
+            )
+        return Response({"next": next_url, "previous": None, "results": data})
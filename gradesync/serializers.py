@@ -1,18 +1,19 @@
-import threading
-
 import pandas as pd
 from django.contrib.auth.models import Group
 from rest_framework import serializers
 
-from utils.driver import initialise_driver
-from utils.redis_conn import init_scraping_redis_key
-from utils.scraper import check_url, scrape_result, status_code_str
-from utils.scraper_drf import scrape_bg_task
+from utils.retry import CooldownActive
+from utils.scraper import check_url, status_code_str
+from utils.scraper_drf import create_scrape_job, fetch_student_result
 
+from .fieldsets import SparseFieldsMixin
 from .models import (
     Batch,
+    BatchSemesterMetrics,
     Department,
+    DepartmentSemesterMetrics,
     Score,
+    ScrapeJob,
     Section,
     Semester,
     SemesterMetrics,
@@ -22,6 +23,7 @@ from .models import (
     SubjectMetrics,
     User,
 )
+from .tasks import start_scrape_job
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -43,13 +45,29 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class SubjectMetricsSubjectSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Subject
+        fields = ["id", "sub_name", "sub_code"]
+
+
+class StudentSummarySerializer(serializers.ModelSerializer):
+    """A student's id, usn and name, for nesting in other rows."""
+
+    name = serializers.CharField(source="user.first_name", read_only=True)
+
+    class Meta:
+        model = Student
+        fields = ["id", "usn", "name"]
+
+
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Student
         fields = "__all__"
 
 
-class BatchSerializer(serializers.ModelSerializer):
+class BatchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Batch
         fields = "__all__"
@@ -61,19 +79,24 @@ class DepartmentSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class SectionSerializer(serializers.ModelSerializer):
+class SectionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Section
         fields = "__all__"
 
 
-class SemesterSerializer(serializers.ModelSerializer):
+class SemesterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Semester
         fields = "__all__"
 
 
-class ScoreSerializer(serializers.ModelSerializer):
+class ScoreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "student": StudentSummarySerializer,
+        "subject": SubjectMetricsSubjectSerializer,
+    }
+
     class Meta:
         model = Score
         fields = "__all__"
@@ -105,44 +128,59 @@ class StudentScoreSerializer(serializers.ModelSerializer):
         ]
 
 
-class StudentPerformanceSerializer(serializers.ModelSerializer):
+class StudentPerformanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {"student": StudentSummarySerializer}
+
     class Meta:
         model = StudentPerformance
         fields = "__all__"
 
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Subject
         fields = "__all__"
 
 
-class SubjectMetricsSubjectSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Subject
-        fields = ["id", "sub_name", "sub_code"]
+class SubjectMetricsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        "subject": SubjectMetricsSubjectSerializer,
+        "highest_scorer": StudentSummarySerializer,
+    }
+    default_expand = ("subject", "highest_scorer")
 
+    class Meta:
+        model = SubjectMetrics
+        fields = "__all__"
 
-class HighestScorerSerializer(serializers.ModelSerializer):
-    name = serializers.CharField(source="user.first_name", read_only=True)
 
+class SemesterMetricsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
-        model = Student
-        fields = ["id", "usn", "name"]
+        model = SemesterMetrics
+        fields = "__all__"
 
 
-class SubjectMetricsSerializer(serializers.ModelSerializer):
-    subject = SubjectMetricsSubjectSerializer(read_only=True)
-    highest_scorer = HighestScorerSerializer(read_only=True)
+class BatchSemesterMetricsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = BatchSemesterMetrics
+        fields = "__all__"
+
 
+class DepartmentSemesterMetricsSerializer(
+    SparseFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
-        model = SubjectMetrics
+        model = DepartmentSemesterMetrics
         fields = "__all__"
 
 
-class SemesterMetricsSerializer(serializers.ModelSerializer):
+class ScrapeJobSerializer(serializers.ModelSerializer):
+    total = serializers.IntegerField(read_only=True)
+    done = serializers.IntegerField(read_only=True)
+    failed = serializers.IntegerField(read_only=True)
+
     class Meta:
-        model = SemesterMetrics
+        model = ScrapeJob
         fields = "__all__"
 
 
@@ -167,6 +205,7 @@ class BatchSubjectSerializer(serializers.ModelSerializer):
 class IdentifySubjectsSerializer(serializers.Serializer):
     usn = serializers.CharField(max_length=10, allow_blank=False)
     result_url = serializers.URLField(allow_blank=False)
+    use_cache = serializers.BooleanField(default=True)
 
     def create(self, validated_data):
         try:
@@ -175,8 +214,9 @@ class IdentifySubjectsSerializer(serializers.Serializer):
 
             check_url(url=result_url)
 
-            driver = initialise_driver()
-            scraped_res = scrape_result(USN=usn, url=result_url, driver=driver)
+            scraped_res = fetch_student_result(
+                usn, result_url, use_cache=validated_data["use_cache"], wait=False
+            )
 
             print("Scraped result: ", scraped_res, flush=True)
 
@@ -187,6 +227,8 @@ class IdentifySubjectsSerializer(serializers.Serializer):
             code = status_code_str(code=scraped_res[1])
 
             return {"subjects": subjects, "status": code}
+        except CooldownActive:
+            raise
         except Exception as e:
             return {"error": str(e)}
 
@@ -195,6 +237,7 @@ class ScrapeBatchSerializer(serializers.Serializer):
     batch = serializers.PrimaryKeyRelatedField(queryset=Batch.objects.all())
     semester = serializers.PrimaryKeyRelatedField(queryset=Semester.objects.all())
     result_url = serializers.URLField(allow_blank=False)
+    use_cache = serializers.BooleanField(default=True)
 
     def create(self, validated_data):
         try:
@@ -207,25 +250,19 @@ class ScrapeBatchSerializer(serializers.Serializer):
             sections = Section.objects.filter(batch=batch)
 
             redis_names = {}
+            jobs = {}
             for section in sections:
-                students = Student.objects.filter(section=section)
-                redis_name = init_scraping_redis_key(total=len(students))
-                redis_names[section.section_name] = redis_name
-
-                thread = threading.Thread(
-                    target=scrape_bg_task,
-                    args=(
-                        semester,
-                        students,
-                        redis_name,
-                        result_url,
-                    ),
+                job = create_scrape_job(
+                    batch, semester, section, result_url, validated_data["use_cache"]
                 )
-                thread.start()
+                redis_names[section.section_name] = job.redis_name
+                jobs[section.section_name] = job.id
+                start_scrape_job(job)
 
             return {
                 "message": "Scraping background task has started.",
                 "redis_names": redis_names,
+                "jobs": jobs,
             }
         except Exception as e:
             return {"error": str(e)}
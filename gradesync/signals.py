@@ -1,7 +1,10 @@
-# signals.py
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
+from utils.response_cache import invalidate, score_tags
+
+from .incremental import apply_score_change
+from .metrics import mark_dirty, mark_score_dirty, remember_section
 from .models import (
     Score,
     SemesterMetrics,
@@ -9,6 +12,7 @@ from .models import (
     StudentPerformance,
     Subject,
     SubjectMetrics,
+    User,
 )
 
 
@@ -20,42 +24,117 @@ def update_subject_count(sender, instance, **kwargs):
 
 @receiver([post_save, post_delete], sender=Student)
 def update_student_count(sender, instance, **kwargs):
-    section = instance.section
-    batch = instance.batch
-    section.count_num_students()
-    batch.count_num_students()
+    mark_dirty("section_count", instance.section_id)
+    mark_dirty("batch_count", instance.batch_id)
+
+
+@receiver(pre_delete, sender=Student)
+def keep_deleted_student_section(sender, instance, **kwargs):
+    # the student is gone by the time its deleted scores are flushed
+    remember_section(instance)
 
 
 @receiver([post_save, post_delete], sender=StudentPerformance)
 def update_cgpa(sender, instance, **kwargs):
-    student = instance.student
-    student.calculate_cgpa()
-    student.count_num_backlogs()
+    mark_dirty("student", instance.student_id)
 
 
-@receiver([post_save], sender=Score)
-def update_student_and_metrics(sender, instance, **kwargs):
-    student = instance.student
-    semester = instance.semester
-    subject = instance.subject
+@receiver(post_save, sender=Score)
+def update_student_and_metrics(sender, instance, created, **kwargs):
+    # an edited score is applied as a delta (gradesync.incremental), anything
+    # else is recomputed once per transaction however many scores changed, see
+    # gradesync.metrics
+    if created:
+        mark_score_dirty(instance)
+    else:
+        apply_score_change(instance)
+    instance.remember_values()
+
 
-    # Update the student performance metrics
-    student_performance = StudentPerformance.objects.get(
-        student=student, semester=semester
+@receiver(post_delete, sender=Score)
+def remove_score_from_metrics(sender, instance, **kwargs):
+    mark_score_dirty(instance)
+
+
+@receiver([post_save, post_delete], sender=Score)
+@receiver([post_save, post_delete], sender=StudentPerformance)
+@receiver([post_save, post_delete], sender=SubjectMetrics)
+@receiver([post_save, post_delete], sender=SemesterMetrics)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    # a section's scores are cached under its semester's tag too, a score
+    # doesn't need the extra query for its student's section (the metrics it
+    # changes in place are invalidated by gradesync.incremental)
+    section_id = getattr(instance, "section_id", None)
+    student_id = getattr(instance, "student_id", None)
+    invalidate(
+        score_tags(
+            section_ids=[section_id] if section_id else [],
+            semester_id=instance.semester_id,
+            student_ids=[student_id] if student_id else [],
+        )
     )
-    student_performance.calculate_all()
 
-    # Update the backlogs for the student
-    student.count_num_backlogs()
 
-    # Update the SubjectMetrics
-    subject_metrics = SubjectMetrics.objects.get(
-        subject=subject, semester=semester, section=student.section
+# Students, their names and subjects are rendered into the score and metrics
+# responses too. Deleting one deletes its scores first, whose own signals bump
+# the tags, so only saves look up the semesters a student has scores in.
+
+
+def _student_tags(students, created=False):
+    """Tags of the responses showing `students`, (pk, section_id, semester_id) rows."""
+    student_ids = [pk for pk, _, _ in students]
+    tags = score_tags(
+        section_ids={section_id for _, section_id, _ in students},
+        student_ids=student_ids,
     )
-    subject_metrics.calculate_metrics()
+    semester_ids = {semester_id for _, _, semester_id in students if semester_id}
+    if not created:
+        semester_ids.update(
+            Score.objects.filter(student__in=student_ids)
+            .values_list("semester_id", flat=True)
+            .distinct()
+        )
+    return tags + [f"semester:{semester_id}" for semester_id in semester_ids]
 
-    # Update the SemesterMetrics
-    semester_metrics = SemesterMetrics.objects.get(
-        semester=semester, section=student.section
+
+@receiver(post_save, sender=Student)
+def invalidate_student_responses(sender, instance, created, **kwargs):
+    students = [(instance.pk, instance.section_id, instance.semester_id)]
+    invalidate(_student_tags(students, created))
+
+
+@receiver(post_delete, sender=Student)
+def invalidate_deleted_student_responses(sender, instance, **kwargs):
+    invalidate(
+        score_tags(
+            section_ids=[instance.section_id],
+            semester_id=instance.semester_id,
+            student_ids=[instance.pk],
+        )
     )
-    semester_metrics.calculate_metrics()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, created, update_fields, **kwargs):
+    # a new user has no student yet, and logins only save last_login
+    if created or (update_fields and "first_name" not in update_fields):
+        return
+    students = list(
+        Student.objects.filter(user=instance).values_list(
+            "pk", "section_id", "semester_id"
+        )
+    )
+    if students:
+        invalidate(_student_tags(students))
+
+
+@receiver([post_save, post_delete], sender=Subject)
+def invalidate_subject_responses(sender, instance, created=False, **kwargs):
+    student_ids = []
+    if kwargs["signal"] is post_save and not created:
+        student_ids = (
+            Score.objects.filter(subject=instance)
+            .values_list("student_id", flat=True)
+            .distinct()
+        )
+    invalidate(score_tags(semester_id=instance.semester_id, student_ids=student_ids))
@@ -0,0 +1,113 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django_q.models import Schedule
+from django_q.tasks import async_task, schedule
+
+from utils.result_cache import purge_expired
+from utils.scheduler import get_scheduler
+from utils.scraper_drf import recompute_section_metrics, scrape_bg_task
+
+from .metrics import recompute
+from .models import ScrapeJob, Section, Semester
+
+
+def task_path(func):
+    return f"{func.__module__}.{func.__name__}"
+
+
+def dispatch(func, *args, **kwargs):
+    """
+    Queue `func` on the django-q cluster (`manage.py qcluster`).
+
+    With TASK_BACKEND = "threads" it runs on the in-process scrape scheduler
+    instead, which needs no worker but dies with the web process.
+    """
+    if settings.TASK_BACKEND == "django_q":
+        return async_task(task_path(func), *args, **kwargs)
+    return get_scheduler().submit_section(lambda: func(*args, **kwargs))
+
+
+def dispatch_later(func, delay, *args, **kwargs):
+    """Queue `func` once `delay` seconds have passed."""
+    if settings.TASK_BACKEND == "django_q":
+        return schedule(
+            task_path(func),
+            *args,
+            schedule_type=Schedule.ONCE,
+            next_run=timezone.now() + timedelta(seconds=delay),
+            **kwargs,
+        )
+    timer = threading.Timer(delay, dispatch, args=(func, *args), kwargs=kwargs)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def retry_delay(attempt):
+    """Exponential backoff before running attempt number `attempt` (2, 3, ...)."""
+    return settings.TASK_RETRY_BACKOFF * 2 ** (attempt - 2)
+
+
+def start_scrape_job(job):
+    return dispatch(scrape_job_task, job.id)
+
+
+def run_scrape_job(job_id, retry=False):
+    """
+    Run a scrape job, then queue its section's metrics once it completed.
+
+    A completed job also drops the expired cached results, so the cache only
+    holds what was scraped within SCRAPE_CACHE_TTL.
+    """
+    job = scrape_bg_task(job_id, retry=retry)
+    if job.status == ScrapeJob.COMPLETED:
+        dispatch(recompute_metrics_task, job.semester_id, job.section_id)
+        purge_expired()
+    return job
+
+
+def scrape_job_task(job_id, attempt=1):
+    """Run a scrape job, rescheduling it with backoff while attempts are left."""
+    job = run_scrape_job(job_id, retry=attempt < settings.TASK_MAX_ATTEMPTS)
+    if job.status == ScrapeJob.PENDING:
+        delay = retry_delay(attempt + 1)
+        print(
+            f"Scrape job {job_id} failed ({job.error}), retrying in {delay}s",
+            flush=True,
+        )
+        dispatch_later(scrape_job_task, delay, job_id, attempt=attempt + 1)
+    return job.status
+
+
+def recompute_metrics_task(semester_id, section_id, attempt=1):
+    """Recompute the subject and semester metrics of a section."""
+    try:
+        recompute_section_metrics(
+            Semester.objects.get(pk=semester_id), Section.objects.get(pk=section_id)
+        )
+    except (Semester.DoesNotExist, Section.DoesNotExist):
+        return
+    except Exception:
+        if attempt >= settings.TASK_MAX_ATTEMPTS:
+            raise
+        dispatch_later(
+            recompute_metrics_task,
+            retry_delay(attempt + 1),
+            semester_id,
+            section_id,
+            attempt=attempt + 1,
+        )
+    finally:
+        connections.close_all()
+
+
+def recompute_dirty_task(keys):
+    """Recompute the rows of a dirty set flushed with METRICS_FLUSH = "queue"."""
+    try:
+        recompute(keys)
+    finally:
+        connections.close_all()
@@ -0,0 +1,154 @@
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.test import SimpleTestCase
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.captcha_solvers import (
+    CaptchaSolveError,
+    FakeCaptchaSolver,
+    FallbackCaptchaSolver,
+    LocalOCRSolver,
+    SolverStats,
+)
+from utils.trueCaptcha import TrueCaptchaConfigError
+
+
+def make_captcha(text):
+    """Draws a noise free captcha with evenly spaced characters."""
+    image = Image.new("L", (20 * len(text) + 10, 30), color=255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    for i, char in enumerate(text):
+        draw.text((5 + 20 * i, 8), char, fill=0, font=font)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class NamedFake(FakeCaptchaSolver):
+    def __init__(self, name, answers):
+        super().__init__(answers)
+        self.name = name
+
+
+class FallbackCaptchaSolverTests(SimpleTestCase):
+    def test_falls_back_to_next_solver(self):
+        """
+        Ensure a failing backend falls through to the next one in the chain
+        """
+        broken = NamedFake("broken", [CaptchaSolveError("nope")])
+        working = NamedFake("working", ["AB12CD"])
+        chain = FallbackCaptchaSolver([broken, working])
+
+        captcha = chain.solve(b"png")
+        self.assertEqual(captcha, "AB12CD")
+        self.assertEqual(captcha.backend, "working")
+        self.assertEqual(chain.stats.success_rate("broken"), 0.0)
+
+    def test_wrong_length_counts_as_failure(self):
+        """
+        Ensure an answer that isn't 6 characters long is not returned
+        """
+        chain = FallbackCaptchaSolver([NamedFake("short", ["AB1"])])
+        with self.assertRaises(CaptchaSolveError):
+            chain.solve(b"png")
+
+    def test_config_error_is_raised(self):
+        """
+        Ensure a missing TrueCaptcha configuration still stops the scrape
+        """
+        chain = FallbackCaptchaSolver([NamedFake("remote", [TrueCaptchaConfigError()])])
+        with self.assertRaises(TrueCaptchaConfigError):
+            chain.solve(b"png")
+
+    def test_inaccurate_solver_is_demoted(self):
+        """
+        Ensure a backend rejected by the website moves behind accurate backends
+        """
+        stats = SolverStats()
+        fast = NamedFake("fast", ["AAAAAA"])
+        slow = NamedFake("slow", ["BBBBBB"])
+        chain = FallbackCaptchaSolver(
+            [slow, fast], stats=stats, min_success_rate=0.5, min_samples=2
+        )
+        stats.record("slow", True, 2.0)
+        stats.record("fast", True, 0.1)
+        self.assertEqual([s.name for s in chain.ordered()], ["fast", "slow"])
+
+        chain.report(chain.solve(b"png"), correct=False)
+        self.assertEqual(stats.success_rate("fast"), 0.0)
+        self.assertEqual([s.name for s in chain.ordered()], ["slow", "fast"])
+        self.assertEqual(chain.solve(b"png").backend, "slow")
+
+
+class LocalOCRSolverTests(SimpleTestCase):
+    def test_learn_and_solve(self):
+        """
+        Ensure glyphs learned from a known captcha are recognised in a new one
+        """
+        with tempfile.TemporaryDirectory() as template_dir:
+            solver = LocalOCRSolver(template_dir)
+            with self.assertRaises(CaptchaSolveError):
+                solver.solve(make_captcha("AB12CD"))
+
+            solver.learn(make_captcha("AB12CD"), "AB12CD")
+            self.assertEqual(solver.solve(make_captcha("DC21BA")), "DC21BA")
+
+    def test_learns_accepted_captchas(self):
+        """
+        Ensure a captcha the website accepted trains the local solver once
+        """
+        with tempfile.TemporaryDirectory() as template_dir:
+            local = LocalOCRSolver(template_dir)
+            chain = FallbackCaptchaSolver([local, NamedFake("remote", ["AB12CD"])])
+            image = make_captcha("AB12CD")
+            captcha = chain.solve(image)
+            self.assertEqual(captcha.backend, "remote")
+
+            chain.report(captcha, correct=True)
+            self.assertEqual(local.solve(make_captcha("DC21BA")), "DC21BA")
+            templates = sorted(Path(template_dir).iterdir())
+            self.assertEqual(len(templates), 6)
+
+            chain.report(captcha, correct=True)
+            self.assertEqual(sorted(Path(template_dir).iterdir()), templates)
+
+    def test_duplicate_glyphs_are_skipped(self):
+        """
+        Ensure learning glyphs identical to known templates stores nothing new
+        """
+        with tempfile.TemporaryDirectory() as template_dir:
+            solver = LocalOCRSolver(template_dir)
+            solver.learn(make_captcha("AAB12C"), "AAB12C")
+            templates = sorted(Path(template_dir).iterdir())
+            self.assertEqual(len(templates), 5)
+
+            solver.learn(make_captcha("CBA21A"), "CBA21A")
+            self.assertEqual(sorted(Path(template_dir).iterdir()), templates)
+
+    def test_templates_per_character_are_capped(self):
+        """
+        Ensure only the newest `max_templates` templates of a character are kept
+        """
+        with tempfile.TemporaryDirectory() as template_dir:
+            solver = LocalOCRSolver(template_dir, max_templates=2, duplicate_distance=0)
+            solver.learn(make_captcha("AB12CD"), "AB12CD")
+            first = sorted(Path(template_dir).glob("A_*.png"))
+            solver.learn(make_captcha("AAAAAA"), "AAAAAA")
+
+            kept = sorted(Path(template_dir).glob("A_*.png"))
+            self.assertEqual(len(kept), 2)
+            self.assertNotIn(first[0], kept)
+            self.assertEqual(len(list(Path(template_dir).iterdir())), 7)
+            self.assertEqual(solver.solve(make_captcha("DC21BA")), "DC21BA")
+
+    def test_wrong_glyph_count(self):
+        """
+        Ensure a captcha that doesn't split into 6 glyphs is rejected
+        """
+        with tempfile.TemporaryDirectory() as template_dir:
+            solver = LocalOCRSolver(template_dir)
+            with self.assertRaises(CaptchaSolveError):
+                solver.learn(make_captcha("AB1"), "AB1")
@@ -0,0 +1,130 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from selenium.common.exceptions import WebDriverException
+
+from utils.driver import DriverPool, DriverPoolTimeout
+from utils.retry import NETWORK_ERROR
+from utils.scraper_drf import scrape_student_once
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+        self.dead = False
+
+    @property
+    def current_url(self):
+        if self.dead:
+            raise WebDriverException("session deleted")
+        return "about:blank"
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DriverPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            driver = FakeDriver()
+            self.created.append(driver)
+            return driver
+
+        self.pool = DriverPool(size=2, max_uses=3, factory=factory)
+
+    def test_reuses_driver(self):
+        """
+        Ensure a checked in driver is handed out again instead of launching a new one
+        """
+        with self.pool.driver() as first:
+            pass
+        with self.pool.driver() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+
+    def test_recycles_after_max_uses(self):
+        """
+        Ensure a driver is quit and replaced once it reaches max_uses
+        """
+        for _ in range(3):
+            with self.pool.driver():
+                pass
+        self.assertTrue(self.created[0].quit_called)
+        with self.pool.driver() as driver:
+            self.assertIsNot(driver, self.created[0])
+
+    def test_replaces_unhealthy_driver(self):
+        """
+        Ensure a dead idle driver is discarded on checkout
+        """
+        with self.pool.driver() as driver:
+            pass
+        driver.dead = True
+        with self.pool.driver() as fresh:
+            self.assertIsNot(fresh, driver)
+        self.assertTrue(driver.quit_called)
+
+    def test_discards_driver_after_webdriver_error(self):
+        """
+        Ensure a driver that raised a WebDriverException is not reused
+        """
+        with self.assertRaises(WebDriverException):
+            with self.pool.driver():
+                raise WebDriverException("crashed")
+        self.assertTrue(self.created[0].quit_called)
+
+    def test_bounded(self):
+        """
+        Ensure no more than `size` drivers can be checked out at once
+        """
+        first = self.pool.checkout()
+        second = self.pool.checkout()
+        with self.assertRaises(DriverPoolTimeout):
+            self.pool.checkout(timeout=0.01)
+
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(self.pool.checkout()))
+        waiter.start()
+        self.pool.checkin(first)
+        waiter.join(timeout=1)
+        self.assertEqual(result, [first])
+        self.pool.checkin(second)
+        self.pool.checkin(result[0])
+
+    def test_shutdown_quits_all_drivers(self):
+        """
+        Ensure shutdown quits idle drivers and drivers checked in afterwards
+        """
+        idle = self.pool.checkout()
+        busy = self.pool.checkout()
+        self.pool.checkin(idle)
+        self.pool.shutdown()
+        self.assertTrue(idle.quit_called)
+        self.pool.checkin(busy)
+        self.assertTrue(busy.quit_called)
+        with self.assertRaises(RuntimeError):
+            self.pool.checkout()
+
+    @override_settings(SCRAPER_BACKEND="selenium", DRIVER_CHECKOUT_TIMEOUT=0.01)
+    @mock.patch("utils.scraper_drf.scrape_result")
+    def test_busy_pool_is_network_error(self, scrape):
+        """
+        Ensure a scrape gives up with a network error when no driver frees up in time
+        """
+        first = self.pool.checkout()
+        second = self.pool.checkout()
+        with mock.patch("utils.scraper_drf.get_driver_pool", return_value=self.pool):
+            self.assertEqual(
+                scrape_student_once("1OX21CS001", "https://results.vtu.ac.in"),
+                (None, NETWORK_ERROR),
+            )
+        scrape.assert_not_called()
+        self.pool.checkin(first)
+        self.pool.checkin(second)
@@ -0,0 +1,79 @@
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import User
+from .test_metrics import SectionScoresTestCase
+
+
+@override_settings(EXPORT_CHUNK_SIZE=4)
+class ExportScoresTests(SectionScoresTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.first())
+        self.url = reverse("export-scores")
+
+    def export(self, file_format, **params):
+        response = self.client.get(self.url, {"format": file_format, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv(self):
+        """
+        Ensure the CSV export has a header and a joined row per score
+        """
+        response, content = self.export("csv")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(content.decode("utf-8"))))
+        self.assertEqual(
+            rows[0][:5], ["usn", "section", "semester", "sub_code", "credits"]
+        )
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(
+            rows[1], ["1OX21CS001", "A", "5", "21CS51", "4", "0", "80", "80", "FCD"]
+        )
+
+    def test_parquet_row_groups(self):
+        """
+        Ensure the Parquet export is written one row group per chunk
+        """
+        _, content = self.export("parquet")
+
+        parquet = pq.ParquetFile(io.BytesIO(content))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.column("usn")[0].as_py(), "1OX21CS001")
+
+    def test_arrow_filtered(self):
+        """
+        Ensure the Arrow export is a readable IPC stream filtered like the scores list
+        """
+        _, content = self.export("arrow", subject=self.subjects[1].pk)
+
+        table = pa.ipc.open_stream(content).read_all()
+        self.assertEqual(table.column("sub_code").to_pylist(), ["21CS52"] * 3)
+        self.assertEqual(table.column("total").to_pylist(), [65, 30, 55])
+
+        response = self.client.get(self.url, {"format": "arrow", "subject": "x"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("subject", response.json())
+
+    def test_requires_authentication(self):
+        """
+        Ensure anonymous requests are rejected with a JSON error
+        """
+        response = APIClient().get(self.url, {"format": "csv"})
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("detail", response.json())
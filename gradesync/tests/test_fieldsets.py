@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import SubjectMetrics, User
+from .test_metrics import SectionScoresTestCase
+
+
+class SparseFieldsetTests(SectionScoresTestCase):
+    def setUp(self):
+        super().setUp()
+        SubjectMetrics.calculate_section_metrics(self.semester, self.section)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.first())
+
+    def get(self, name, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"], [query["sql"] for query in queries]
+
+    def test_fields(self):
+        """
+        Ensure ?fields= trims the rows and the selected columns
+        """
+        rows, queries = self.get("score-list", {"fields": "id,total"})
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(set(rows[0]), {"id", "total"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"grade"', queries[0])
+
+    def test_expand(self):
+        """
+        Ensure ?expand= nests the related object from the same query
+        """
+        rows, queries = self.get(
+            "score-list", {"fields": "id,student", "expand": "student"}
+        )
+
+        self.assertEqual(
+            rows[0]["student"],
+            {"id": self.students[0].pk, "usn": "1OX21CS001", "name": ""},
+        )
+        self.assertEqual(len(queries), 1)
+
+    def test_default_expand(self):
+        """
+        Ensure subject metrics nest by default and an empty ?expand= skips the joins
+        """
+        rows, _ = self.get("subject-metrics-list", {})
+        self.assertEqual(rows[0]["subject"]["sub_code"], "21CS51")
+
+        rows, queries = self.get(
+            "subject-metrics-list", {"expand": "", "fields": "id,subject,avg_score"}
+        )
+        self.assertEqual(set(rows[0]), {"id", "subject", "avg_score"})
+        self.assertIsInstance(rows[0]["subject"], int)
+        self.assertNotIn("gradesync_student", queries[0])
@@ -0,0 +1,518 @@
+from unittest import mock
+
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..metrics import RECOMPUTE, _flush_on_commit, deferred_metrics, recompute
+from ..models import (
+    Batch,
+    Department,
+    Score,
+    Section,
+    Semester,
+    SemesterMetrics,
+    Student,
+    StudentPerformance,
+    Subject,
+    SubjectMetrics,
+    User,
+)
+
+
+def metric_flushes(callbacks):
+    """The metrics flushes among on_commit callbacks (or run_on_commit entries)."""
+    return [
+        callback
+        for callback in callbacks
+        if (callback[1] if isinstance(callback, tuple) else callback)
+        is _flush_on_commit
+    ]
+
+
+class TwoStudentsTestCase(TestCase):
+    def setUp(self):
+        """
+        Create a section of two students with two subjects
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            department = Department.objects.create(dept_name="Test Department")
+            self.batch = Batch.objects.create(
+                dept=department,
+                batch_name="Test Batch",
+                batch_start_year=2021,
+                batch_end_year=2025,
+            )
+            self.semester = Semester.objects.create(batch=self.batch, semester_number=5)
+            self.section = Section.objects.create(section_name="A", batch=self.batch)
+            self.subjects = [
+                Subject.objects.create(
+                    semester=self.semester, sub_name=code, sub_code=code, credits=4
+                )
+                for code in ("21CS51", "21CS52")
+            ]
+            self.students = [
+                Student.objects.create(
+                    user=User.objects.create_user(username=usn, password="test"),
+                    batch=self.batch,
+                    section=self.section,
+                    semester=self.semester,
+                    usn=usn,
+                )
+                for usn in ("1OX21CS001", "1OX21CS002")
+            ]
+
+    def add_scores(self):
+        for student, totals in zip(self.students, [(95, 85), (30, 75)]):
+            for subject, total in zip(self.subjects, totals):
+                Score.objects.create(
+                    student=student,
+                    semester=self.semester,
+                    subject=subject,
+                    internal=0,
+                    external=total,
+                    total=total,
+                    grade="FCD" if total >= 75 else "F",
+                )
+
+
+class DeferredMetricsTests(TwoStudentsTestCase):
+    def test_metrics_recomputed_at_commit(self):
+        """
+        Ensure score saves recompute the dependent metrics once, at commit
+        """
+        self.assertEqual(self.section.__class__.objects.get().num_students, 2)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.add_scores()
+            self.assertFalse(StudentPerformance.objects.exists())
+        self.assertEqual(len(metric_flushes(callbacks)), 1)
+
+        performance = StudentPerformance.objects.get(student=self.students[1])
+        self.assertEqual((performance.total, performance.num_backlogs), (105, 1))
+        self.students[1].refresh_from_db()
+        self.assertEqual(self.students[1].num_backlogs, 1)
+
+        subject_metrics = SubjectMetrics.objects.get(subject=self.subjects[0])
+        self.assertEqual(subject_metrics.highest_scorer, self.students[0])
+        self.assertEqual(subject_metrics.fail_count, 1)
+        semester_metrics = SemesterMetrics.objects.get()
+        self.assertEqual(
+            (semester_metrics.pass_count, semester_metrics.fail_1_sub), (1, 1)
+        )
+
+    def test_each_row_recomputed_once(self):
+        """
+        Ensure every stale row is recomputed once however many scores changed
+        """
+        recompute = {kind: mock.Mock() for kind in RECOMPUTE}
+        with mock.patch.dict(RECOMPUTE, recompute):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_scores()
+
+        self.assertEqual(recompute["performance"].call_count, 2)
+        self.assertEqual(recompute["subject_metrics"].call_count, 2)
+        recompute["semester_metrics"].assert_called_once_with(
+            self.semester.id, self.section.id
+        )
+
+    def test_sections_read_once_per_flush(self):
+        """
+        Ensure score saves don't load their student, the flush reads every section at once
+        """
+        recompute = {kind: mock.Mock() for kind in RECOMPUTE}
+        with mock.patch.dict(RECOMPUTE, recompute), CaptureQueriesContext(
+            connection
+        ) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                for student in self.students:
+                    for subject in self.subjects:
+                        Score.objects.create(
+                            student_id=student.pk,
+                            semester=self.semester,
+                            subject=subject,
+                            internal=0,
+                            external=80,
+                            total=80,
+                            grade="FCD",
+                        )
+
+        student_reads = [
+            query for query in queries if 'FROM "gradesync_student"' in query["sql"]
+        ]
+        self.assertEqual(len(student_reads), 1)
+        recompute["semester_metrics"].assert_called_once_with(
+            self.semester.id, self.section.id
+        )
+
+    def test_deleted_student_recomputes_section(self):
+        """
+        Ensure deleting a student recomputes its section's metrics without it
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_scores()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[1].delete()
+
+        semester_metrics = SemesterMetrics.objects.get()
+        self.assertEqual(
+            (semester_metrics.pass_count, semester_metrics.fail_1_sub), (1, 0)
+        )
+
+    def test_deferred_block(self):
+        """
+        Ensure deferred_metrics holds recomputation until the block exits
+        """
+        recompute = {kind: mock.Mock() for kind in RECOMPUTE}
+        with mock.patch.dict(RECOMPUTE, recompute):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                registered = len(metric_flushes(connection.run_on_commit))
+                with deferred_metrics():
+                    self.add_scores()
+                    self.assertEqual(
+                        len(metric_flushes(connection.run_on_commit)), registered
+                    )
+
+        self.assertEqual(len(metric_flushes(callbacks)), 1)
+        recompute["semester_metrics"].assert_called_once()
+
+
+def metrics_snapshot():
+    return (
+        list(
+            StudentPerformance.objects.order_by("pk").values_list(
+                "total", "percentage", "sgpa", "num_backlogs", "credit_points"
+            )
+        ),
+        list(Student.objects.order_by("pk").values_list("cgpa", "num_backlogs")),
+        list(
+            SubjectMetrics.objects.order_by("pk").values(*SubjectMetrics.METRIC_FIELDS)
+        ),
+        list(
+            SemesterMetrics.objects.order_by("pk").values(
+                *SemesterMetrics.METRIC_FIELDS
+            )
+        ),
+    )
+
+
+class IncrementalMetricsTests(TwoStudentsTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_scores()
+
+    def edit_score(self, student, subject, total, grade):
+        score = Score.objects.get(student=student, subject=subject)
+        score.total, score.external, score.grade = total, total, grade
+        score.save()
+
+    def full_recompute(self):
+        keys = {
+            "performance": [
+                (student.pk, self.semester.pk) for student in self.students
+            ],
+            "student": [(student.pk,) for student in self.students],
+            "subject_metrics": [
+                (subject.pk, self.semester.pk, self.section.pk)
+                for subject in self.subjects
+            ],
+            "semester_metrics": [(self.semester.pk, self.section.pk)],
+        }
+        recompute(keys)
+        return metrics_snapshot()
+
+    def test_edit_applied_as_delta(self):
+        """
+        Ensure an edited score shifts every metric in a fixed number of queries
+        and ends up where a full recompute would
+        """
+        full = {kind: mock.Mock() for kind in list(RECOMPUTE)[:-2]}
+        with mock.patch.dict(RECOMPUTE, full):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertNumQueries(13):  # same for any section size
+                    self.edit_score(self.students[1], self.subjects[0], 62, "SC")
+        # only the batch and department rollups are rebuilt at commit
+        for recompute_row in full.values():
+            recompute_row.assert_not_called()
+
+        performance = StudentPerformance.objects.get(student=self.students[1])
+        self.assertEqual((performance.total, performance.num_backlogs), (137, 0))
+        semester_metrics = SemesterMetrics.objects.get()
+        self.assertEqual(
+            (semester_metrics.pass_count, semester_metrics.fail_1_sub), (2, 0)
+        )
+
+        incremental = metrics_snapshot()
+        self.assertEqual(incremental, self.full_recompute())
+
+    def test_highest_score_drop_recomputes(self):
+        """
+        Ensure lowering the top score falls back to recomputing the subject metrics
+        """
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.edit_score(self.students[0], self.subjects[0], 20, "F")
+        self.assertEqual(len(metric_flushes(callbacks)), 1)
+
+        subject_metrics = SubjectMetrics.objects.get(subject=self.subjects[0])
+        self.assertEqual(subject_metrics.highest_score, 30)
+        self.assertEqual(subject_metrics.highest_scorer, self.students[1])
+        self.assertEqual(metrics_snapshot(), self.full_recompute())
+
+    @override_settings(METRICS_MODE="recompute")
+    def test_recompute_mode(self):
+        """
+        Ensure METRICS_MODE = "recompute" always marks the metrics dirty
+        """
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.edit_score(self.students[1], self.subjects[0], 62, "SC")
+        self.assertEqual(len(metric_flushes(callbacks)), 1)
+        self.assertEqual(SemesterMetrics.objects.get().pass_count, 2)
+
+
+class SectionScoresTestCase(TestCase):
+    def setUp(self):
+        """
+        Create a section of three students with scores in two of three subjects
+        """
+        with deferred_metrics():
+            department = Department.objects.create(dept_name="Test Department")
+            batch = Batch.objects.create(
+                dept=department,
+                batch_name="Test Batch",
+                batch_start_year=2021,
+                batch_end_year=2025,
+            )
+            self.semester = Semester.objects.create(batch=batch, semester_number=5)
+            self.section = Section.objects.create(
+                section_name="A", batch=batch, num_students=3
+            )
+            self.subjects = [
+                Subject.objects.create(
+                    semester=self.semester, sub_name=code, sub_code=code, credits=4
+                )
+                for code in ("21CS51", "21CS52", "21CS53")
+            ]
+            self.students = [
+                Student.objects.create(
+                    user=User.objects.create_user(username=usn, password="test"),
+                    batch=batch,
+                    section=self.section,
+                    semester=self.semester,
+                    usn=usn,
+                )
+                for usn in ("1OX21CS001", "1OX21CS002", "1OX21CS003")
+            ]
+            grades = {"21CS51": [(80, "FCD"), (80, "FCD"), (0, "A")]}
+            grades["21CS52"] = [(65, "FC"), (30, "F"), (55, "SC")]
+            for subject in self.subjects[:2]:
+                for student, (total, grade) in zip(
+                    self.students, grades[subject.sub_code]
+                ):
+                    Score.objects.create(
+                        student=student,
+                        semester=self.semester,
+                        subject=subject,
+                        internal=0,
+                        external=total,
+                        total=total,
+                        grade=grade,
+                    )
+        self.section.num_students = 3
+
+
+class NaturalKeyTests(SectionScoresTestCase):
+    def test_duplicate_score_rejected(self):
+        """
+        Ensure a student can't have two scores of a subject in a semester
+        """
+        with self.assertRaises(IntegrityError):
+            Score.objects.create(
+                student=self.students[0],
+                semester=self.semester,
+                subject=self.subjects[0],
+                internal=0,
+                external=50,
+                total=50,
+                grade="SC",
+            )
+
+
+class SubjectMetricsTests(SectionScoresTestCase):
+    def test_calculate_metrics_single_query(self):
+        """
+        Ensure one subject's metrics are aggregated in a single query
+        """
+        metrics = SubjectMetrics.objects.create(
+            subject=self.subjects[0], semester=self.semester, section=self.section
+        )
+        metrics.section = self.section
+        with self.assertNumQueries(2):  # aggregate + save
+            metrics.calculate_metrics()
+
+        metrics.refresh_from_db()
+        self.assertEqual(metrics.fcd_count, 2)
+        self.assertEqual(metrics.absent_count, 1)
+        self.assertEqual(metrics.num_backlogs, 1)
+        self.assertEqual(float(metrics.avg_score), 53.33)
+        self.assertEqual(float(metrics.pass_percentage), 66.67)
+        # ties go to the first score, like the previous python loop
+        self.assertEqual(metrics.highest_score, 80)
+        self.assertEqual(metrics.highest_scorer, self.students[0])
+
+    def test_calculate_section_metrics(self):
+        """
+        Ensure every subject of the section is filled in one GROUP BY pass
+        """
+        SubjectMetrics.objects.create(
+            subject=self.subjects[1], semester=self.semester, section=self.section
+        )
+        # subjects, existing rows, aggregate, bulk create, bulk update
+        with self.assertNumQueries(5):
+            SubjectMetrics.calculate_section_metrics(self.semester, self.section)
+
+        metrics = {
+            m.subject.sub_code: m
+            for m in SubjectMetrics.objects.filter(section=self.section)
+        }
+        self.assertEqual(len(metrics), 3)
+        self.assertEqual(
+            (metrics["21CS52"].fc_count, metrics["21CS52"].fail_count), (1, 1)
+        )
+        self.assertEqual(metrics["21CS52"].highest_scorer, self.students[0])
+        self.assertEqual(metrics["21CS53"].highest_scorer, None)
+        self.assertEqual(float(metrics["21CS53"].avg_score), 0)
+
+
+class SemesterMetricsTests(SectionScoresTestCase):
+    def setUp(self):
+        """
+        Add a second section and the students' performances to the fixtures
+        """
+        super().setUp()
+        with deferred_metrics():
+            for student, sgpa in zip(self.students, [8.0, 6.5, 5.0]):
+                StudentPerformance.objects.create(
+                    student=student, semester=self.semester, sgpa=sgpa
+                )
+            self.section_b = Section.objects.create(
+                section_name="B", batch=self.semester.batch
+            )
+            Student.objects.create(
+                user=User.objects.create_user(username="1OX21CS004", password="test"),
+                batch=self.semester.batch,
+                section=self.section_b,
+                semester=self.semester,
+                usn="1OX21CS004",
+            )
+
+    def test_calculate_metrics_single_query(self):
+        """
+        Ensure the section's semester metrics take one query plus the save
+        """
+        metrics = SemesterMetrics.objects.create(
+            semester=self.semester, section=self.section
+        )
+        with self.assertNumQueries(2):
+            metrics.calculate_metrics()
+
+        metrics.refresh_from_db()
+        self.assertEqual(float(metrics.avg_sgpa), 6.5)
+        self.assertEqual(metrics.pass_count, 1)
+        self.assertEqual((metrics.fail_1_sub, metrics.fail_2_subs), (2, 0))
+        self.assertEqual(metrics.total_backlogs, 2)
+        self.assertEqual(float(metrics.pass_percentage), 33.33)
+
+    def test_calculate_semester_metrics(self):
+        """
+        Ensure every section of the semester is recomputed together
+        """
+        SemesterMetrics.objects.create(semester=self.semester, section=self.section)
+        # aggregate, existing rows, bulk create, bulk update
+        with self.assertNumQueries(4):
+            SemesterMetrics.calculate_semester_metrics(self.semester)
+
+        metrics = {
+            m.section.section_name: m
+            for m in SemesterMetrics.objects.filter(semester=self.semester)
+        }
+        self.assertEqual(metrics["A"].pass_count, 1)
+        self.assertEqual(metrics["B"].pass_count, 1)
+        self.assertEqual(float(metrics["B"].avg_sgpa), 0)
+
+
+class StudentPerformanceTests(SectionScoresTestCase):
+    def test_calculate_all(self):
+        """
+        Ensure a student's SGPA uses credit weighted grade points
+        """
+        self.semester.num_subjects = 3
+        performance = StudentPerformance.objects.create(
+            student=self.students[0], semester=self.semester
+        )
+        performance.semester = self.semester
+        with self.assertNumQueries(2):  # aggregate + save
+            performance.calculate_all()
+
+        # 80 -> 9 points, 65 -> 7 points, both 4 credits
+        self.assertEqual(performance.sgpa, 8.0)
+        self.assertEqual(performance.total, 145)
+        self.assertEqual(performance.percentage, 48.33)
+        self.assertEqual(performance.num_backlogs, 0)
+
+    def test_calculate_section(self):
+        """
+        Ensure the whole section is computed in one aggregate and bulk written
+        """
+        self.semester.num_subjects = 3
+        StudentPerformance.objects.create(
+            student=self.students[2], semester=self.semester, sgpa=9.9
+        )
+        # aggregate, existing rows, bulk create, bulk update
+        with self.assertNumQueries(4):
+            StudentPerformance.calculate_section(self.semester, self.section)
+
+        performances = {
+            p.student.usn: p
+            for p in StudentPerformance.objects.filter(semester=self.semester)
+        }
+        self.assertEqual(len(performances), 3)
+        self.assertEqual(
+            (performances["1OX21CS002"].sgpa, performances["1OX21CS002"].num_backlogs),
+            (4.5, 1),
+        )
+        # 0 (absent) and 55 -> 6 points
+        self.assertEqual(performances["1OX21CS003"].sgpa, 3.0)
+        self.assertEqual(performances["1OX21CS003"].total, 55)
+
+
+class StudentRollupTests(SectionScoresTestCase):
+    def test_bulk_rollup(self):
+        """
+        Ensure cgpa and backlogs of many students take one query and one update
+        """
+        semester_6 = Semester.objects.create(
+            batch=self.semester.batch, semester_number=6
+        )
+        for student, sgpas in zip(self.students, [(8.0, 9.0), (6.0, 0.0)]):
+            for semester, sgpa in zip((self.semester, semester_6), sgpas):
+                StudentPerformance.objects.create(
+                    student=student,
+                    semester=semester,
+                    sgpa=sgpa,
+                    num_backlogs=0 if sgpa else 2,
+                )
+
+        # aggregate + bulk update
+        with self.assertNumQueries(2):
+            count = Student.bulk_rollup(Student.objects.filter(section=self.section))
+        self.assertEqual(count, 3)
+
+        rollup = dict(
+            Student.objects.filter(section=self.section).values_list(
+                "usn", "num_backlogs"
+            )
+        )
+        self.assertEqual(rollup, {"1OX21CS001": 0, "1OX21CS002": 1, "1OX21CS003": 0})
+        self.students[0].refresh_from_db()
+        self.assertEqual(self.students[0].cgpa, 8.5)
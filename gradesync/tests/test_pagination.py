@@ -0,0 +1,104 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Score, Student, User
+from .test_metrics import SectionScoresTestCase
+
+
+class PaginationTests(SectionScoresTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.first())
+
+    def pages(self, url, params):
+        """Every page of a list, following the next links."""
+        response = self.client.get(url, params)
+        pages = [response.data]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append(response.data)
+        return pages
+
+    def score_ids(self, pages):
+        return [score["id"] for page in pages for score in page["results"]]
+
+    def test_cursor_pages(self):
+        """
+        Ensure the cursor pages of a related ordering cover every score once
+        """
+        pages = self.pages(reverse("score-list"), {"page_size": 4})
+
+        self.assertEqual([len(page["results"]) for page in pages], [4, 2])
+        expected = Score.objects.order_by("student__usn", "id")
+        self.assertEqual(self.score_ids(pages), [score.pk for score in expected])
+
+    def test_cursor_stable_under_inserts(self):
+        """
+        Ensure a student created before the cursor doesn't repeat rows
+        """
+        url = reverse("student-list")
+        first = self.client.get(url, {"page_size": 2})
+        self.assertEqual(
+            [student["usn"] for student in first.data["results"]],
+            ["1OX21CS001", "1OX21CS002"],
+        )
+
+        Student.objects.create(
+            user=User.objects.create_user(username="1OX21CS000", password="test"),
+            batch=self.section.batch,
+            section=self.section,
+            semester=self.semester,
+            usn="1OX21CS000",
+        )
+        second = self.client.get(first.data["next"])
+        self.assertEqual(
+            [student["usn"] for student in second.data["results"]], ["1OX21CS003"]
+        )
+
+    def test_keyset_pages(self):
+        """
+        Ensure keyset mode walks the scores by (usn, id) with opaque after tokens
+        """
+        pages = self.pages(
+            reverse("score-list"), {"pagination": "keyset", "page_size": 4}
+        )
+
+        self.assertEqual(len(pages), 2)
+        self.assertIsNone(pages[0]["previous"])
+        expected = Score.objects.order_by("student__usn", "id")
+        self.assertEqual(self.score_ids(pages), [score.pk for score in expected])
+
+        response = self.client.get(
+            reverse("score-list"), {"pagination": "keyset", "after": "bogus"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_null_usn(self):
+        """
+        Ensure a student without a usn is paged once in both modes
+        """
+        Student.objects.create(
+            user=User.objects.create_user(username="no-usn", password="test"),
+            batch=self.section.batch,
+            section=self.section,
+            semester=self.semester,
+            usn=None,
+        )
+        expected = set(Student.objects.values_list("pk", flat=True))
+        for params in ({}, {"ordering": "-usn"}, {"pagination": "keyset"}):
+            with self.subTest(**params):
+                pages = self.pages(reverse("student-list"), {"page_size": 1, **params})
+                ids = [student["id"] for page in pages for student in page["results"]]
+                self.assertEqual(len(ids), 4)
+                self.assertEqual(set(ids), expected)
+
+    @override_settings(MAX_PAGE_SIZE=2)
+    def test_page_size_cap(self):
+        """
+        Ensure ?page_size= is capped
+        """
+        response = self.client.get(reverse("score-list"), {"page_size": 100})
+
+        self.assertEqual(len(response.data["results"]), 2)
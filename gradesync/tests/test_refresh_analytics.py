@@ -0,0 +1,162 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..metrics import deferred_metrics, recompute
+from ..models import (
+    Batch,
+    BatchSemesterMetrics,
+    Department,
+    DepartmentSemesterMetrics,
+    Score,
+    Section,
+    Semester,
+    SemesterMetrics,
+    Student,
+    Subject,
+    User,
+)
+
+
+class RefreshAnalyticsTests(TestCase):
+    def setUp(self):
+        """
+        Create two batches of one department, the first with two sections
+        """
+        with deferred_metrics():
+            self.department = Department.objects.create(dept_name="Test Department")
+            self.batches = [
+                Batch.objects.create(
+                    dept=self.department,
+                    batch_name=f"Test Batch {year}",
+                    batch_start_year=year,
+                    batch_end_year=year + 4,
+                )
+                for year in (2021, 2022)
+            ]
+            self.semesters = [
+                Semester.objects.create(batch=batch, semester_number=5)
+                for batch in self.batches
+            ]
+            totals = {
+                (0, "A"): [(95, "FCD")],
+                (0, "B"): [(45, "SC"), (20, "F")],
+                (1, "A"): [(85, "FCD")],
+            }
+            for (index, section_name), scores in totals.items():
+                batch, semester = self.batches[index], self.semesters[index]
+                section = Section.objects.create(section_name=section_name, batch=batch)
+                subject, _ = Subject.objects.get_or_create(
+                    semester=semester, sub_name="21CS51", sub_code="21CS51", credits=4
+                )
+                for total, grade in scores:
+                    usn = (
+                        f"1OX{batch.batch_start_year % 100}CS{Score.objects.count():03}"
+                    )
+                    student = Student.objects.create(
+                        user=User.objects.create_user(username=usn, password="test"),
+                        batch=batch,
+                        section=section,
+                        semester=semester,
+                        usn=usn,
+                    )
+                    Score.objects.create(
+                        student=student,
+                        semester=semester,
+                        subject=subject,
+                        internal=0,
+                        external=total,
+                        total=total,
+                        grade=grade,
+                    )
+
+    def refresh(self, *args):
+        out = StringIO()
+        call_command("refresh_analytics", *args, stdout=out)
+        return out.getvalue()
+
+    def test_refresh_all(self):
+        """
+        Ensure the rollups combine the sections' sums instead of their averages
+        """
+        output = self.refresh()
+
+        self.assertIn("Departments: 1 rows", output)
+        self.assertEqual(SemesterMetrics.objects.count(), 3)
+        batch = BatchSemesterMetrics.objects.get(semester=self.semesters[0])
+        self.assertEqual((batch.num_sections, batch.num_students), (2, 3))
+        self.assertEqual((batch.pass_count, batch.fail_1_sub), (2, 1))
+        self.assertEqual(float(batch.avg_sgpa), 5.0)
+        self.assertEqual(float(batch.pass_percentage), 66.67)
+
+        department = DepartmentSemesterMetrics.objects.get()
+        self.assertEqual(department.semester_number, 5)
+        self.assertEqual((department.num_sections, department.num_students), (3, 4))
+        self.assertEqual(float(department.avg_sgpa), 6.0)
+        self.assertEqual(float(department.fail_percentage), 25.0)
+
+    def test_refresh_scoped_to_batch(self):
+        """
+        Ensure --batch only rebuilds that batch and rollups-only keeps the sections
+        """
+        self.refresh("--batch", str(self.batches[1].pk))
+
+        self.assertEqual(SemesterMetrics.objects.count(), 1)
+        self.assertEqual(
+            BatchSemesterMetrics.objects.get().semester_id, self.semesters[1].pk
+        )
+        self.assertEqual(DepartmentSemesterMetrics.objects.get().num_students, 1)
+
+        SemesterMetrics.objects.all().delete()
+        self.refresh("--semester", str(self.semesters[1].pk), "--rollups-only")
+        self.assertFalse(BatchSemesterMetrics.objects.exists())
+        self.assertFalse(DepartmentSemesterMetrics.objects.exists())
+
+    def test_section_recompute_refreshes_rollups(self):
+        """
+        Ensure recomputing a section's semester metrics also rebuilds its rollups
+        """
+        self.refresh()
+        section = Section.objects.get(batch=self.batches[1])
+        Score.objects.filter(student__section=section).update(total=20, grade="F")
+
+        recompute(
+            {
+                "performance": [
+                    (student.pk, self.semesters[1].pk)
+                    for student in section.student_set.all()
+                ],
+                "semester_metrics": [(self.semesters[1].pk, section.pk)],
+            }
+        )
+
+        batch = BatchSemesterMetrics.objects.get(semester=self.semesters[1])
+        self.assertEqual((batch.pass_count, float(batch.avg_sgpa)), (0, 0.0))
+        department = DepartmentSemesterMetrics.objects.get()
+        self.assertEqual((department.pass_count, float(department.avg_sgpa)), (2, 3.75))
+
+    def test_rollup_endpoints(self):
+        """
+        Ensure the rollups are listed and filtered through the API
+        """
+        self.refresh()
+        client = APIClient()
+        client.force_authenticate(User.objects.first())
+
+        response = client.get(
+            reverse("batch-metrics-list"), {"batch": self.batches[0].pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["num_students"], 3)
+
+        response = client.get(
+            reverse("department-metrics-list"),
+            {"department": self.department.pk, "semester_number": 5},
+        )
+        self.assertEqual(response.data["results"][0]["avg_sgpa"], "6.00")
+        response = client.post(reverse("department-metrics-list"), {})
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,225 @@
+import time
+from unittest import mock
+
+import redis
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from utils import redis_conn, response_cache
+
+from ..models import Score, StudentPerformance, User
+from .test_metrics import SectionScoresTestCase
+
+
+class FakeRedis:
+    """The few Redis commands the response cache uses, kept in a dict."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+
+    def execute(self):
+        pass
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.data):
+            self.data[key] = value
+
+
+class ResponseCacheTests(SectionScoresTestCase):
+    def setUp(self):
+        super().setUp()
+        StudentPerformance.calculate_section(self.semester, self.section)
+        # the test transaction never commits the fixtures' invalidations
+        vars(response_cache._pending).clear()
+        vars(response_cache._bump_on_commit._state).clear()
+        response_cache._missed = 0
+        response_cache._down_until = 0.0
+        self.redis = FakeRedis()
+        patcher = mock.patch.object(
+            response_cache, "get_cache_connection", return_value=self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, response_cache, "_down_until", 0.0)
+        self.addCleanup(setattr, response_cache, "_missed", 0)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.first())
+        self.url = reverse(
+            "get-scores",
+            kwargs={"section_id": self.section.pk, "semester_id": self.semester.pk},
+        )
+
+    def test_cache_hit(self):
+        """
+        Ensure a repeated read is served from the cache without queries
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.json(), response.json())
+
+    def test_score_edit_invalidates(self):
+        """
+        Ensure editing a score makes the next read see the new total
+        """
+        self.client.get(self.url)
+        score = Score.objects.get(student=self.students[0], subject=self.subjects[0])
+        score.internal, score.total = score.internal + 10, score.total + 10
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()[0]["scores"][0]["total"], score.total)
+
+    def test_student_edit_invalidates(self):
+        """
+        Ensure renaming or deactivating a student makes the next read see it
+        """
+        self.client.get(self.url)
+        student = self.students[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            student.user.first_name = "Renamed"
+            student.user.save()
+        self.assertEqual(self.client.get(self.url).json()[0]["name"], "Renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student.active = False
+            student.save()
+        self.assertEqual(len(self.client.get(self.url).json()), 2)
+
+    def test_subject_edit_invalidates(self):
+        """
+        Ensure renaming a subject reaches the cached responses of its students
+        """
+        url = reverse("get-scores", kwargs={"student_id": self.students[0].pk})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subjects[0].sub_name = "Renamed"
+            self.subjects[0].save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.json()[0]["scores"][0]["subject_name"], "Renamed")
+
+    def test_login_doesnt_invalidate(self):
+        """
+        Ensure saving a user's last login leaves the cache alone
+        """
+        before = dict(self.redis.data)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].user.save(update_fields=["last_login"])
+        self.assertEqual(self.redis.data, before)
+
+    def test_conditional_get(self):
+        """
+        Ensure a matching If-None-Match gets a 304 without queries until a write
+        """
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        score = Score.objects.get(student=self.students[0], subject=self.subjects[0])
+        score.internal, score.total = score.internal + 10, score.total + 10
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_expires_with_the_cache(self):
+        """
+        Ensure a 304 needs the response still cached and the same deploy version
+        """
+        etag = self.client.get(self.url)["ETag"]
+        with override_settings(RESPONSE_CACHE_VERSION="next-release"):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # the cached responses expire, the tag versions don't
+        for key in [key for key in self.redis.data if key.count(":") == 1]:
+            del self.redis.data[key]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_redis_errors_fail_open(self):
+        """
+        Ensure a failing Redis serves the response from the database
+        """
+        self.redis.mget = mock.Mock(side_effect=redis.ConnectionError("down"))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_lost_bump_is_made_up(self):
+        """
+        Ensure a bump failing while Redis is down still invalidates once it's back
+        """
+        etag = self.client.get(self.url)["ETag"]
+        self.redis.pipeline = mock.Mock(side_effect=redis.ConnectionError("down"))
+        score = Score.objects.get(student=self.students[0], subject=self.subjects[0])
+        score.internal, score.total = score.internal + 10, score.total + 10
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+
+        del self.redis.pipeline
+        response_cache._down_until = 0.0
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["scores"][0]["total"], score.total)
+
+    def test_bump_skipped_while_down(self):
+        """
+        Ensure writes don't wait on a failing Redis, their bumps are made up later
+        """
+        etag = self.client.get(self.url)["ETag"]
+        response_cache._down_until = time.monotonic() + 60
+        self.redis.pipeline = mock.Mock(side_effect=AssertionError("called"))
+        score = Score.objects.get(student=self.students[0], subject=self.subjects[0])
+        score.internal, score.total = score.internal + 10, score.total + 10
+        with self.captureOnCommitCallbacks(execute=True):
+            score.save()
+
+        del self.redis.pipeline
+        response_cache._down_until = 0.0
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["scores"][0]["total"], score.total)
+
+    @override_settings(REDIS_CACHE_TIMEOUT=0.1)
+    def test_cache_connection_times_out(self):
+        """
+        Ensure the cache's Redis client gives up quickly on a hanging server
+        """
+        with mock.patch.object(redis_conn, "_cache_connection", None):
+            kwargs = redis_conn.get_cache_connection().connection_pool.connection_kwargs
+        self.assertEqual(kwargs["socket_connect_timeout"], 0.1)
+        self.assertEqual(kwargs["socket_timeout"], 0.1)
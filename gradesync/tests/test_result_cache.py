@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from utils.result_cache import (
+    content_hash,
+    get_cached_result,
+    get_cached_results,
+    store_result,
+)
+from utils.scraper_drf import fetch_student_result, scrape_students
+
+from ..models import ScrapeResultCache
+
+URL = "https://results.vtu.ac.in/JJEcbcs24/index.php"
+PAYLOAD = {"Marks": [{"Subject Code": "21CS51", "TOT": "85", "Result": "P"}]}
+
+
+@override_settings(SCRAPE_CACHE_TTL=3600)
+class ResultCacheTests(TestCase):
+    def test_store_and_get(self):
+        """
+        Ensure a stored payload is returned for the same USN and result url only
+        """
+        store_result("1OX21CS001", URL, PAYLOAD)
+        self.assertEqual(get_cached_result("1OX21CS001", URL), PAYLOAD)
+        self.assertIsNone(get_cached_result("1OX21CS001", URL + "?other"))
+        self.assertEqual(
+            get_cached_results(["1OX21CS001", "1OX21CS002"], URL),
+            {"1OX21CS001": PAYLOAD},
+        )
+
+    def test_expired_entry_is_ignored(self):
+        """
+        Ensure entries older than SCRAPE_CACHE_TTL are not served
+        """
+        store_result("1OX21CS001", URL, PAYLOAD)
+        ScrapeResultCache.objects.update(fetched_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNone(get_cached_result("1OX21CS001", URL))
+
+    def test_purge_expired(self):
+        """
+        Ensure purge_scrape_cache deletes the expired entries only
+        """
+        store_result("1OX21CS001", URL, PAYLOAD)
+        store_result("1OX21CS002", URL, PAYLOAD)
+        ScrapeResultCache.objects.filter(usn="1OX21CS001").update(
+            fetched_at=timezone.now() - timedelta(hours=2)
+        )
+
+        out = StringIO()
+        call_command("purge_scrape_cache", stdout=out)
+
+        self.assertIn("Deleted 1 cached results", out.getvalue())
+        self.assertEqual(
+            list(ScrapeResultCache.objects.values_list("usn", flat=True)),
+            ["1OX21CS002"],
+        )
+
+    def test_store_updates_changed_payload(self):
+        """
+        Ensure storing again keeps a single row with the latest content hash
+        """
+        store_result("1OX21CS001", URL, PAYLOAD)
+        store_result("1OX21CS001", URL, PAYLOAD)
+        changed = {"Marks": []}
+        store_result("1OX21CS001", URL, changed)
+
+        entry = ScrapeResultCache.objects.get()
+        self.assertEqual(entry.payload, changed)
+        self.assertEqual(entry.content_hash, content_hash(changed))
+
+    @override_settings(SCRAPER_BACKEND="http")
+    @mock.patch("utils.scraper_drf.scrape_student", return_value=(PAYLOAD, 0))
+    def test_scrape_students_only_scrapes_misses(self, scrape_student):
+        """
+        Ensure cached USNs are not scraped again and new results are cached
+        """
+        store_result("1OX21CS001", URL, PAYLOAD)
+        students = [
+            SimpleNamespace(usn="1OX21CS001"),
+            SimpleNamespace(usn="1OX21CS002"),
+        ]
+
+        results = list(scrape_students(students, URL))
+
+        self.assertEqual(len(results), 2)
+        scrape_student.assert_called_once_with("1OX21CS002", URL)
+        self.assertEqual(get_cached_result("1OX21CS002", URL), PAYLOAD)
+
+    @mock.patch("utils.scraper_drf.scrape_student", return_value=(None, 1))
+    def test_failed_scrape_is_not_cached(self, scrape_student):
+        """
+        Ensure only successful scrapes are cached and use_cache=False bypasses it
+        """
+        self.assertEqual(fetch_student_result("1OX21CS999", URL), (None, 1))
+        self.assertFalse(ScrapeResultCache.objects.exists())
+
+        store_result("1OX21CS001", URL, PAYLOAD)
+        fetch_student_result("1OX21CS001", URL, use_cache=False)
+        self.assertEqual(scrape_student.call_count, 2)
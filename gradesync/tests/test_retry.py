@@ -0,0 +1,171 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from utils import retry
+from utils.retry import CircuitBreaker, requeue_failures
+from utils.scraper_http import scrape_result_http
+
+from ..models import User
+from .test_scraper_http import RESULT_HTML, FakeSession
+
+COOLDOWN_ALERT_HTML = "<script>alert('Please check website after 2 hour !!!');</script>"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(base_delay=60, max_delay=200, clock=self.clock)
+
+    def test_backoff_doubles_and_resets(self):
+        """
+        Ensure consecutive cooldowns double the pause up to max_delay
+        """
+        self.assertEqual(self.breaker.remaining(), 0)
+        for delay in (60, 120, 200):
+            self.breaker.record(3)
+            self.assertEqual(self.breaker.remaining(), delay)
+            self.clock.now += delay
+
+        self.breaker.record(0)
+        self.breaker.record(3)
+        self.assertEqual(self.breaker.remaining(), 60)
+
+    def test_cooldowns_while_open_trip_once(self):
+        """
+        Ensure scrapes that hit the same cooldown don't lengthen the pause
+        """
+        self.breaker.record(3)
+        self.clock.now += 10
+        self.breaker.record(3)
+        self.assertEqual(self.breaker.trips, 1)
+        self.assertEqual(self.breaker.remaining(), 50)
+
+    def test_captcha_failure_leaves_breaker_closed(self):
+        """
+        Ensure only a cooldown opens the breaker
+        """
+        self.breaker.record(2)
+        self.breaker.record(4)
+        self.breaker.record(5)
+        self.assertEqual(self.breaker.remaining(), 0)
+
+
+class GetCircuitBreakerTests(SimpleTestCase):
+    @override_settings(SCRAPE_COOLDOWN_MAX_BACKOFF=3600, SCRAPE_JOB_STALE_AFTER=900)
+    def test_backoff_capped_below_stale_window(self):
+        """
+        Ensure the longest pause stays below the scrape job stale window
+        """
+        with mock.patch.object(retry, "_breaker", None):
+            self.assertEqual(retry.get_circuit_breaker().max_delay, 450)
+
+
+class RequeueFailuresTests(SimpleTestCase):
+    def test_failures_are_scraped_again_at_the_end(self):
+        """
+        Ensure transient failures are requeued after every other student
+        """
+        students = [SimpleNamespace(usn=usn) for usn in ("A", "B", "C")]
+        codes = {"A": [3, 0], "B": [0], "C": [1]}
+        calls = []
+
+        def scrape(pending):
+            calls.append([s.usn for s in pending])
+            for student in pending:
+                yield student, None, codes[student.usn].pop(0)
+
+        results = list(requeue_failures(scrape, students, rounds=1))
+        self.assertEqual(calls, [["A", "B", "C"], ["A"]])
+        self.assertEqual(
+            [(s.usn, code) for s, _, code in results], [("B", 0), ("C", 1), ("A", 0)]
+        )
+
+    def test_last_round_result_is_kept(self):
+        """
+        Ensure a student still failing after every round is yielded with its code
+        """
+        student = SimpleNamespace(usn="A")
+
+        def scrape(pending):
+            for s in pending:
+                yield s, None, 2
+
+        self.assertEqual(
+            list(requeue_failures(scrape, [student], rounds=2)), [(student, None, 2)]
+        )
+
+
+@mock.patch("utils.trueCaptcha.solve_captcha", return_value="a1b2c3")
+class CooldownScrapeTests(SimpleTestCase):
+    def test_cooldown_is_not_retried_in_place(self, solver):
+        """
+        Ensure a cooldown returns status 3 at once instead of using captcha retries
+        """
+        session = FakeSession([COOLDOWN_ALERT_HTML, RESULT_HTML])
+        self.assertEqual(
+            scrape_result_http(
+                "1OX21CS001", "https://results.vtu.ac.in/index.php", session=session
+            ),
+            (None, 3),
+        )
+        self.assertEqual(len(session.posted), 1)
+
+    def test_network_error_is_not_a_cooldown(self, solver):
+        """
+        Ensure a failed request returns status 5, which doesn't trip the breaker
+        """
+        session = FakeSession([])
+        session.post = mock.Mock(side_effect=requests.ConnectionError("reset"))
+        self.assertEqual(
+            scrape_result_http(
+                "1OX21CS001", "https://results.vtu.ac.in/index.php", session=session
+            ),
+            (None, 5),
+        )
+
+
+class IdentifySubjectsCooldownTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(username="testuser", password="test")
+        )
+        self.breaker = CircuitBreaker(base_delay=60, max_delay=200)
+        patcher = mock.patch(
+            "utils.scraper_drf.get_circuit_breaker", return_value=self.breaker
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch("gradesync.serializers.check_url")
+    @mock.patch("utils.scraper_drf.scrape_student_once")
+    def test_open_breaker_fails_fast(self, scrape, check_url):
+        """
+        Ensure a request is answered 503 with Retry-After instead of waiting
+        """
+        self.breaker.record(3)
+        response = self.client.post(
+            reverse("identify-subjects"),
+            {
+                "usn": "1OX21CS001",
+                "result_url": "https://results.vtu.ac.in/index.php",
+                "use_cache": False,
+            },
+        )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "60")
+        scrape.assert_not_called()
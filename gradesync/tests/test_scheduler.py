@@ -0,0 +1,106 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from utils.scheduler import HostRateLimiter, ScrapeScheduler
+
+
+class ScrapeSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = ScrapeScheduler(
+            workers=4,
+            section_concurrency=2,
+            max_sections=2,
+            rate_limiter=HostRateLimiter(min_interval=0),
+        )
+        self.students = [SimpleNamespace(usn=f"1OX21CS{i:03}") for i in range(6)]
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_scrape_yields_every_student(self):
+        """
+        Ensure every student is scraped exactly once and yielded with its result
+        """
+        results = list(
+            self.scheduler.scrape(
+                self.students,
+                "https://results.vtu.ac.in/index.php",
+                scrape_fn=lambda usn, url: ({"Marks": [usn]}, 0),
+            )
+        )
+        self.assertEqual(len(results), len(self.students))
+        for student, score, code in results:
+            self.assertEqual(score, {"Marks": [student.usn]})
+            self.assertEqual(code, 0)
+
+    def test_on_idle(self):
+        """
+        Ensure on_idle is called on the calling thread while no scrape finishes
+        """
+        idle_threads = []
+
+        def slow_scrape(usn, url):
+            time.sleep(0.2)
+            return None, 0
+
+        results = list(
+            self.scheduler.scrape(
+                self.students[:1],
+                "https://results.vtu.ac.in/index.php",
+                scrape_fn=slow_scrape,
+                on_idle=lambda: idle_threads.append(threading.current_thread()),
+                idle_interval=0.05,
+            )
+        )
+        self.assertEqual(len(results), 1)
+        self.assertGreaterEqual(len(idle_threads), 2)
+        self.assertEqual(set(idle_threads), {threading.current_thread()})
+
+    def test_section_concurrency_limit(self):
+        """
+        Ensure no more than section_concurrency students are in flight at once
+        """
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def scrape_fn(usn, url):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+            return None, 1
+
+        list(self.scheduler.scrape(self.students, "https://vtu", scrape_fn))
+        self.assertEqual(state["peak"], 2)
+
+    def test_scrape_propagates_errors(self):
+        """
+        Ensure an exception in a worker is raised to the consumer
+        """
+
+        def scrape_fn(usn, url):
+            raise ValueError("captcha config missing")
+
+        with self.assertRaises(ValueError):
+            list(self.scheduler.scrape(self.students, "https://vtu", scrape_fn))
+
+
+class HostRateLimiterTests(SimpleTestCase):
+    def test_spaces_requests_per_host(self):
+        """
+        Ensure requests to the same host are spaced by min_interval
+        """
+        limiter = HostRateLimiter(min_interval=0.05)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait("https://results.vtu.ac.in/a")
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+        start = time.monotonic()
+        limiter.wait("https://other.example.com/")
+        self.assertLess(time.monotonic() - start, 0.05)
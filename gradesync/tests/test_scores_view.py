@@ -0,0 +1,76 @@
+import json
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Score, Student, StudentPerformance, User
+from .test_metrics import SectionScoresTestCase
+
+
+class SectionScoresViewTests(SectionScoresTestCase):
+    def setUp(self):
+        super().setUp()
+        StudentPerformance.calculate_section(self.semester, self.section)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.first())
+        self.url = reverse(
+            "get-scores",
+            kwargs={"section_id": self.section.pk, "semester_id": self.semester.pk},
+        )
+
+    def test_scores_by_section(self):
+        """
+        Ensure every active student is listed with their performance and scores
+        """
+        Student.objects.filter(pk=self.students[2].pk).update(active=False)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["usn"] for row in response.data], ["1OX21CS001", "1OX21CS002"]
+        )
+        first = response.data[0]
+        self.assertEqual((first["total"], first["sgpa"]), (145, 8.0))
+        self.assertEqual(
+            [(score["subject_code"], score["total"]) for score in first["scores"]],
+            [("21CS51", 80), ("21CS52", 65)],
+        )
+
+    def test_query_count_independent_of_section_size(self):
+        """
+        Ensure the endpoint runs a fixed number of queries however many students
+        """
+        with self.assertNumQueries(4):  # section, semester, students, scores
+            self.client.get(self.url)
+
+        student = Student.objects.create(
+            user=User.objects.create_user(username="1OX21CS004", password="test"),
+            batch=self.section.batch,
+            section=self.section,
+            semester=self.semester,
+            usn="1OX21CS004",
+        )
+        Score.objects.create(
+            student=student,
+            semester=self.semester,
+            subject=self.subjects[0],
+            internal=0,
+            external=90,
+            total=90,
+            grade="FCD",
+        )
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 4)
+        self.assertIsNone(response.data[3]["sgpa"])
+
+    def test_streamed_response(self):
+        """
+        Ensure ?stream=true streams the same rows as the buffered response
+        """
+        response = self.client.get(self.url, {"stream": "true"})
+
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(streamed, json.loads(self.client.get(self.url).content))
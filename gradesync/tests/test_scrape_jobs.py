@@ -0,0 +1,311 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from utils import response_cache
+from utils.retry import CircuitBreaker
+from utils.scraper_drf import (
+    add_scores,
+    build_scores,
+    checkpoint_scores,
+    create_scrape_job,
+    resumable_scrape_jobs,
+    scrape_bg_task,
+    semester_subjects,
+    upsert_scores,
+)
+
+from ..models import (
+    Batch,
+    Department,
+    Score,
+    ScrapeJob,
+    ScrapeJobItem,
+    Section,
+    Semester,
+    Student,
+    Subject,
+    User,
+)
+from ..tasks import recompute_metrics_task, run_scrape_job, scrape_job_task
+
+URL = "https://results.vtu.ac.in/JJEcbcs24/index.php"
+MARKS = {
+    "Marks": [
+        {"Subject Code": "21CS51", "INT": "40", "EXT": "45", "TOT": "85", "Result": "P"}
+    ]
+}
+
+
+def fake_scrape_students(students, result_url, use_cache=True, on_idle=None):
+    for student in students:
+        if student.usn == "1OX21CS003":
+            yield student, None, 1
+        else:
+            yield student, MARKS, 0
+
+
+@mock.patch("gradesync.tasks.dispatch")
+@mock.patch("utils.scraper_drf.upsert_scores")
+@mock.patch("utils.scraper_drf.log_scraping_errors")
+@mock.patch("utils.scraper_drf.incr_scraping_progress")
+@mock.patch("utils.scraper_drf.reset_scraping_redis_key")
+@mock.patch("utils.scraper_drf.init_scraping_redis_key", return_value="redis-name")
+class ScrapeJobTests(TestCase):
+    def setUp(self):
+        """
+        Create a section of three students to scrape
+        """
+        department = Department.objects.create(dept_name="Test Department")
+        self.batch = Batch.objects.create(
+            dept=department,
+            batch_name="Test Batch",
+            batch_start_year=2021,
+            batch_end_year=2025,
+        )
+        self.semester = Semester.objects.create(batch=self.batch, semester_number=5)
+        self.section = Section.objects.create(section_name="A", batch=self.batch)
+        Subject.objects.create(
+            semester=self.semester, sub_name="21CS51", sub_code="21CS51", credits=4
+        )
+        for i in range(1, 4):
+            usn = f"1OX21CS00{i}"
+            Student.objects.create(
+                user=User.objects.create_user(username=usn, password="test"),
+                batch=self.batch,
+                section=self.section,
+                semester=self.semester,
+                usn=usn,
+            )
+
+    @mock.patch("utils.scraper_drf.scrape_students", side_effect=fake_scrape_students)
+    def test_resume_scrapes_only_unfinished_students(self, scrape_students, *mocks):
+        """
+        Ensure a resumed job skips students that were checkpointed as done
+        """
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+        self.assertEqual(job.items.filter(state=ScrapeJobItem.PENDING).count(), 3)
+
+        # simulate a crash after the first student was scraped
+        job.items.filter(student__usn="1OX21CS001").update(state=ScrapeJobItem.DONE)
+        job.items.filter(student__usn="1OX21CS002").update(
+            state=ScrapeJobItem.IN_FLIGHT
+        )
+        ScrapeJob.objects.filter(pk=job.pk).update(status=ScrapeJob.RUNNING)
+
+        scrape_bg_task(job.id)
+
+        upsert_scores = mocks[-2]
+        upsert_scores.assert_called_once()
+        self.assertEqual(len(upsert_scores.call_args.args[0]), 1)
+        students = scrape_students.call_args.args[0]
+        self.assertEqual(
+            sorted(student.usn for student in students), ["1OX21CS002", "1OX21CS003"]
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScrapeJob.COMPLETED)
+        self.assertEqual(
+            dict(job.items.values_list("student__usn", "state")),
+            {
+                "1OX21CS001": ScrapeJobItem.DONE,
+                "1OX21CS002": ScrapeJobItem.DONE,
+                "1OX21CS003": ScrapeJobItem.FAILED,
+            },
+        )
+
+    @mock.patch("utils.scraper_drf.scrape_students", side_effect=fake_scrape_students)
+    def test_checkpoints_before_a_chunk_fills(self, scrape_students, *mocks):
+        """
+        Ensure students are checkpointed every few students or seconds, not per chunk
+        """
+        # checkpointed students per checkpoint, the run ends with a final one
+        for setting, sizes in (
+            ({"SCRAPE_CHECKPOINT_STUDENTS": 2}, [2, 1]),
+            ({"SCRAPE_CHECKPOINT_INTERVAL": 0}, [1, 1, 1, 0]),
+        ):
+            job = create_scrape_job(self.batch, self.semester, self.section, URL)
+            with self.subTest(**setting), override_settings(**setting), mock.patch(
+                "utils.scraper_drf.checkpoint_scores", wraps=checkpoint_scores
+            ) as checkpoint:
+                scrape_bg_task(job.id)
+                self.assertEqual(
+                    [len(call.args[1]) for call in checkpoint.call_args_list], sizes
+                )
+
+    @mock.patch("utils.scraper_drf.scrape_students", side_effect=RuntimeError("boom"))
+    def test_failed_job_keeps_checkpoints(self, scrape_students, *mocks):
+        """
+        Ensure a job that raised is marked failed and its students stay resumable
+        """
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+        with mock.patch("utils.scraper_drf.change_stop_field") as change_stop_field:
+            scrape_bg_task(job.id)
+        change_stop_field.assert_called_once_with(name="redis-name", value="boom")
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ScrapeJob.FAILED, "boom"))
+        self.assertEqual(job.items.filter(state=ScrapeJobItem.IN_FLIGHT).count(), 3)
+
+    def test_resumable_jobs(self, *mocks):
+        """
+        Ensure only jobs without recent progress are considered interrupted
+        """
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+        self.assertFalse(resumable_scrape_jobs(60).exists())
+
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        ScrapeJob.objects.filter(pk=job.pk).update(updated_at=an_hour_ago)
+        job.items.update(updated_at=an_hour_ago)
+        self.assertEqual(list(resumable_scrape_jobs(60)), [job])
+
+        ScrapeJob.objects.filter(pk=job.pk).update(status=ScrapeJob.COMPLETED)
+        self.assertFalse(resumable_scrape_jobs(60).exists())
+
+    @mock.patch("utils.scraper_drf.get_circuit_breaker")
+    def test_cooldown_keeps_job_alive(self, get_circuit_breaker, *mocks):
+        """
+        Ensure a job paused by a long cooldown isn't picked up as abandoned
+        """
+        breaker = CircuitBreaker(base_delay=3600, max_delay=3600)
+        breaker.record(3)
+        get_circuit_breaker.return_value = breaker
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+
+        def scrape_through_cooldown(students, result_url, use_cache, on_idle):
+            # nothing finished for an hour, only the idle callback ran
+            an_hour_ago = timezone.now() - timedelta(hours=1)
+            ScrapeJob.objects.filter(pk=job.pk).update(updated_at=an_hour_ago)
+            job.items.update(updated_at=an_hour_ago)
+            on_idle()
+            self.assertFalse(resumable_scrape_jobs(15 * 60).exists())
+            yield from fake_scrape_students(students, result_url)
+
+        with mock.patch(
+            "utils.scraper_drf.scrape_students", side_effect=scrape_through_cooldown
+        ):
+            scrape_bg_task(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScrapeJob.COMPLETED)
+
+    @override_settings(TASK_MAX_ATTEMPTS=3, TASK_RETRY_BACKOFF=60)
+    @mock.patch("gradesync.tasks.dispatch_later")
+    @mock.patch("utils.scraper_drf.change_stop_field")
+    @mock.patch("utils.scraper_drf.scrape_students", side_effect=RuntimeError("boom"))
+    def test_task_retries_with_backoff(
+        self, scrape_students, change_stop_field, dispatch_later, *mocks
+    ):
+        """
+        Ensure a failing scrape task is rescheduled with a doubling delay
+        """
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+
+        self.assertEqual(scrape_job_task(job.id), ScrapeJob.PENDING)
+        dispatch_later.assert_called_with(scrape_job_task, 60, job.id, attempt=2)
+        self.assertEqual(scrape_job_task(job.id, attempt=2), ScrapeJob.PENDING)
+        dispatch_later.assert_called_with(scrape_job_task, 120, job.id, attempt=3)
+        change_stop_field.assert_not_called()
+
+        self.assertEqual(scrape_job_task(job.id, attempt=3), ScrapeJob.FAILED)
+        self.assertEqual(dispatch_later.call_count, 2)
+        change_stop_field.assert_called_once()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 3)
+
+    @mock.patch("utils.scraper_drf.scrape_students", side_effect=fake_scrape_students)
+    def test_metrics_recomputed_once_per_job(self, scrape_students, *mocks):
+        """
+        Ensure section metrics are queued once at the end instead of per student
+        """
+        dispatch = mocks[-1]
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+        run_scrape_job(job.id)
+        dispatch.assert_called_once_with(
+            recompute_metrics_task, self.semester.id, self.section.id
+        )
+
+    @mock.patch("gradesync.tasks.purge_expired")
+    @mock.patch("utils.scraper_drf.scrape_students", side_effect=fake_scrape_students)
+    def test_completed_job_purges_result_cache(self, scrape_students, purge, *mocks):
+        """
+        Ensure a completed job drops the expired cached results
+        """
+        job = create_scrape_job(self.batch, self.semester, self.section, URL)
+        run_scrape_job(job.id)
+        purge.assert_called_once_with()
+
+
+class UpsertScoresTests(TestCase):
+    def setUp(self):
+        """
+        Create a section of three students and a subject
+        """
+        department = Department.objects.create(dept_name="Test Department")
+        batch = Batch.objects.create(
+            dept=department,
+            batch_name="Test Batch",
+            batch_start_year=2021,
+            batch_end_year=2025,
+        )
+        self.semester = Semester.objects.create(batch=batch, semester_number=5)
+        section = Section.objects.create(section_name="A", batch=batch)
+        Subject.objects.create(
+            semester=self.semester, sub_name="21CS51", sub_code="21CS51", credits=4
+        )
+        self.students = [
+            Student.objects.create(
+                user=User.objects.create_user(username=usn, password="test"),
+                batch=batch,
+                section=section,
+                semester=self.semester,
+                usn=usn,
+            )
+            for usn in ("1OX21CS001", "1OX21CS002", "1OX21CS003")
+        ]
+
+    def test_section_upserted_in_one_statement(self):
+        """
+        Ensure a section's scores are written in one statement, without reads
+        """
+        subjects = semester_subjects(self.semester)
+        scores = [
+            score
+            for student in self.students
+            for score in build_scores(self.semester, student, MARKS["Marks"], subjects)
+        ]
+        with self.assertNumQueries(1):
+            upsert_scores(scores)
+        self.assertEqual(Score.objects.count(), 3)
+
+    @mock.patch("utils.response_cache.bump")
+    def test_invalidated_after_commit(self, bump):
+        """
+        Ensure the cached responses are invalidated once the scores are committed
+        """
+        vars(response_cache._pending).clear()
+        vars(response_cache._bump_on_commit._state).clear()
+        scores = build_scores(
+            self.semester,
+            self.students[0],
+            MARKS["Marks"],
+            semester_subjects(self.semester),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_scores(scores)
+            bump.assert_not_called()
+
+        bump.assert_called_once()
+        self.assertIn(f"semester:{self.semester.pk}", bump.call_args.args[0])
+        self.assertIn(f"student:{self.students[0].pk}", bump.call_args.args[0])
+
+    def test_rescrape_overwrites_scores(self):
+        """
+        Ensure scraping a student again updates the existing score in place
+        """
+        add_scores(self.semester, self.students[0], MARKS["Marks"])
+        failed = [dict(MARKS["Marks"][0], EXT="0", TOT="40", Result="F")]
+        add_scores(self.semester, self.students[0], failed)
+
+        score = Score.objects.get()
+        self.assertEqual((score.external, score.total, score.grade), (0, 40, "F"))
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+
+from utils.captcha_solvers import CaptchaSolveError
+from utils.scheduler import HostRateLimiter, get_rate_limiter, get_scheduler
+from utils.scraper_async import AsyncScrapePipeline, scrape_students_async
+from utils.trueCaptcha import TrueCaptchaConfigError
+
+from .test_scraper_http import INDEX_HTML, RESULT_HTML, USN_ALERT_HTML
+
+
+def vtu_handler(request):
+    if request.url.path.endswith("vtu_captcha.php"):
+        return httpx.Response(200, content=b"png-bytes")
+    if request.method == "POST":
+        usn = dict(httpx.QueryParams(request.content.decode()))["lns"]
+        html = USN_ALERT_HTML if usn.endswith("999") else RESULT_HTML
+        return httpx.Response(200, text=html)
+    return httpx.Response(200, text=INDEX_HTML)
+
+
+async def fake_solver(image_bytes, client):
+    return "a1b2c3"
+
+
+class AsyncScrapePipelineTests(SimpleTestCase):
+    url = "https://results.vtu.ac.in/JJEcbcs24/index.php"
+
+    def setUp(self):
+        self.pipeline = AsyncScrapePipeline(
+            in_flight=4,
+            fetch_limit=2,
+            captcha_limit=2,
+            parse_limit=1,
+            rate_limiter=HostRateLimiter(min_interval=0),
+            transport=httpx.MockTransport(vtu_handler),
+        )
+
+    @mock.patch("utils.trueCaptcha.solve_captcha_async", side_effect=fake_solver)
+    def test_scrape_students_async(self, solver):
+        """
+        Ensure every student is scraped concurrently and yielded with its status
+        """
+        students = [SimpleNamespace(usn=f"1OX21CS00{i}") for i in range(5)]
+        students.append(SimpleNamespace(usn="1OX21CS999"))
+
+        results = {
+            student.usn: (score, code)
+            for student, score, code in scrape_students_async(
+                students, self.url, pipeline=self.pipeline
+            )
+        }
+
+        self.assertEqual(len(results), 6)
+        self.assertEqual(results["1OX21CS999"], (None, 1))
+        score, code = results["1OX21CS001"]
+        self.assertEqual(code, 0)
+        self.assertEqual(
+            [mark["Subject Code"] for mark in score["Marks"]], ["21CS51", "21CS52"]
+        )
+        self.assertEqual(solver.call_count, 6)
+
+    @mock.patch(
+        "utils.trueCaptcha.solve_captcha_async", side_effect=TrueCaptchaConfigError()
+    )
+    def test_missing_captcha_config_is_raised(self, solver):
+        """
+        Ensure a captcha configuration error stops the whole run
+        """
+        students = [SimpleNamespace(usn="1OX21CS001")]
+        with self.assertRaises(TrueCaptchaConfigError):
+            list(scrape_students_async(students, self.url, pipeline=self.pipeline))
+
+    def test_unsolvable_captcha(self):
+        """
+        Ensure a captcha that can't be solved twice in a row returns status 2
+        """
+        with mock.patch.object(
+            self.pipeline.solver,
+            "solve_async",
+            side_effect=CaptchaSolveError("unreadable"),
+        ) as solve:
+            results = list(
+                scrape_students_async(
+                    [SimpleNamespace(usn="1OX21CS001")],
+                    self.url,
+                    pipeline=self.pipeline,
+                )
+            )
+
+        self.assertEqual([(score, code) for _, score, code in results], [(None, 2)])
+        self.assertEqual(solve.call_count, 2)
+
+    @mock.patch("utils.trueCaptcha.solve_captcha_async", side_effect=fake_solver)
+    def test_captcha_fetch_is_rate_limited(self, solver):
+        """
+        Ensure the captcha image is fetched through the rate limiter too
+        """
+        with mock.patch.object(
+            self.pipeline.rate_limiter, "reserve", return_value=0
+        ) as reserve:
+            list(
+                scrape_students_async(
+                    [SimpleNamespace(usn="1OX21CS001")],
+                    self.url,
+                    pipeline=self.pipeline,
+                )
+            )
+
+        urls = [call.args[0] for call in reserve.call_args_list]
+        self.assertEqual(len(urls), 3)
+        self.assertTrue(any(url.endswith("vtu_captcha.php?_CAPTCHA") for url in urls))
+
+    def test_rate_limiter_is_process_wide(self):
+        """
+        Ensure every pipeline shares the threaded scheduler's rate limiter
+        """
+        first = AsyncScrapePipeline.from_settings()
+        second = AsyncScrapePipeline.from_settings()
+        self.assertIs(first.rate_limiter, second.rate_limiter)
+        self.assertIs(first.rate_limiter, get_rate_limiter())
+        self.assertIs(get_scheduler().rate_limiter, get_rate_limiter())
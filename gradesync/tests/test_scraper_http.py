@@ -0,0 +1,213 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils.captcha_solvers import CaptchaSolveError
+from utils.scraper import solve_captcha
+from utils.scraper_http import (
+    parse_alert,
+    parse_form,
+    parse_student_details,
+    scrape_result_http,
+)
+
+INDEX_HTML = """
+<html><body>
+<form action="resultpage.php" method="post">
+  <input type="hidden" name="Token" value="abc123">
+  <input type="text" name="lns">
+  <div id="raj">
+    <div>USN</div>
+    <div>
+      <div>Captcha</div>
+      <div><img src="/captcha/vtu_captcha.php?_CAPTCHA"></div>
+    </div>
+  </div>
+  <input type="text" name="captchacode">
+  <input type="submit" id="submit">
+</form>
+</body></html>
+"""
+
+RESULT_HTML = """
+<html><body>
+<table>
+  <tr><td><b>University Seat Number</b></td><td><b>: 1ox21cs001</b></td></tr>
+  <tr><td><b>Student Name</b></td><td><b>: TEST STUDENT</b></td></tr>
+</table>
+<div class="divTable"><div class="divTableBody">
+  <div class="divTableRow">
+    <div class="divTableCell">Subject Code</div><div class="divTableCell">Subject Name</div>
+    <div class="divTableCell">Internal Marks</div><div class="divTableCell">External Marks</div>
+    <div class="divTableCell">Total</div><div class="divTableCell">Result</div>
+    <div class="divTableCell">Announced / Updated on</div>
+  </div>
+  <div class="divTableRow">
+    <div class="divTableCell">21CS52</div><div class="divTableCell">COMPUTER NETWORKS</div>
+    <div class="divTableCell">45</div><div class="divTableCell">40</div>
+    <div class="divTableCell">85</div><div class="divTableCell">P</div>
+    <div class="divTableCell">2024-02-10</div>
+  </div>
+  <div class="divTableRow">
+    <div class="divTableCell">21CS51</div><div class="divTableCell">AUTOMATA THEORY</div>
+    <div class="divTableCell">30</div><div class="divTableCell">10</div>
+    <div class="divTableCell">40</div><div class="divTableCell">F</div>
+    <div class="divTableCell">2024-02-10</div>
+  </div>
+</div></div>
+</body></html>
+"""
+
+CAPTCHA_ALERT_HTML = (
+    "<script type='text/javascript'>alert('Invalid captcha code !!!');"
+    "window.location.href='index.php';</script>"
+)
+USN_ALERT_HTML = (
+    "<script>alert('University Seat Number is not available or Invalid..!');</script>"
+)
+
+
+class FakeResponse:
+    def __init__(self, text="", content=b""):
+        self.text = text
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, post_pages):
+        self.post_pages = list(post_pages)
+        self.posted = []
+
+    def get(self, url, timeout=None):
+        if "captcha" in url:
+            return FakeResponse(content=b"png-bytes")
+        return FakeResponse(text=INDEX_HTML)
+
+    def post(self, url, data=None, timeout=None):
+        self.posted.append((url, data))
+        return FakeResponse(text=self.post_pages.pop(0))
+
+
+class HttpScraperParseTests(SimpleTestCase):
+    def test_parse_form(self):
+        """
+        Ensure the form action, hidden fields and captcha url are extracted
+        """
+        action, hidden, captcha_url = parse_form(
+            INDEX_HTML, "https://results.vtu.ac.in/JJEcbcs24/index.php"
+        )
+        self.assertEqual(action, "https://results.vtu.ac.in/JJEcbcs24/resultpage.php")
+        self.assertEqual(hidden, {"Token": "abc123"})
+        self.assertEqual(
+            captcha_url, "https://results.vtu.ac.in/captcha/vtu_captcha.php?_CAPTCHA"
+        )
+
+    def test_parse_alert(self):
+        """
+        Ensure known VTU alerts are detected and unknown scripts are ignored
+        """
+        self.assertEqual(parse_alert(CAPTCHA_ALERT_HTML), "Invalid captcha code !!!")
+        self.assertIsNone(parse_alert("<script>alert('hello')</script>"))
+        self.assertIsNone(parse_alert(RESULT_HTML))
+
+    def test_parse_student_details(self):
+        """
+        Ensure the marks table is parsed into the selenium scraper's structure
+        """
+        data = parse_student_details(RESULT_HTML)
+        self.assertEqual(
+            data,
+            {
+                "Marks": [
+                    {
+                        "Subject Code": "21CS51",
+                        "Subject Name": "AUTOMATA THEORY",
+                        "INT": "30",
+                        "EXT": "10",
+                        "TOT": "40",
+                        "Result": "F",
+                    },
+                    {
+                        "Subject Code": "21CS52",
+                        "Subject Name": "COMPUTER NETWORKS",
+                        "INT": "45",
+                        "EXT": "40",
+                        "TOT": "85",
+                        "Result": "P",
+                    },
+                ]
+            },
+        )
+
+
+@mock.patch("utils.trueCaptcha.solve_captcha", return_value="a1b2c3")
+class HttpScraperTests(SimpleTestCase):
+    url = "https://results.vtu.ac.in/JJEcbcs24/index.php"
+
+    def test_scrape_success(self, solver):
+        """
+        Ensure a successful scrape posts the form and returns status 0
+        """
+        session = FakeSession([RESULT_HTML])
+        data, code = scrape_result_http("1OX21CS001", self.url, session=session)
+        self.assertEqual(code, 0)
+        self.assertEqual(len(data["Marks"]), 2)
+        solver.assert_called_with(b"png-bytes")
+        _, posted = session.posted[0]
+        self.assertEqual(
+            posted, {"Token": "abc123", "lns": "1OX21CS001", "captchacode": "a1b2c3"}
+        )
+
+    def test_scrape_retries_invalid_captcha(self, solver):
+        """
+        Ensure an invalid captcha is retried before giving up with status 2
+        """
+        session = FakeSession([CAPTCHA_ALERT_HTML, RESULT_HTML])
+        _, code = scrape_result_http("1OX21CS001", self.url, session=session)
+        self.assertEqual(code, 0)
+
+        session = FakeSession([CAPTCHA_ALERT_HTML, CAPTCHA_ALERT_HTML])
+        data, code = scrape_result_http("1OX21CS001", self.url, session=session)
+        self.assertEqual((data, code), (None, 2))
+
+    @mock.patch(
+        "utils.scraper_http.fetch_captcha", side_effect=CaptchaSolveError("unreadable")
+    )
+    def test_unsolvable_captcha(self, fetch_captcha, solver):
+        """
+        Ensure a captcha that can't be solved twice in a row returns status 2
+        """
+        session = FakeSession([])
+        self.assertEqual(
+            scrape_result_http("1OX21CS001", self.url, session=session), (None, 2)
+        )
+        self.assertEqual(fetch_captcha.call_count, 2)
+        self.assertEqual(session.posted, [])
+
+    def test_scrape_invalid_usn(self, solver):
+        """
+        Ensure an invalid USN returns status 1 without retrying
+        """
+        session = FakeSession([USN_ALERT_HTML])
+        self.assertEqual(
+            scrape_result_http("1OX21CS999", self.url, session=session), (None, 1)
+        )
+        self.assertEqual(len(session.posted), 1)
+
+
+class SeleniumCaptchaTests(SimpleTestCase):
+    @mock.patch("utils.trueCaptcha.solve_captcha", return_value="a1b2c3")
+    def test_captcha_solved_from_memory(self, solver):
+        """
+        Ensure the selenium scraper hands the screenshot bytes to the solver
+        """
+        element = mock.Mock(screenshot_as_png=b"png-bytes")
+        driver = mock.Mock()
+        driver.find_element.return_value = element
+
+        self.assertEqual(solve_captcha(driver), "a1b2c3")
+        solver.assert_called_once_with(b"png-bytes")
+        element.screenshot.assert_not_called()
@@ -1,16 +1,34 @@
-from django.db.models import Prefetch
+import json
+import math
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, FilteredRelation, Prefetch, Q
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import (
+    action,
+    api_view,
+    permission_classes,
+    renderer_classes,
+)
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from utils.redis_conn import get_scraping_info
+from utils.response_cache import CachedReadMixin, cache_view
+from utils.retry import CooldownActive
+from utils.scraper_drf import resumable_scrape_jobs
 
+from .export import ArrowRenderer, CSVRenderer, ParquetRenderer, score_export_stream
+from .fieldsets import SparseFieldsViewMixin
 from .filters import (
     BatchFilter,
+    BatchSemesterMetricsFilter,
+    DepartmentSemesterMetricsFilter,
     ScoreFilter,
     SectionFilter,
     SemesterFilter,
@@ -22,8 +40,12 @@ from .filters import (
 )
 from .models import (
     Batch,
+    BatchSemesterMetrics,
     Department,
+    DepartmentSemesterMetrics,
     Score,
+    ScrapeJob,
+    ScrapeJobItem,
     Section,
     Semester,
     SemesterMetrics,
@@ -34,12 +56,15 @@ from .models import (
     User,
 )
 from .serializers import (
+    BatchSemesterMetricsSerializer,
     BatchSerializer,
     BatchSubjectSerializer,
+    DepartmentSemesterMetricsSerializer,
     DepartmentSerializer,
     IdentifySubjectsSerializer,
     ScoreSerializer,
     ScrapeBatchSerializer,
+    ScrapeJobSerializer,
     SectionSerializer,
     SemesterMetricsSerializer,
     SemesterSerializer,
@@ -50,6 +75,7 @@ from .serializers import (
     SubjectSerializer,
     UserSerializer,
 )
+from .tasks import start_scrape_job
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -61,7 +87,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return User.objects.filter(department=user.department)
 
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = StudentSerializer
     queryset = Student.objects.all()
     permission_classes = [IsAuthenticated]
@@ -72,6 +98,7 @@ class StudentViewSet(viewsets.ModelViewSet):
     search_fields = ["batch__batch_name"]
     ordering_fields = ["usn", "cgpa", "num_backlogs"]
     ordering = ["usn"]
+    keyset_ordering = ["usn", "id"]
 
 
 class IdentifySubjectsView(APIView):
@@ -84,7 +111,14 @@ class IdentifySubjectsView(APIView):
         )
 
         if serializer.is_valid():
-            subjects = serializer.save()
+            try:
+                subjects = serializer.save()
+            except CooldownActive as e:
+                return Response(
+                    {"error": str(e)},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": str(math.ceil(e.retry_after))},
+                )
 
             return Response(
                 subjects,
@@ -135,6 +169,49 @@ class FetchScrapingProgressView(APIView):
         return Response({"details": details})
 
 
+class ScrapeJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ScrapeJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ["batch", "semester", "section", "status"]
+    ordering_fields = ["created_at", "updated_at"]
+    ordering = ["-created_at"]
+
+    def get_queryset(self):
+        return ScrapeJob.objects.annotate(
+            total=Count("items"),
+            done=Count("items", filter=Q(items__state=ScrapeJobItem.DONE)),
+            failed=Count("items", filter=Q(items__state=ScrapeJobItem.FAILED)),
+        )
+
+    @action(detail=True, methods=["post"])
+    def resume(self, request, pk=None):
+        """Re-run the job, scraping only the students that haven't finished."""
+        job = self.get_object()
+        if job.status == ScrapeJob.COMPLETED:
+            return Response(
+                {"error": "Scrape job already completed."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (
+            job.status == ScrapeJob.RUNNING
+            and not resumable_scrape_jobs(settings.SCRAPE_JOB_STALE_AFTER)
+            .filter(pk=job.pk)
+            .exists()
+        ):
+            return Response(
+                {"error": "Scrape job is still running."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        start_scrape_job(job)
+        return Response(
+            {"message": "Scrape job resumed.", "redis_name": job.redis_name},
+            status=status.HTTP_200_OK,
+        )
+
+
 class StudentBulkUploadView(APIView):
     serializer_class = StudentBulkUploadSeializer
     permission_classes = [IsAuthenticated]
@@ -157,7 +234,7 @@ class StudentBulkUploadView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [IsAuthenticated]
@@ -165,9 +242,9 @@ class SubjectViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = SubjectFilter
 
-    search_fields = ["subject_name", "subject_code"]
-    ordering_fields = ["subject_code", "credits"]
-    ordering = ["subject_code"]
+    search_fields = ["sub_name", "sub_code"]
+    ordering_fields = ["sub_code", "credits"]
+    ordering = ["sub_code"]
 
     def create(self, request, *args, **kwargs):
         if isinstance(request.data, list):
@@ -180,7 +257,7 @@ class SubjectViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class SectionViewSet(viewsets.ModelViewSet):
+class SectionViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = SectionSerializer
     queryset = Section.objects.all()
     permission_classes = [IsAuthenticated]
@@ -193,7 +270,7 @@ class SectionViewSet(viewsets.ModelViewSet):
     ordering = ["section_name"]
 
 
-class SemesterViewSet(viewsets.ModelViewSet):
+class SemesterViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = SemesterSerializer
     queryset = Semester.objects.all()
     permission_classes = [IsAuthenticated]
@@ -212,7 +289,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class BatchViewSet(viewsets.ModelViewSet):
+class BatchViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = BatchSerializer
     queryset = Batch.objects.all()
     permission_classes = [IsAuthenticated]
@@ -225,72 +302,116 @@ class BatchViewSet(viewsets.ModelViewSet):
     ordering = ["batch_start_year"]
 
 
-class ScoreViewSet(viewsets.ModelViewSet):
+class ScoreViewSet(CachedReadMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     serializer_class = ScoreSerializer
     queryset = Score.objects.all()
     permission_classes = [IsAuthenticated]
+    # a saved score only bumps its semester and student, not its section
+    cache_filters = {"student": "student", "semester": "semester"}
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = ScoreFilter
 
-    search_fields = ["student__usn", "subject__subject_code"]
-    ordering_fields = ["student__usn", "subject__subject_code"]
+    search_fields = ["student__usn", "subject__sub_code"]
+    ordering_fields = ["student__usn", "subject__sub_code"]
     ordering = ["student__usn"]
+    keyset_ordering = ["student__usn", "id"]
+
+
+def section_score_rows(section_id, semester_id):
+    """
+    Yield the active students of a section with their performance and scores.
+
+    Two values() queries whatever the section size, students and scores both
+    ordered by student and merged while iterating, so rows are yielded before
+    the whole section is read.
+    """
+    students = (
+        Student.objects.filter(section=section_id, active=True)
+        .annotate(
+            performance=FilteredRelation(
+                "studentperformance",
+                condition=Q(studentperformance__semester=semester_id),
+            )
+        )
+        .order_by("pk")
+        .values(
+            "id",
+            "usn",
+            name=F("user__first_name"),
+            total=F("performance__total"),
+            sgpa=F("performance__sgpa"),
+            percentage=F("performance__percentage"),
+        )
+    )
+    scores = (
+        Score.objects.filter(
+            semester=semester_id, student__section=section_id, student__active=True
+        )
+        .order_by("student", "pk")
+        .values(
+            "id",
+            "student",
+            "internal",
+            "external",
+            "total",
+            "grade",
+            subject_name=F("subject__sub_name"),
+            subject_code=F("subject__sub_code"),
+        )
+    )
+
+    scores = scores.iterator(chunk_size=2000)
+    score = next(scores, None)
+    for student in students.iterator(chunk_size=500):
+        student["scores"] = []
+        while score is not None and score["student"] <= student["id"]:
+            if score.pop("student") == student["id"]:
+                student["scores"].append(score)
+            score = next(scores, None)
+        yield student
+
+
+def stream_json_array(rows):
+    yield "["
+    for index, row in enumerate(rows):
+        yield ("," if index else "") + json.dumps(row, cls=DjangoJSONEncoder)
+    yield "]"
 
 
 @api_view(["GET"])
+@cache_view(
+    lambda request, section_id, semester_id: [
+        f"section:{section_id}",
+        f"semester:{semester_id}",
+    ]
+)
 def get_scores_by_section_and_semester(request, section_id, semester_id):
-    section = Section.objects.filter(id=section_id).first()
-    semester = Semester.objects.filter(id=semester_id).first()
-
-    if not section or not semester:
+    """
+    Scores of every active student of a section in a semester.
+
+    `?stream=true` streams the JSON array while the rows are read instead of
+    building the whole response in memory, for large sections.
+    """
+    if not (
+        Section.objects.filter(id=section_id).exists()
+        and Semester.objects.filter(id=semester_id).exists()
+    ):
         return Response(
             {"error": "Section or Semester does not exist"},
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    students = Student.objects.filter(section=section_id, active=True).prefetch_related(
-        Prefetch(
-            "score_set",
-            queryset=Score.objects.filter(semester=semester_id),
-            to_attr="cached_scores",
-        ),
-        Prefetch(
-            "studentperformance_set",
-            queryset=StudentPerformance.objects.filter(semester=semester_id),
-            to_attr="cached_performance",
-        ),
-    )
-
-    student_data = []
-    for student in students:
-        student_info = {
-            "id": student.id,
-            "usn": student.usn,
-            "name": student.user.first_name,
-            "total": student.cached_performance[0].total,
-            "sgpa": student.cached_performance[0].sgpa,
-            "percentage": student.cached_performance[0].percentage,
-            "scores": [
-                {
-                    "id": score.id,
-                    "subject_name": score.subject.sub_name,
-                    "subject_code": score.subject.sub_code,
-                    "internal": score.internal,
-                    "external": score.external,
-                    "total": score.total,
-                    "grade": score.grade,
-                }
-                for score in student.cached_scores
-            ],
-        }
-
-        student_data.append(student_info)
-
-    return Response(student_data)
+    rows = section_score_rows(section_id, semester_id)
+    if request.query_params.get("stream") in ("1", "true"):
+        return StreamingHttpResponse(
+            stream_json_array(rows), content_type="application/json"
+        )
+    return Response(list(rows))
 
 
 @api_view(["GET"])
+@cache_view(lambda request, student_id: [f"student:{student_id}"])
 def get_scores_by_student(request, student_id):
     student = Student.objects.filter(id=student_id).first()
 
@@ -303,7 +424,7 @@ def get_scores_by_student(request, student_id):
     semesters = Semester.objects.filter(batch=student.batch).prefetch_related(
         Prefetch(
             "score_set",
-            queryset=Score.objects.filter(student=student_id),
+            queryset=Score.objects.filter(student=student_id).select_related("subject"),
             to_attr="cached_scores",
         ),
         Prefetch(
@@ -339,10 +460,41 @@ def get_scores_by_student(request, student_id):
     return Response(student_data)
 
 
-class StudentPerformanceViewSet(viewsets.ModelViewSet):
+@api_view(["GET"])
+@renderer_classes([CSVRenderer, ParquetRenderer, ArrowRenderer])
+@permission_classes([IsAuthenticated])
+def export_scores(request):
+    """
+    Stream scores with their student's usn and subject's code and credits.
+
+    The format is picked with ?format=csv|parquet|arrow (or Accept), the rows
+    with the ScoreFilter params, e.g. ?semester=3&student__section=7.
+    """
+    filterset = ScoreFilter(
+        request.query_params,
+        queryset=Score.objects.order_by(
+            "semester", "student__usn", "subject__sub_code"
+        ),
+    )
+    if not filterset.is_valid():
+        return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    renderer = request.accepted_renderer
+    response = StreamingHttpResponse(
+        score_export_stream(filterset.qs, renderer.format),
+        content_type=renderer.media_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="scores.{renderer.format}"'
+    return response
+
+
+class StudentPerformanceViewSet(
+    CachedReadMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
     serializer_class = StudentPerformanceSerializer
     queryset = StudentPerformance.objects.all()
     permission_classes = [IsAuthenticated]
+    cache_filters = {"student": "student", "semester": "semester"}
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = StudentPerformanceFilter
@@ -357,24 +509,26 @@ class StudentPerformanceViewSet(viewsets.ModelViewSet):
         "num_backlogs",
     ]
     ordering = ["student__usn"]
+    keyset_ordering = ["student__usn", "id"]
 
 
-class SubjectMetricsViewSet(viewsets.ModelViewSet):
+class SubjectMetricsViewSet(
+    CachedReadMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
     serializer_class = SubjectMetricsSerializer
-    queryset = SubjectMetrics.objects.all()
+    queryset = SubjectMetrics.objects.select_related(
+        "subject", "highest_scorer", "highest_scorer__user"
+    )
     permission_classes = [IsAuthenticated]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = SubjectMetricsFilter
     ordering = ["section__section_name"]
 
-    def get_queryset(self):
-        return SubjectMetrics.objects.select_related(
-            "subject", "highest_scorer", "highest_scorer__user"
-        )
-
 
-class SemesterMetricsViewSet(viewsets.ModelViewSet):
+class SemesterMetricsViewSet(
+    CachedReadMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
     serializer_class = SemesterMetricsSerializer
     queryset = SemesterMetrics.objects.all()
     permission_classes = [IsAuthenticated]
@@ -386,8 +540,8 @@ class SemesterMetricsViewSet(viewsets.ModelViewSet):
     ordering_fields = [
         "section__section_name",
         "semester__semester_number",
-        "avg_score",
-        "num_backlogs",
+        "avg_sgpa",
+        "total_backlogs",
         "pass_percentage",
         "fail_percentage",
         "fail_1_sub",
@@ -396,3 +550,55 @@ class SemesterMetricsViewSet(viewsets.ModelViewSet):
         "fail_greater_3_subs",
     ]
     ordering = ["section__section_name"]
+
+
+class BatchSemesterMetricsViewSet(
+    CachedReadMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet
+):
+    """Batch-wide semester results, rebuilt from the section metrics (refresh_analytics)."""
+
+    serializer_class = BatchSemesterMetricsSerializer
+    queryset = BatchSemesterMetrics.objects.select_related("batch", "semester")
+    permission_classes = [IsAuthenticated]
+    cache_filters = {"semester": "semester"}
+
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = BatchSemesterMetricsFilter
+
+    search_fields = ["batch__batch_name"]
+    ordering_fields = [
+        "batch__batch_start_year",
+        "semester__semester_number",
+        "num_students",
+        "avg_sgpa",
+        "total_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+    ]
+    ordering = ["batch__batch_start_year", "semester__semester_number"]
+
+
+class DepartmentSemesterMetricsViewSet(
+    CachedReadMixin, SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet
+):
+    """Department-wide results per semester number, across every batch."""
+
+    serializer_class = DepartmentSemesterMetricsSerializer
+    queryset = DepartmentSemesterMetrics.objects.select_related("department")
+    permission_classes = [IsAuthenticated]
+    cache_filters = {}
+
+    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filterset_class = DepartmentSemesterMetricsFilter
+
+    search_fields = ["department__dept_name"]
+    ordering_fields = [
+        "department__dept_name",
+        "semester_number",
+        "num_students",
+        "avg_sgpa",
+        "total_backlogs",
+        "pass_percentage",
+        "fail_percentage",
+    ]
+    ordering = ["department__dept_name", "semester_number"]
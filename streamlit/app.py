@@ -17,20 +17,42 @@ token = st.session_state.get("jwt_token", None)
 # Function to make authenticated requests to the API
 def make_api_request(endpoint, method="GET", data=None):
     headers = {"Authorization": f"Bearer {token}"}
-    url = f"{API_BASE_URL}/{endpoint}"
+    # next links of paginated lists are absolute
+    url = endpoint if endpoint.startswith("http") else f"{API_BASE_URL}/{endpoint}"
 
+    # GET responses are kept with their ETag, an unchanged one comes back as 304
+    cached = st.session_state.setdefault("api_responses", {})
     if method == "GET":
+        if url in cached:
+            headers["If-None-Match"] = cached[url][0]
         response = requests.get(url, headers=headers)
+        if response.status_code == 304:
+            return cached[url][1]
     elif method == "POST":
         response = requests.post(url, headers=headers, json=data)
 
     if response.status_code == 200 or response.status_code == 201:
+        if method == "GET" and "ETag" in response.headers:
+            cached[url] = (response.headers["ETag"], response.json())
         return response.json()
     else:
         st.error(f"Error: {response.status_code} - {response.text}")
         return None
 
 
+# Function to fetch every row of a paginated list endpoint, page by page
+def fetch_all_pages(endpoint):
+    rows = []
+    url = f"{endpoint}?pagination=keyset&page_size=1000"
+    while url:
+        page = make_api_request(url, method="GET")
+        if page is None:
+            return None
+        rows.extend(page["results"])
+        url = page["next"]
+    return rows
+
+
 # Page 1: Login page for JWT token input
 def login_page():
     st.title("Syncwise - Login")
@@ -217,8 +239,8 @@ def view_results():
     st.title("View Results and Performance")
 
     # Fetching data from API
-    scores_response = make_api_request("scores/", method="GET")
-    performance_response = make_api_request("student-performances/", method="GET")
+    scores_response = fetch_all_pages("scores/")
+    performance_response = fetch_all_pages("student-performances/")
 
     if scores_response and performance_response:
         # Process Scores
@@ -42,6 +42,22 @@ TRUE_CAPTCHA_API_KEY = os.getenv("TRUE_CAPTCHA_API_KEY")
 TRUE_CAPTCHA_USER_ID = os.getenv("TRUE_CAPTCHA_USER_ID")
 TRUE_CAPTCHA_URL = "https://api.apitruecaptcha.org/one/gettext"
 
+# Captcha solver backends tried in order (fastest accurate one first once stats
+# are in): "truecaptcha", "local" (offline template matching), "fake" (tests)
+CAPTCHA_SOLVERS = [
+    name.strip()
+    for name in os.getenv("CAPTCHA_SOLVERS", "truecaptcha").split(",")
+    if name.strip()
+]
+# Glyph templates of the "local" solver. It starts out empty and is filled with
+# the captchas the website accepted from the other solvers, so run "local"
+# after "truecaptcha" until it has learned enough. Keep it out of the source
+# tree, the newest CAPTCHA_TEMPLATES_PER_CHAR glyphs of every character are kept
+CAPTCHA_TEMPLATE_DIR = Path(
+    os.getenv("CAPTCHA_TEMPLATE_DIR", BASE_DIR / "data" / "captcha_templates")
+)
+CAPTCHA_TEMPLATES_PER_CHAR = int(os.getenv("CAPTCHA_TEMPLATES_PER_CHAR", 20))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -57,6 +73,7 @@ INSTALLED_APPS = [
     "drf_spectacular",
     "corsheaders",
     "django_filters",
+    "django_q",
 ]
 
 
@@ -68,8 +85,12 @@ CORS_ALLOW_HEADERS = [
     "x-requested-with",
     "accept",
     "origin",
+    "if-none-match",
 ]
 
+# Conditional GETs, see utils.response_cache
+CORS_EXPOSE_HEADERS = ["etag", "last-modified"]
+
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -77,8 +98,17 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": "gradesync.pagination.CursorPagination",
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", 100)),
 }
 
+# Largest ?page_size= a list endpoint serves, see gradesync.pagination
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 1000))
+
+# Rows read and encoded at a time by /api/export/scores/, one Parquet row group
+# or Arrow record batch each
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
@@ -136,6 +166,111 @@ REDIS_HOST = "redis"
 REDIS_PORT = 6379
 REDIS_DB = 0
 REDIS_PASSWORD = None
+# Seconds the response cache waits on Redis to connect or answer before it
+# skips the cache (utils.redis_conn.get_cache_connection)
+REDIS_CACHE_TIMEOUT = float(os.getenv("REDIS_CACHE_TIMEOUT", 0.25))
+
+# Scrape jobs and metric recomputation run on a django-q cluster started with
+# `python manage.py qcluster`, scale it by adding cluster processes/workers.
+# "threads" runs them inside the web process instead (no worker needed).
+TASK_BACKEND = os.getenv("TASK_BACKEND", "django_q")
+# failed tasks are retried after TASK_RETRY_BACKOFF seconds, doubling each time
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", 3))
+TASK_RETRY_BACKOFF = int(os.getenv("TASK_RETRY_BACKOFF", 60))
+
+# Metrics made stale by score edits are recomputed once per transaction at
+# commit ("commit"), or handed to the task queue ("queue")
+METRICS_FLUSH = os.getenv("METRICS_FLUSH", "commit")
+
+# An edited score is applied to the metrics as a delta ("incremental"), or
+# always marks them for a full recompute ("recompute")
+METRICS_MODE = os.getenv("METRICS_MODE", "incremental")
+
+Q_CLUSTER = {
+    "name": "syncwise",
+    "workers": int(os.getenv("Q_WORKERS", 2)),
+    # a whole section is scraped in one task
+    "timeout": int(os.getenv("Q_TIMEOUT", 2 * 60 * 60)),
+    "retry": int(os.getenv("Q_TIMEOUT", 2 * 60 * 60)) + 60,
+    # retries with backoff are scheduled by gradesync.tasks
+    "max_attempts": 1,
+    "ack_failures": True,
+    "save_limit": 500,
+    "catch_up": False,
+}
+if os.getenv("Q_BROKER", "redis") == "orm":
+    Q_CLUSTER["orm"] = "default"
+else:
+    Q_CLUSTER["redis"] = {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "db": REDIS_DB,
+        "password": REDIS_PASSWORD,
+    }
+
+
+# Result scraper backend: "selenium" drives headless Chrome, "http" posts the
+# form with requests and parses the page with BeautifulSoup, "async" does the
+# same for a whole section at once on an asyncio event loop
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "selenium")
+
+# Headless Chrome driver pool used by the scraper
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", 4))
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", 50))
+# seconds a scrape waits for a free driver before failing with a network error
+DRIVER_CHECKOUT_TIMEOUT = float(os.getenv("DRIVER_CHECKOUT_TIMEOUT", 60))
+
+# Scrape scheduler, concurrent browsers are capped by DRIVER_POOL_SIZE
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", DRIVER_POOL_SIZE))
+SCRAPE_SECTION_CONCURRENCY = int(os.getenv("SCRAPE_SECTION_CONCURRENCY", 2))
+SCRAPE_MAX_SECTIONS = int(os.getenv("SCRAPE_MAX_SECTIONS", 4))
+# minimum seconds between two requests to the same host (VTU cooldown guard)
+SCRAPE_HOST_MIN_INTERVAL = float(os.getenv("SCRAPE_HOST_MIN_INTERVAL", 1.0))
+
+# A wrong captcha is retried straight away up to SCRAPE_CAPTCHA_RETRIES times.
+# A VTU cooldown trips a process-wide circuit breaker pausing every scrape for
+# SCRAPE_COOLDOWN_BACKOFF seconds, doubling per consecutive cooldown up to
+# SCRAPE_COOLDOWN_MAX_BACKOFF (capped at half of SCRAPE_JOB_STALE_AFTER, paused
+# jobs keep touching their row meanwhile). Failed USNs are requeued at the end
+# of the run.
+SCRAPE_CAPTCHA_RETRIES = int(os.getenv("SCRAPE_CAPTCHA_RETRIES", 2))
+SCRAPE_COOLDOWN_BACKOFF = int(os.getenv("SCRAPE_COOLDOWN_BACKOFF", 60))
+SCRAPE_COOLDOWN_MAX_BACKOFF = int(os.getenv("SCRAPE_COOLDOWN_MAX_BACKOFF", 30 * 60))
+SCRAPE_REQUEUE_ROUNDS = int(os.getenv("SCRAPE_REQUEUE_ROUNDS", 1))
+
+# Seconds a scraped result is reused before VTU is scraped again for that USN,
+# older results are deleted by completed scrape jobs and `manage.py purge_scrape_cache`
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", 24 * 60 * 60))
+
+# Scraped scores are upserted this many rows per statement, a job's students
+# are checkpointed once their chunk is written
+SCORE_UPSERT_CHUNK = int(os.getenv("SCORE_UPSERT_CHUNK", 1000))
+
+# A running scrape job also writes its pending scores and checkpoints its
+# students after this many students or seconds, whichever comes first, so it
+# keeps looking alive to resume_scrape_jobs (keep well below SCRAPE_JOB_STALE_AFTER).
+# A job whose scrapes are all paused by the cooldown breaker is touched every
+# SCRAPE_CHECKPOINT_INTERVAL seconds instead
+SCRAPE_CHECKPOINT_STUDENTS = int(os.getenv("SCRAPE_CHECKPOINT_STUDENTS", 50))
+SCRAPE_CHECKPOINT_INTERVAL = int(os.getenv("SCRAPE_CHECKPOINT_INTERVAL", 30))
+
+# Seconds a cached analytics response is kept in Redis (0 disables the cache),
+# writes invalidate it before that, see utils.response_cache
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 5 * 60))
+
+# Part of every cached response key and ETag, set it per deploy (e.g. to the
+# release's commit) so a deploy never serves responses or 304s of the old code
+RESPONSE_CACHE_VERSION = os.getenv("RESPONSE_CACHE_VERSION", "")
+
+# Seconds without progress after which a pending/running scrape job is
+# considered abandoned and picked up by `manage.py resume_scrape_jobs`
+SCRAPE_JOB_STALE_AFTER = int(os.getenv("SCRAPE_JOB_STALE_AFTER", 15 * 60))
+
+# Asyncio scrape pipeline (SCRAPER_BACKEND = "async") stage limits
+SCRAPE_ASYNC_IN_FLIGHT = int(os.getenv("SCRAPE_ASYNC_IN_FLIGHT", 32))
+SCRAPE_ASYNC_FETCH_LIMIT = int(os.getenv("SCRAPE_ASYNC_FETCH_LIMIT", 8))
+SCRAPE_ASYNC_CAPTCHA_LIMIT = int(os.getenv("SCRAPE_ASYNC_CAPTCHA_LIMIT", 16))
+SCRAPE_ASYNC_PARSE_LIMIT = int(os.getenv("SCRAPE_ASYNC_PARSE_LIMIT", 4))
 
 
 # Password validation
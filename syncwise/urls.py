@@ -5,12 +5,15 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from gradesync.views import (
+    BatchSemesterMetricsViewSet,
     BatchViewSet,
+    DepartmentSemesterMetricsViewSet,
     DepartmentViewSet,
     FetchScrapingProgressView,
     IdentifySubjectsView,
     ScoreViewSet,
     ScrapeBatchView,
+    ScrapeJobViewSet,
     SectionViewSet,
     SemesterMetricsViewSet,
     SemesterViewSet,
@@ -20,6 +23,7 @@ from gradesync.views import (
     SubjectMetricsViewSet,
     SubjectViewSet,
     UserViewSet,
+    export_scores,
     get_scores_by_section_and_semester,
     get_scores_by_student,
 )
@@ -34,6 +38,7 @@ router.register(r"sections", SectionViewSet, basename="section")
 router.register(r"semesters", SemesterViewSet, basename="semester")
 router.register(r"subjects", SubjectViewSet, basename="subject")
 router.register(r"scores", ScoreViewSet, basename="score")
+router.register(r"scrape/jobs", ScrapeJobViewSet, basename="scrape-job")
 router.register(
     r"student-performances", StudentPerformanceViewSet, basename="student-performance"
 )
@@ -41,6 +46,12 @@ router.register(r"subject-metrics", SubjectMetricsViewSet, basename="subject-met
 router.register(
     r"semester-metrics", SemesterMetricsViewSet, basename="semester-metrics"
 )
+router.register(r"batch-metrics", BatchSemesterMetricsViewSet, basename="batch-metrics")
+router.register(
+    r"department-metrics",
+    DepartmentSemesterMetricsViewSet,
+    basename="department-metrics",
+)
 
 
 urlpatterns = [
@@ -54,6 +65,7 @@ urlpatterns = [
         SpectacularSwaggerView.as_view(),
         name="swagger-ui",
     ),
+    path("api/export/scores/", export_scores, name="export-scores"),
     path("api/upload/", StudentBulkUploadView.as_view(), name="student-upload"),
     path("api/identify/", IdentifySubjectsView.as_view(), name="identify-subjects"),
     path("api/scrape/batch/", ScrapeBatchView.as_view(), name="scrape-batch"),
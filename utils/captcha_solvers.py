@@ -0,0 +1,394 @@
+import asyncio
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+import utils.trueCaptcha as trueCaptcha
+from utils.trueCaptcha import TrueCaptchaConfigError
+
+CAPTCHA_LENGTH = 6
+
+
+class CaptchaSolveError(Exception):
+    """Raised when a solver (or every solver of a chain) failed to read the captcha."""
+
+
+class SolvedCaptcha(str):
+    """The captcha text, remembering which backend produced it from which image."""
+
+    def __new__(cls, text, backend, image_bytes=None):
+        solved = super().__new__(cls, text)
+        solved.backend = backend
+        solved.image_bytes = image_bytes
+        return solved
+
+
+class CaptchaSolver:
+    """Base class of every captcha solver backend."""
+
+    name = "base"
+
+    def solve(self, image_bytes) -> str:
+        raise NotImplementedError
+
+    async def solve_async(self, image_bytes, client=None) -> str:
+        return await asyncio.to_thread(self.solve, image_bytes)
+
+
+class TrueCaptchaSolver(CaptchaSolver):
+    """Remote solver backed by the TrueCaptcha API."""
+
+    name = "truecaptcha"
+
+    def solve(self, image_bytes):
+        return trueCaptcha.solve_captcha(image_bytes)
+
+    async def solve_async(self, image_bytes, client=None):
+        return await trueCaptcha.solve_captcha_async(image_bytes, client)
+
+
+class FakeCaptchaSolver(CaptchaSolver):
+    """Returns canned answers in order, cycling through them. Meant for tests."""
+
+    name = "fake"
+
+    def __init__(self, answers=("AB12CD",)):
+        self.answers = list(answers)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def solve(self, image_bytes):
+        with self._lock:
+            answer = self.answers[self.calls % len(self.answers)]
+            self.calls += 1
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class LocalOCRSolver(CaptchaSolver):
+    """
+    Offline solver for the 6 character VTU captcha using template matching.
+
+    The image is binarised, split into glyphs on blank columns and every glyph
+    is compared against labelled templates in `template_dir`. Templates are
+    PNG files named `<character>_<anything>.png` and are collected from
+    captchas with a known answer using `learn`, which FallbackCaptchaSolver
+    calls with every captcha the website accepted that this solver misread.
+
+    Args:
+        template_dir (Path): Directory holding the glyph templates.
+        threshold (int): Grey level below which a pixel counts as ink.
+        max_distance (float): Largest mean pixel difference accepted as a match.
+        max_templates (int): Templates kept per character, the oldest are dropped.
+        duplicate_distance (float): Mean pixel difference below which a learned
+            glyph duplicates a template and isn't stored.
+    """
+
+    name = "local"
+    GLYPH_SIZE = (16, 24)
+
+    def __init__(
+        self,
+        template_dir,
+        threshold=128,
+        max_distance=0.25,
+        max_templates=20,
+        duplicate_distance=0.02,
+    ):
+        self.template_dir = Path(template_dir)
+        self.threshold = threshold
+        self.max_distance = max_distance
+        self.max_templates = max_templates
+        self.duplicate_distance = duplicate_distance
+        self._templates = None
+        self._lock = threading.Lock()
+
+    def solve(self, image_bytes):
+        templates = self._load_templates()
+        if not templates:
+            raise CaptchaSolveError(f"No captcha templates in {self.template_dir}")
+
+        labels = [label for label, _ in templates]
+        stack = np.stack([glyph for _, glyph in templates])
+
+        text = []
+        for glyph in self._segment(image_bytes):
+            distances = np.abs(stack - glyph).mean(axis=(1, 2))
+            best = int(distances.argmin())
+            if distances[best] > self.max_distance:
+                raise CaptchaSolveError("Captcha glyph did not match any template")
+            text.append(labels[best])
+        return "".join(text)
+
+    def learn(self, image_bytes, text):
+        """
+        Store the glyphs of a captcha whose answer is known as new templates.
+
+        A glyph nearly identical to a template of its character is skipped, and
+        only the newest `max_templates` templates of a character are kept.
+        """
+        glyphs = self._segment(image_bytes)
+        if len(glyphs) != len(text):
+            raise CaptchaSolveError("Captcha text does not match the number of glyphs")
+
+        known = {}
+        for label, template in self._load_templates():
+            known.setdefault(label, []).append(template)
+
+        self.template_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.time_ns()
+        learned = set()
+        for i, (char, glyph) in enumerate(zip(text, glyphs)):
+            templates = known.setdefault(char, [])
+            if any(
+                np.abs(template - glyph).mean() < self.duplicate_distance
+                for template in templates
+            ):
+                continue
+            templates.append(glyph)
+            image = Image.fromarray(((1 - glyph) * 255).astype(np.uint8))
+            image.save(self.template_dir / f"{char}_{stamp}_{i}.png")
+            learned.add(char)
+
+        # names start with the time they were learned at, so the oldest sort first
+        for char in learned:
+            paths = sorted(self.template_dir.glob(f"{char}_*.png"))
+            for path in paths[: -self.max_templates]:
+                path.unlink(missing_ok=True)
+
+        if learned:
+            with self._lock:
+                self._templates = None
+
+    def _load_templates(self):
+        with self._lock:
+            if self._templates is None:
+                self._templates = [
+                    (path.name.split("_", 1)[0], self._normalise(Image.open(path)))
+                    for path in sorted(self.template_dir.glob("*.png"))
+                ]
+            return self._templates
+
+    def _segment(self, image_bytes):
+        ink = np.asarray(Image.open(BytesIO(image_bytes)).convert("L")) < self.threshold
+        columns = ink.any(axis=0)
+
+        # runs of consecutive inked columns are the glyphs
+        runs, start = [], None
+        for x, inked in enumerate(columns):
+            if inked and start is None:
+                start = x
+            elif not inked and start is not None:
+                runs.append((start, x))
+                start = None
+        if start is not None:
+            runs.append((start, len(columns)))
+
+        # drop specks of noise narrower than 2px
+        runs = [(a, b) for a, b in runs if b - a >= 2]
+        if len(runs) != CAPTCHA_LENGTH:
+            raise CaptchaSolveError(
+                f"Expected {CAPTCHA_LENGTH} glyphs in captcha, found {len(runs)}"
+            )
+
+        glyphs = []
+        for a, b in runs:
+            piece = ink[:, a:b]
+            rows = np.flatnonzero(piece.any(axis=1))
+            piece = piece[rows[0] : rows[-1] + 1]
+            glyphs.append(self._normalise(Image.fromarray(~piece)))
+        return glyphs
+
+    def _normalise(self, image):
+        image = image.convert("L").resize(self.GLYPH_SIZE)
+        return (np.asarray(image) < self.threshold).astype(np.float32)
+
+
+class SolverStats:
+    """
+    Thread-safe success rate and latency tracker per solver backend.
+
+    A solve counts as a success when the backend returned an answer. Once the
+    VTU website has accepted or rejected that answer `report` records whether
+    it was correct, and the success rate switches to that accuracy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, solved, latency):
+        with self._lock:
+            stats = self._entry(name)
+            stats["attempts"] += 1
+            stats["solved"] += int(solved)
+            stats["latency"] += latency
+
+    def report(self, name, correct):
+        with self._lock:
+            self._entry(name)["correct" if correct else "wrong"] += 1
+
+    def success_rate(self, name):
+        with self._lock:
+            stats = self._entry(name)
+            judged = stats["correct"] + stats["wrong"]
+            if judged:
+                return stats["correct"] / judged
+            if stats["attempts"]:
+                return stats["solved"] / stats["attempts"]
+            return 1.0
+
+    def avg_latency(self, name):
+        with self._lock:
+            stats = self._entry(name)
+            return stats["latency"] / stats["attempts"] if stats["attempts"] else 0.0
+
+    def samples(self, name):
+        with self._lock:
+            stats = self._entry(name)
+            return stats["attempts"]
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def _entry(self, name):
+        return self._stats.setdefault(
+            name, {"attempts": 0, "solved": 0, "correct": 0, "wrong": 0, "latency": 0.0}
+        )
+
+
+class FallbackCaptchaSolver(CaptchaSolver):
+    """
+    Tries a chain of solvers, fastest accurate backend first.
+
+    Backends whose success rate dropped below `min_success_rate` after
+    `min_samples` attempts are moved to the end of the chain, the rest are
+    ordered by average latency. The returned text is a `SolvedCaptcha`
+    so callers can `report` whether the website accepted it, the accepted ones
+    train the solvers that can `learn`.
+    """
+
+    name = "fallback"
+
+    def __init__(self, solvers, stats=None, min_success_rate=0.5, min_samples=10):
+        self.solvers = list(solvers)
+        self.stats = stats or SolverStats()
+        self.min_success_rate = min_success_rate
+        self.min_samples = min_samples
+
+    def ordered(self):
+        def key(solver):
+            unreliable = (
+                self.stats.samples(solver.name) >= self.min_samples
+                and self.stats.success_rate(solver.name) < self.min_success_rate
+            )
+            return (unreliable, self.stats.avg_latency(solver.name))
+
+        return sorted(self.solvers, key=key)
+
+    def solve(self, image_bytes):
+        errors = []
+        for solver in self.ordered():
+            start = time.monotonic()
+            try:
+                text = solver.solve(image_bytes)
+            except Exception as e:
+                text, error = None, e
+            else:
+                error = None
+            result = self._record(solver, image_bytes, text, error, start, errors)
+            if result is not None:
+                return result
+        self._raise(errors)
+
+    async def solve_async(self, image_bytes, client=None):
+        errors = []
+        for solver in self.ordered():
+            start = time.monotonic()
+            try:
+                text = await solver.solve_async(image_bytes, client)
+            except Exception as e:
+                text, error = None, e
+            else:
+                error = None
+            result = self._record(solver, image_bytes, text, error, start, errors)
+            if result is not None:
+                return result
+        self._raise(errors)
+
+    def report(self, captcha, correct):
+        """Record whether the website accepted a captcha returned by `solve`."""
+        backend = getattr(captcha, "backend", None)
+        if backend is not None:
+            self.stats.report(backend, correct)
+        image_bytes = getattr(captcha, "image_bytes", None)
+        if correct and image_bytes is not None:
+            self._learn(image_bytes, str(captcha))
+
+    def _learn(self, image_bytes, text):
+        # only solvers that misread the captcha learn it, so the templates stop
+        # growing once they cover what the website serves
+        for solver in self.solvers:
+            if not hasattr(solver, "learn"):
+                continue
+            try:
+                if solver.solve(image_bytes) == text:
+                    continue
+            except CaptchaSolveError:
+                pass
+            try:
+                solver.learn(image_bytes, text)
+            except (CaptchaSolveError, OSError) as e:
+                print(f"{solver.name} could not learn captcha: {e}", flush=True)
+
+    def _record(self, solver, image_bytes, text, error, start, errors):
+        solved = error is None and text is not None and len(text) == CAPTCHA_LENGTH
+        self.stats.record(solver.name, solved, time.monotonic() - start)
+        if solved:
+            return SolvedCaptcha(text, solver.name, image_bytes)
+        errors.append(error or CaptchaSolveError(f"{solver.name} returned {text!r}"))
+        return None
+
+    def _raise(self, errors):
+        # a missing API key should still stop the scrape instead of failing every USN
+        for error in errors:
+            if isinstance(error, TrueCaptchaConfigError):
+                raise error
+        raise CaptchaSolveError(
+            "Every captcha solver failed: " + "; ".join(str(e) for e in errors)
+        )
+
+
+def build_solver(name):
+    if name == "truecaptcha":
+        return TrueCaptchaSolver()
+    if name == "local":
+        return LocalOCRSolver(
+            settings.CAPTCHA_TEMPLATE_DIR,
+            max_templates=settings.CAPTCHA_TEMPLATES_PER_CHAR,
+        )
+    if name == "fake":
+        return FakeCaptchaSolver()
+    raise ValueError(f"Unknown captcha solver: {name}")
+
+
+_solver = None
+_solver_lock = threading.Lock()
+
+
+def get_captcha_solver():
+    """Return the process-wide solver chain configured by `CAPTCHA_SOLVERS`."""
+    global _solver
+    with _solver_lock:
+        if _solver is None:
+            _solver = FallbackCaptchaSolver(
+                [build_solver(name) for name in settings.CAPTCHA_SOLVERS]
+            )
+        return _solver
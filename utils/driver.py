@@ -1,10 +1,11 @@
-from selenium import webdriver
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
 
-# from selenium.common.exceptions import (
-#     SessionNotCreatedException,
-#     TimeoutException,
-#     WebDriverException,
-# )
+from django.conf import settings
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.service import Service
 
 
@@ -41,4 +42,149 @@ def initialise_driver():
     return driver
 
 
-initialise_driver()
+class DriverPoolTimeout(Exception):
+    """Raised when no driver could be checked out within the given timeout."""
+
+    def __init__(self, message="Timed out waiting for a free WebDriver in the pool"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class DriverPool:
+    """
+    Bounded, thread-safe pool of Chrome WebDriver instances.
+
+    At most `size` drivers are alive at once. Idle drivers are health checked
+    before being handed out again and are recycled after `max_uses` checkouts,
+    so a long scrape never piles up leaked Chrome processes.
+
+    Args:
+        size (int): Maximum number of drivers alive at the same time.
+        max_uses (int): Number of checkouts after which a driver is quit and replaced.
+        factory (callable): Creates a new driver, defaults to `initialise_driver`.
+    """
+
+    def __init__(self, size, max_uses, factory=initialise_driver):
+        self.size = size
+        self.max_uses = max_uses
+        self._factory = factory
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def checkout(self, timeout=None):
+        """
+        Borrow a driver from the pool, creating one if no healthy idle driver exists.
+
+        Blocks while `size` drivers are already checked out.
+
+        Raises:
+            DriverPoolTimeout: If no driver became free within `timeout` seconds.
+            RuntimeError: If the pool has been shut down.
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool has been shut down.")
+        if not self._slots.acquire(timeout=timeout):
+            raise DriverPoolTimeout()
+
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._create()
+                if self._is_healthy(driver):
+                    return driver
+                self._discard(driver)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def checkin(self, driver, healthy=True):
+        """
+        Return a borrowed driver to the pool.
+
+        The driver is quit instead of being reused if it is marked unhealthy,
+        has reached `max_uses` or the pool has been shut down.
+        """
+        try:
+            with self._lock:
+                uses = self._uses.get(driver, 0) + 1
+                self._uses[driver] = uses
+
+            if self._closed or not healthy or uses >= self.max_uses:
+                self._discard(driver)
+                return
+
+            try:
+                driver.delete_all_cookies()
+            except WebDriverException:
+                self._discard(driver)
+                return
+            self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Context manager that checks a driver out and always checks it back in."""
+        driver = self.checkout(timeout=timeout)
+        healthy = True
+        try:
+            yield driver
+        except WebDriverException:
+            healthy = False
+            raise
+        finally:
+            self.checkin(driver, healthy=healthy)
+
+    def shutdown(self):
+        """Quit every driver owned by the pool. Checked out drivers are quit on checkin."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+    def _create(self):
+        driver = self._factory()
+        with self._lock:
+            self._uses[driver] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting driver: {e}", flush=True)
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Return the process-wide driver pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(
+                size=settings.DRIVER_POOL_SIZE,
+                max_uses=settings.DRIVER_MAX_USES,
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
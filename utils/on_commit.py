@@ -0,0 +1,35 @@
+"""
+Coalescing of work requested many times in a transaction into one on_commit run.
+"""
+
+import threading
+
+from django.db import transaction
+
+
+class OnCommitOnce:
+    """
+    Calls `callback()` once the current transaction commits, however many
+    times `schedule()` was called in it, and right away in autocommit mode.
+
+    The instance itself is the registered on_commit callback.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._state = threading.local()
+
+    def __call__(self):
+        self._state.scheduled = False
+        self.callback()
+
+    def schedule(self):
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            self()
+            return
+        # a rolled back transaction drops its callbacks without running them
+        registered = any(entry[1] is self for entry in connection.run_on_commit)
+        if not (getattr(self._state, "scheduled", False) and registered):
+            self._state.scheduled = True
+            transaction.on_commit(self)
@@ -25,6 +25,28 @@ class RedisClient:
         return self._instance.connection
 
 
+_cache_connection = None
+
+
+def get_cache_connection():
+    """
+    A client with short timeouts for the caches on the request and commit path,
+    a slow or unreachable Redis fails fast there instead of holding the request.
+    """
+    global _cache_connection
+    if _cache_connection is None:
+        _cache_connection = redis.StrictRedis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            decode_responses=True,
+            socket_connect_timeout=settings.REDIS_CACHE_TIMEOUT,
+            socket_timeout=settings.REDIS_CACHE_TIMEOUT,
+        )
+    return _cache_connection
+
+
 def init_scraping_redis_key(total: int):
     name = str(uuid.uuid4())
 
@@ -41,6 +63,19 @@ def init_scraping_redis_key(total: int):
     return name
 
 
+def reset_scraping_redis_key(name: str, total: int, progress: int):
+    """Re-initialise the progress hash of a resumed scrape job."""
+    redis_client = RedisClient().get_connection
+    mapping = {
+        "progress": progress,
+        "total": total,
+        "stop": "",
+    }
+    redis_client.hset(name=name, mapping=mapping)
+    redis_client.hsetnx(name=name, key="errors", value=json.dumps([]))
+    redis_client.expire(name=name, time=10800)  # expiry in 3 hrs
+
+
 def incr_scraping_progress(name: str):
     redis_client = RedisClient().get_connection
     redis_client.hincrby(name=name, key="progress", amount=1)
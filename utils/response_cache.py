@@ -0,0 +1,270 @@
+"""
+Redis cache of rendered GET responses and their ETags, driven by tag versions.
+
+Every tag (e.g. "section:4") has a version counter in Redis. A cached response
+is stored under a key built from the endpoint, its query string, the user's
+department and the current versions of its tags, so bumping a tag makes every
+entry built on it unreachable at once, without tracking or deleting keys.
+Writes bump the tags of the rows they touch once their transaction commits.
+
+The same key is the response's ETag: a client sending it back in If-None-Match
+gets a 304 from Redis alone, before the view runs, as long as the response
+is still cached under it. A lost bump can't leave a client on stale data for
+longer than RESPONSE_CACHE_TTL, and the key includes RESPONSE_CACHE_VERSION
+so a deploy starts afresh.
+
+Redis being down or slow never fails or holds a request: the cache has its own
+client with short timeouts and is skipped for a while after an error. Bumps
+are best effort, one that failed or was skipped is made up for by bumping
+EPOCH, a tag every response depends on, once Redis answers again.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+import redis
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from utils.on_commit import OnCommitOnce
+from utils.redis_conn import get_cache_connection
+
+PREFIX = "response-cache"
+# tag of list endpoints that aren't narrowed to a section, semester or student
+ALL = "all"
+# tag of every response, bumped when invalidations were lost
+EPOCH = "epoch"
+# seconds reads skip the cache after Redis failed
+RETRY_AFTER = 30
+
+_down_until = 0.0
+_pending = threading.local()
+# failed or skipped bumps not yet made up for by an EPOCH bump
+_missed = 0
+_missed_lock = threading.Lock()
+
+
+def _connection():
+    if time.monotonic() < _down_until:
+        return None
+    return get_cache_connection()
+
+
+def _failed(error):
+    global _down_until
+    _down_until = time.monotonic() + RETRY_AFTER
+    print(f"Response cache unavailable, skipping it: {error}", flush=True)
+
+
+def score_tags(section_ids=(), semester_id=None, student_ids=()):
+    """Tags of data derived from the scores of sections, a semester and/or students."""
+    tags = [ALL]
+    tags += [f"section:{section_id}" for section_id in section_ids]
+    if semester_id is not None:
+        tags.append(f"semester:{semester_id}")
+    tags += [f"student:{student_id}" for student_id in student_ids]
+    return tags
+
+
+def _miss():
+    global _missed
+    with _missed_lock:
+        _missed += 1
+
+
+def bump(tags):
+    global _missed
+    connection = _connection()
+    if connection is None:
+        _miss()
+        return
+    with _missed_lock:
+        missed = _missed
+    tags = set(tags) | ({EPOCH} if missed else set())
+    now = time.time()
+    try:
+        pipeline = connection.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f"{PREFIX}:tag:{tag}")
+            pipeline.set(f"{PREFIX}:time:{tag}", now)
+        pipeline.execute()
+    except redis.RedisError as e:
+        _miss()
+        _failed(e)
+        return
+    with _missed_lock:
+        _missed -= missed
+
+
+def _bump_pending():
+    tags, _pending.tags = _pending.tags, set()
+    bump(tags)
+
+
+_bump_on_commit = OnCommitOnce(_bump_pending)
+
+
+def invalidate(tags):
+    """
+    Bump `tags` once the current transaction commits, right away in autocommit.
+
+    The tags of a whole transaction are bumped together in one round trip.
+    """
+    if not hasattr(_pending, "tags"):
+        _pending.tags = set()
+    _pending.tags.update(tags)
+    _bump_on_commit.schedule()
+
+
+def tag_versions(connection, tags):
+    """
+    The version and last bump time of every tag.
+
+    Tags Redis doesn't know yet (or lost) start from the current time rather
+    than 0, so an ETag handed out before Redis was reset can't match again.
+    """
+    keys = [f"{PREFIX}:tag:{tag}" for tag in tags]
+    times = [f"{PREFIX}:time:{tag}" for tag in tags]
+    values = connection.mget(keys + times)
+    if None in values[: len(tags)]:
+        now = time.time()
+        pipeline = connection.pipeline(transaction=False)
+        for key, time_key, version in zip(keys, times, values):
+            if version is None:
+                pipeline.set(key, time.time_ns(), nx=True)
+                pipeline.set(time_key, now, nx=True)
+        pipeline.execute()
+        values = connection.mget(keys + times)
+    return values[: len(tags)], [float(value) for value in values[len(tags) :] if value]
+
+
+def cache_key(request, tags, versions):
+    department_id = getattr(request.user, "department_id", None)
+    parts = [
+        settings.RESPONSE_CACHE_VERSION,
+        request.path,
+        request.META.get("QUERY_STRING", ""),
+        str(department_id),
+        *(f"{tag}={version or 0}" for tag, version in zip(tags, versions)),
+    ]
+    digest = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    return f"{PREFIX}:{digest}"
+
+
+def _validators(response, etag, modified):
+    response["ETag"] = etag
+    if modified:
+        response["Last-Modified"] = http_date(math.ceil(max(modified)))
+    return response
+
+
+def cached_response(request, tags, view):
+    """
+    Serve `view()` from the cache, storing its JSON on a miss.
+
+    Only successful JSON responses are stored. A hit is returned as the stored
+    bytes, skipping the queries, serializers and renderer. Responses carry an
+    ETag and Last-Modified, a matching If-None-Match is answered with a 304
+    while the response is still cached.
+    """
+    connection = _connection()
+    if connection is None or request.accepted_renderer.format != "json":
+        return view()
+    if _missed:
+        # entries cached before the lost bumps must not be served
+        bump([EPOCH])
+        if _missed:
+            return view()
+
+    tags = sorted(set(tags) | {EPOCH})
+    try:
+        versions, modified = tag_versions(connection, tags)
+        key = cache_key(request, tags, versions)
+        opaque = f'"{key.rsplit(":", 1)[1]}"'
+        etag = f"W/{opaque}"
+        # Last-Modified has a one second resolution, a write in the second of
+        # the previous response would go unnoticed, so only the ETag is checked
+        sent = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if opaque in {sent_etag.removeprefix("W/") for sent_etag in sent}:
+            if settings.RESPONSE_CACHE_TTL and connection.exists(key):
+                return _validators(HttpResponseNotModified(), etag, modified)
+        content = connection.get(key) if settings.RESPONSE_CACHE_TTL else None
+    except redis.RedisError as e:
+        _failed(e)
+        return view()
+    if content is not None:
+        return _validators(
+            HttpResponse(content, content_type="application/json"), etag, modified
+        )
+
+    response = view()
+    if response.status_code != 200:
+        return response
+    if settings.RESPONSE_CACHE_TTL and not response.streaming:
+        content = JSONRenderer().render(response.data).decode("utf-8")
+        try:
+            connection.set(key, content, ex=settings.RESPONSE_CACHE_TTL)
+        except redis.RedisError as e:
+            _failed(e)
+    return _validators(response, etag, modified)
+
+
+def cache_view(tags):
+    """
+    Cache a function view, `tags(request, **kwargs)` returns the tags of a response.
+
+    Put it under `@api_view` so the request is negotiated already.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return cached_response(
+                request,
+                tags(request, **kwargs),
+                lambda: view(request, *args, **kwargs),
+            )
+
+        return wrapper
+
+    return decorator
+
+
+class CachedReadMixin:
+    """
+    Cache the list and retrieve responses of a viewset and answer their
+    conditional requests.
+
+    Lists are tagged by the section, semester or student they are filtered on
+    (`cache_filters`, `{query param: tag prefix}`), or with ALL otherwise.
+    """
+
+    cache_filters = {"section": "section", "semester": "semester"}
+
+    def cache_tags(self, request):
+        tags = [
+            f"{prefix}:{request.query_params[param]}"
+            for param, prefix in self.cache_filters.items()
+            if request.query_params.get(param)
+        ]
+        return tags or [ALL]
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request,
+            self.cache_tags(request),
+            lambda: super(CachedReadMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(
+            request,
+            [ALL],
+            lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs),
+        )
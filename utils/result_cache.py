@@ -0,0 +1,55 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from gradesync.models import ScrapeResultCache
+
+
+def content_hash(payload) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def _fresh():
+    cutoff = timezone.now() - timedelta(seconds=settings.SCRAPE_CACHE_TTL)
+    return ScrapeResultCache.objects.filter(fetched_at__gte=cutoff)
+
+
+def get_cached_result(usn, result_url):
+    """Return the cached marks payload of a USN, or None if missing or expired."""
+    entry = _fresh().filter(usn=usn, result_url=result_url).only("payload").first()
+    return entry.payload if entry else None
+
+
+def get_cached_results(usns, result_url) -> dict:
+    """Return `{usn: payload}` for every USN with a fresh cache entry, in one query."""
+    return dict(
+        _fresh()
+        .filter(usn__in=usns, result_url=result_url)
+        .values_list("usn", "payload")
+    )
+
+
+def store_result(usn, result_url, payload):
+    """Cache a successfully scraped payload, only rewriting it when its content changed."""
+    digest = content_hash(payload)
+    now = timezone.now()
+    updated = ScrapeResultCache.objects.filter(
+        usn=usn, result_url=result_url, content_hash=digest
+    ).update(fetched_at=now)
+    if not updated:
+        ScrapeResultCache.objects.update_or_create(
+            usn=usn,
+            result_url=result_url,
+            defaults={"payload": payload, "content_hash": digest, "fetched_at": now},
+        )
+
+
+def purge_expired():
+    """Delete the entries older than SCRAPE_CACHE_TTL, they are never served again."""
+    cutoff = timezone.now() - timedelta(seconds=settings.SCRAPE_CACHE_TTL)
+    return ScrapeResultCache.objects.filter(fetched_at__lt=cutoff).delete()
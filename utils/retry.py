@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+
+# status codes of a scrape (see utils.scraper.status_code_str)
+CAPTCHA_FAILED = 2
+COOLDOWN = 3
+UNEXPECTED = 4
+NETWORK_ERROR = 5
+# failures that may succeed later in the run, an invalid USN (1) never will
+REQUEUE_CODES = (CAPTCHA_FAILED, COOLDOWN, UNEXPECTED, NETWORK_ERROR)
+
+
+class CooldownActive(Exception):
+    """Raised instead of waiting when the cooldown circuit breaker is open."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"VTU website cool down, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Process-wide breaker tripped by the VTU "check website after 2 hour" cooldown.
+
+    While it is open every scrape waits for it to close instead of hitting the
+    website again and burning its retries, request handlers fail fast instead
+    (see `check`). Only the cooldown alert trips it, not network errors. Each consecutive trip doubles the
+    wait, starting at `base_delay` and capped at `max_delay`, and a successful
+    scrape resets it. Scrapes that were already in flight and hit the same
+    cooldown while the breaker is open don't count as new trips.
+    """
+
+    def __init__(self, base_delay, max_delay, clock=time.monotonic):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.trips = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def trip(self):
+        with self._lock:
+            now = self.clock()
+            if now < self._open_until:
+                return
+            self.trips += 1
+            delay = min(self.base_delay * 2 ** (self.trips - 1), self.max_delay)
+            self._open_until = now + delay
+        print(f"VTU website cool down, pausing scraping for {delay}s", flush=True)
+
+    def reset(self):
+        with self._lock:
+            self.trips = 0
+
+    def remaining(self):
+        """Seconds until the breaker closes, 0 when closed."""
+        with self._lock:
+            return max(0.0, self._open_until - self.clock())
+
+    def record(self, code):
+        """Update the breaker with the status code of a finished scrape."""
+        if code == COOLDOWN:
+            self.trip()
+        elif code in (0, 1):
+            self.reset()
+
+    def check(self):
+        """Raise CooldownActive if the breaker is open."""
+        if (delay := self.remaining()) > 0:
+            raise CooldownActive(delay)
+
+    def wait(self):
+        # re-check after sleeping, the breaker may have tripped again meanwhile
+        while (delay := self.remaining()) > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        while (delay := self.remaining()) > 0:
+            await asyncio.sleep(delay)
+
+
+def requeue_failures(scrape, students, rounds):
+    """
+    Yield `(student, score, code)` from `scrape(students)`, retrying failures at the end.
+
+    Students that failed with a code in `REQUEUE_CODES` are held back and scraped
+    again once everyone else is done, up to `rounds` more times. Their last
+    result is yielded whatever it is.
+    """
+    pending = list(students)
+    for round_ in range(rounds + 1):
+        requeued = []
+        for student, score, code in scrape(pending):
+            if code in REQUEUE_CODES and round_ < rounds:
+                requeued.append(student)
+                continue
+            yield student, score, code
+
+        if not requeued:
+            return
+        print(f"Requeueing {len(requeued)} failed students", flush=True)
+        pending = requeued
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Return the process-wide cooldown circuit breaker, creating it on first use."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            # a pause as long as the stale window would get running jobs resumed
+            # a second time if their keep-alive is ever delayed
+            _breaker = CircuitBreaker(
+                base_delay=settings.SCRAPE_COOLDOWN_BACKOFF,
+                max_delay=min(
+                    settings.SCRAPE_COOLDOWN_MAX_BACKOFF,
+                    settings.SCRAPE_JOB_STALE_AFTER // 2,
+                ),
+            )
+        return _breaker
@@ -0,0 +1,142 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host by at least `min_interval` seconds.
+
+    Slots are handed out in order across all threads, so N workers hitting the
+    VTU site together still send at most one request every `min_interval` seconds.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url):
+        """Reserve the next slot for the url's host and return the seconds to wait for it."""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        return slot - now
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class ScrapeScheduler:
+    """
+    Fans student scrapes out over a shared pool of worker threads.
+
+    Args:
+        workers (int): Number of worker threads shared by every section.
+        section_concurrency (int): Maximum students of one section in flight at once.
+        max_sections (int): Maximum sections being scraped at the same time.
+        rate_limiter (HostRateLimiter): Per-host limiter applied before every scrape.
+
+    The number of concurrent browsers is additionally capped by the driver pool,
+    workers simply block on checkout when every driver is busy.
+    """
+
+    def __init__(self, workers, section_concurrency, max_sections, rate_limiter):
+        self.section_concurrency = section_concurrency
+        self.rate_limiter = rate_limiter
+        self._workers = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="scrape-worker"
+        )
+        self._sections = ThreadPoolExecutor(
+            max_workers=max_sections, thread_name_prefix="scrape-section"
+        )
+
+    def submit_section(self, fn, *args):
+        """Run a section level task (e.g. `scrape_bg_task`) on the section executor."""
+        return self._sections.submit(fn, *args)
+
+    def scrape(self, students, result_url, scrape_fn, on_idle=None, idle_interval=None):
+        """
+        Scrape `students` concurrently and yield `(student, score, code)` as each finishes.
+
+        `scrape_fn(usn, result_url)` runs on the worker threads and must not touch
+        the database, results are consumed on the calling thread. `on_idle()` is
+        called on the calling thread whenever no scrape finished for
+        `idle_interval` seconds.
+        """
+        pending = iter(students)
+        in_flight = {}
+
+        def submit_next():
+            student = next(pending, None)
+            if student is None:
+                return
+            future = self._workers.submit(
+                self._scrape_one, scrape_fn, student.usn, result_url
+            )
+            in_flight[future] = student
+
+        try:
+            for _ in range(self.section_concurrency):
+                submit_next()
+
+            while in_flight:
+                done, _ = wait(
+                    in_flight,
+                    timeout=idle_interval if on_idle else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    on_idle()
+                for future in done:
+                    student = in_flight.pop(future)
+                    score, code = future.result()
+                    submit_next()
+                    yield student, score, code
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        self._sections.shutdown(wait=False, cancel_futures=True)
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+    def _scrape_one(self, scrape_fn, usn, result_url):
+        self.rate_limiter.wait(result_url)
+        return scrape_fn(usn, result_url)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide VTU rate limiter, shared by every scrape backend."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = HostRateLimiter(settings.SCRAPE_HOST_MIN_INTERVAL)
+        return _rate_limiter
+
+
+def get_scheduler():
+    """Return the process-wide scrape scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ScrapeScheduler(
+                workers=settings.SCRAPE_WORKERS,
+                section_concurrency=settings.SCRAPE_SECTION_CONCURRENCY,
+                max_sections=settings.SCRAPE_MAX_SECTIONS,
+                rate_limiter=get_rate_limiter(),
+            )
+        return _scheduler
@@ -2,6 +2,7 @@ import time
 from typing import Optional, Tuple
 
 import requests
+from django.conf import settings
 
 # from pydantic import HttpUrl
 from selenium.common.exceptions import WebDriverException
@@ -9,7 +10,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.wait import WebDriverWait
 
-import utils.trueCaptcha as trueCaptcha
+from utils.captcha_solvers import CaptchaSolveError, get_captcha_solver
 from utils.trueCaptcha import TrueCaptchaConfigError
 
 # from driver import initialise_driver
@@ -30,11 +31,12 @@ def status_code_str(code: int) -> str:
         2: "Captcha solving failed.",
         3: "VTU website cooldown.",
         4: "Unexpected error occurred.",
+        5: "Could not reach the VTU website.",
     }
     return code_map[code]
 
 
-# Function to solve captcha using trueCaptcha
+# Function to solve captcha using the configured solver chain
 def solve_captcha(driver) -> str:
     """
     Solves the captcha on a webpage using an image-based captcha solver.
@@ -47,18 +49,15 @@ def solve_captcha(driver) -> str:
         int:
 
     Description:
-        This function finds the captcha image element on the webpage, takes a screenshot
-        of the captcha image, and then passes the image to the trueCaptcha solver to
-        extract the captcha text. The solved captcha string is returned.
+        This function finds the captcha image element on the webpage, takes an
+        in-memory screenshot of the captcha image, and then passes the PNG bytes to
+        the captcha solver chain to extract the captcha text. Nothing is written to
+        disk, so concurrent scrapes can't overwrite each other's captcha.
     """
     # Find the captcha image element on the webpage
     div_element = driver.find_element("xpath", '//*[@id="raj"]/div[2]/div[2]/img')
-    # Take a screenshot of the captcha image
-    div_element.screenshot(r"/app/utils/captcha.png")
-    # Solve the captcha using the trueCaptcha solver
-    captcha = trueCaptcha.solve_captcha(
-        "/app/utils/captcha.png",
-    )
+    # Solve the captcha from the screenshot bytes using the solver chain
+    captcha = get_captcha_solver().solve(div_element.screenshot_as_png)
     return captcha
 
 
@@ -93,8 +92,9 @@ def fill_field(driver, name, key):
 
 
 def solve_and_fill_captcha(driver, USN):
-    captcha = solve_captcha(driver)
-    if len(captcha) != 6:
+    try:
+        captcha = solve_captcha(driver)
+    except CaptchaSolveError:
         captcha = refresh_captcha(driver)
     fields = [
         ["lns", USN],
@@ -102,6 +102,7 @@ def solve_and_fill_captcha(driver, USN):
     ]
     for field in fields:
         fill_field(driver, field[0], field[1])
+    return captcha
 
 
 def submit_form(driver):
@@ -111,27 +112,35 @@ def submit_form(driver):
     submit_button.click()
 
 
+# alert text shown by the VTU website -> [log message, status code]
+ALERTS = {
+    "University Seat Number is not available or Invalid..!": [
+        "Invalid USN: {USN}",
+        1,
+    ],
+    "Invalid captcha code !!!": [
+        "Invalid captcha code for {USN}, Reattempting...",
+        2,
+    ],
+    "Please check website after 2 hour !!!": [
+        "Website cool down for {USN}, backing off before it is requeued...",
+        3,
+    ],
+}
+
+
+def alert_code(alert_text, USN) -> int:
+    message, code = ALERTS[alert_text]
+    print(message.format(USN=USN), flush=True)
+    return code
+
+
 def handle_alert(driver, USN):
-    alerts = {
-        "University Seat Number is not available or Invalid..!": [
-            f"Invalid USN: {USN}",
-            1,
-        ],
-        "Invalid captcha code !!!": [
-            f"Invalid captcha code for {USN}, Reattempting...",
-            2,
-        ],
-        "Please check website after 2 hour !!!": [
-            "Website cool down, Reinitialising driver to bypass cool down, Reattempting after 10s...",
-            3,
-        ],
-    }
     alert = driver.switch_to.alert
     alert_text = alert.text
     alert.accept()
 
-    print(alerts[alert_text][0], flush=True)
-    return alerts[alert_text][1]
+    return alert_code(alert_text, USN)
 
 
 def wait_student_details(driver):
@@ -235,33 +244,38 @@ def check_alert_and_process(driver, USN):
 
 
 def scrape_result(USN: str, url: str, driver) -> Tuple[Optional[str], int]:
-    MAX_RETRIES = 2
-
+    # only a wrong captcha is retried straight away, a cooldown is returned so
+    # the caller can back off (see utils.retry)
     try:
         navigate_to_website(driver, url)
 
         retries = 0
-        while retries < MAX_RETRIES:
-            solve_and_fill_captcha(driver, USN)
+        while retries < settings.SCRAPE_CAPTCHA_RETRIES:
+            captcha = solve_and_fill_captcha(driver, USN)
             submit_form(driver)
             alert_code = check_alert_and_process(driver, USN)
+            if alert_code in (0, 2):
+                get_captcha_solver().report(captcha, correct=alert_code == 0)
             if alert_code == 1:
                 return None, 1
             elif alert_code == 2:
                 retries += 1
                 continue
             elif alert_code == 3:
-                retries += 1
-                continue
+                return None, 3
             elif alert_code == 0:
                 return extract_student_details(driver)
         return None, 2
     except WebDriverException as e:
         print(e, flush=True)
-        return None, 3
+        return None, 5
     except TrueCaptchaConfigError as e:
         print(e, flush=True)
         raise e
+    except CaptchaSolveError as e:
+        # the retry with a fresh captcha couldn't be solved either
+        print(e, flush=True)
+        return None, 2
     except Exception as e:
         print(e, flush=True)
         return None, 4
@@ -0,0 +1,207 @@
+import asyncio
+import queue
+import threading
+from typing import Optional, Tuple
+
+import httpx
+from django.conf import settings
+
+from utils.captcha_solvers import CaptchaSolveError, get_captcha_solver
+from utils.retry import get_circuit_breaker
+from utils.scheduler import get_rate_limiter
+from utils.scraper import alert_code
+from utils.scraper_http import parse_alert, parse_form, parse_student_details
+from utils.trueCaptcha import TrueCaptchaConfigError
+
+
+class AsyncScrapePipeline:
+    """
+    Scrapes many USNs at once on a single event loop.
+
+    Every student runs the same steps as `scrape_result_http`, but page fetches,
+    captcha solving and result parsing are each bounded by their own semaphore,
+    so while one student waits on the captcha API others keep fetching pages.
+
+    Args:
+        in_flight (int): Maximum students being scraped at the same time.
+        fetch_limit (int): Maximum concurrent requests to the VTU website.
+        captcha_limit (int): Maximum concurrent captcha solver requests.
+        parse_limit (int): Maximum result pages parsed at the same time.
+        rate_limiter (HostRateLimiter): Per-host limiter applied to VTU requests.
+        solver (CaptchaSolver): Captcha solver, defaults to the configured chain.
+        breaker (CircuitBreaker): Cooldown breaker every VTU request waits on.
+        transport: Optional httpx transport, used by the tests.
+    """
+
+    def __init__(
+        self,
+        in_flight,
+        fetch_limit,
+        captcha_limit,
+        parse_limit,
+        rate_limiter,
+        solver=None,
+        breaker=None,
+        transport=None,
+    ):
+        self.in_flight = in_flight
+        self.fetch_limit = fetch_limit
+        self.captcha_limit = captcha_limit
+        self.parse_limit = parse_limit
+        self.rate_limiter = rate_limiter
+        self.solver = solver or get_captcha_solver()
+        self.breaker = breaker
+        self.transport = transport
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            in_flight=settings.SCRAPE_ASYNC_IN_FLIGHT,
+            fetch_limit=settings.SCRAPE_ASYNC_FETCH_LIMIT,
+            captcha_limit=settings.SCRAPE_ASYNC_CAPTCHA_LIMIT,
+            parse_limit=settings.SCRAPE_ASYNC_PARSE_LIMIT,
+            rate_limiter=get_rate_limiter(),
+            breaker=get_circuit_breaker(),
+        )
+
+    async def scrape_many(self, students, result_url, on_result):
+        """
+        Scrape every student and call `on_result(student, (score, code))` as each finishes.
+        """
+        self._students = asyncio.Semaphore(self.in_flight)
+        self._fetch = asyncio.Semaphore(self.fetch_limit)
+        self._captcha = asyncio.Semaphore(self.captcha_limit)
+        self._parse = asyncio.Semaphore(self.parse_limit)
+
+        async with httpx.AsyncClient(transport=self.transport) as captcha_client:
+
+            async def run(student):
+                async with self._students:
+                    result = await self.scrape_one(
+                        student.usn, result_url, captcha_client
+                    )
+                on_result(student, result)
+
+            tasks = [asyncio.create_task(run(student)) for student in students]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def scrape_one(
+        self, USN: str, url: str, captcha_client
+    ) -> Tuple[Optional[dict], int]:
+        # each student needs its own cookie jar, the captcha is bound to the session
+        client = httpx.AsyncClient(
+            verify=False, timeout=10, follow_redirects=True, transport=self.transport
+        )
+        try:
+            async with client:
+                retries = 0
+                while retries < settings.SCRAPE_CAPTCHA_RETRIES:
+                    page = await self._request(client, "GET", url)
+                    action, fields, captcha_url = parse_form(page.text, url)
+
+                    try:
+                        captcha = await self._solve(client, captcha_url, captcha_client)
+                    except CaptchaSolveError:
+                        captcha = await self._solve(client, captcha_url, captcha_client)
+
+                    fields.update({"lns": USN, "captchacode": captcha})
+                    response = await self._request(client, "POST", action, data=fields)
+
+                    alert_text = parse_alert(response.text)
+                    if alert_text is None:
+                        self._record(0)
+                        self.solver.report(captcha, correct=True)
+                        async with self._parse:
+                            marks = await asyncio.to_thread(
+                                parse_student_details, response.text
+                            )
+                        return marks, 0
+
+                    code = alert_code(alert_text, USN)
+                    self._record(code)
+                    if code == 2:
+                        self.solver.report(captcha, correct=False)
+                    if code in (1, 3):
+                        return None, code
+                    retries += 1
+                return None, 2
+        except httpx.HTTPError as e:
+            print(e, flush=True)
+            return None, 5
+        except TrueCaptchaConfigError as e:
+            print(e, flush=True)
+            raise e
+        except CaptchaSolveError as e:
+            # the retry with a fresh captcha couldn't be solved either
+            print(e, flush=True)
+            return None, 2
+        except Exception as e:
+            print(e, flush=True)
+            return None, 4
+
+    def _record(self, code):
+        if self.breaker is not None:
+            self.breaker.record(code)
+
+    async def _request(self, client, method, url, **kwargs):
+        if self.breaker is not None:
+            await self.breaker.wait_async()
+        async with self._fetch:
+            delay = self.rate_limiter.reserve(url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def _solve(self, client, captcha_url, captcha_client):
+        image = await self._request(client, "GET", captcha_url)
+        async with self._captcha:
+            return await self.solver.solve_async(image.content, captcha_client)
+
+
+def scrape_students_async(
+    students, result_url, pipeline=None, on_idle=None, idle_interval=None
+):
+    """
+    Drop-in replacement for `ScrapeScheduler.scrape` backed by the asyncio pipeline.
+
+    The event loop runs on a helper thread and results are yielded as
+    `(student, score, code)` on the calling thread as soon as each one finishes.
+    `on_idle()` is called on the calling thread whenever nothing finished for
+    `idle_interval` seconds.
+    """
+    pipeline = pipeline or AsyncScrapePipeline.from_settings()
+    results = queue.Queue()
+    done = object()
+
+    def run():
+        try:
+            asyncio.run(
+                pipeline.scrape_many(
+                    students, result_url, lambda s, r: results.put((s, r))
+                )
+            )
+        except BaseException as e:
+            results.put(e)
+        finally:
+            results.put(done)
+
+    threading.Thread(target=run, name="scrape-async", daemon=True).start()
+
+    while True:
+        try:
+            item = results.get(timeout=idle_interval if on_idle else None)
+        except queue.Empty:
+            on_idle()
+            continue
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        student, (score, code) = item
+        yield student, score, code
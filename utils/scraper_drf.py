@@ -1,46 +1,264 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from gradesync.metrics import mark_dirty
 from gradesync.models import (
     Score,
+    ScrapeJob,
+    ScrapeJobItem,
     SemesterMetrics,
+    Student,
     StudentPerformance,
     Subject,
     SubjectMetrics,
 )
-from utils.driver import initialise_driver
+from utils.driver import DriverPoolTimeout, get_driver_pool
 from utils.redis_conn import (
     change_stop_field,
     incr_scraping_progress,
+    init_scraping_redis_key,
     log_scraping_errors,
+    reset_scraping_redis_key,
 )
+from utils.response_cache import invalidate, score_tags
+from utils.result_cache import get_cached_result, get_cached_results, store_result
+from utils.retry import COOLDOWN, NETWORK_ERROR, get_circuit_breaker, requeue_failures
+from utils.scheduler import get_scheduler
 from utils.scraper import scrape_result, status_code_str
+from utils.scraper_async import scrape_students_async
+from utils.scraper_http import scrape_result_http
+
+
+def create_scrape_job(batch, semester, section, result_url, use_cache=True):
+    """Persist a scrape job with a pending checkpoint for every student of the section."""
+    students = list(Student.objects.filter(section=section))
+    job = ScrapeJob.objects.create(
+        batch=batch,
+        semester=semester,
+        section=section,
+        result_url=result_url,
+        use_cache=use_cache,
+        redis_name=init_scraping_redis_key(total=len(students)),
+    )
+    ScrapeJobItem.objects.bulk_create(
+        [ScrapeJobItem(job=job, student=student) for student in students]
+    )
+    return job
 
 
-def scrape_bg_task(semester, students, redis_name, result_url):
+def resumable_scrape_jobs(stale_after):
+    """
+    Jobs left unfinished by a dead process.
+
+    A pending or running job counts as abandoned once neither the job nor any of
+    its students were touched for `stale_after` seconds.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    recent_items = ScrapeJobItem.objects.filter(
+        job=OuterRef("pk"), updated_at__gte=cutoff
+    )
+    return ScrapeJob.objects.filter(
+        status__in=[ScrapeJob.PENDING, ScrapeJob.RUNNING], updated_at__lt=cutoff
+    ).exclude(Exists(recent_items))
+
+
+def scrape_bg_task(job_id, retry=False):
+    """
+    Scrape every unfinished student of a job, checkpointing them as they complete.
+
+    Students are checkpointed together with their scores, once SCORE_UPSERT_CHUNK
+    score rows, SCRAPE_CHECKPOINT_STUDENTS students or SCRAPE_CHECKPOINT_INTERVAL
+    seconds have built up.
+
+    Students already done or failed are skipped, so running this again for a job
+    interrupted by a restart only scrapes what is left. With `retry` a job that
+    raised is put back to pending for another attempt instead of failing.
+    Performances, cgpa rollups and section metrics are left stale, the caller
+    recomputes them once for the whole job (gradesync.tasks.run_scrape_job).
+    """
+    job = ScrapeJob.objects.select_related("semester", "section").get(pk=job_id)
+    redis_name = job.redis_name
     try:
-        errors = []
+        items = list(
+            job.items.exclude(
+                state__in=[ScrapeJobItem.DONE, ScrapeJobItem.FAILED]
+            ).select_related("student", "student__section")
+        )
+        finished = job.items.count() - len(items)
+        reset_scraping_redis_key(
+            name=redis_name, total=finished + len(items), progress=finished
+        )
+
+        job.status = ScrapeJob.RUNNING
+        job.attempts += 1
+        job.save(update_fields=["status", "attempts", "updated_at"])
+        job.items.filter(state=ScrapeJobItem.PENDING).update(
+            state=ScrapeJobItem.IN_FLIGHT, updated_at=timezone.now()
+        )
+
+        semester = job.semester
         print(semester, flush=True)
-        for student in students:
-            usn = student.usn
-            score, code = scrape_student(usn, result_url)
-            if not check_and_append_error(usn=usn, errors=errors, code=code):
-                add_scores_and_update_metrics(semester, student, scores=score["Marks"])
+        subjects = semester_subjects(semester)
+        by_student = {item.student_id: item for item in items}
+        students = [item.student for item in items]
+        # scraped marks are upserted a chunk at a time, the chunk's students are
+        # checkpointed only once their scores are written
+        pending_scores, pending_items = [], []
+        checkpointed_at = time.monotonic()
+
+        def keep_alive():
+            # an open cooldown breaker holds every scrape back for minutes, the
+            # job mustn't look abandoned to resumable_scrape_jobs meanwhile
+            if get_circuit_breaker().remaining() > 0:
+                ScrapeJob.objects.filter(pk=job.pk).update(updated_at=timezone.now())
+
+        for student, score, code in scrape_students(
+            students, job.result_url, job.use_cache, on_idle=keep_alive
+        ):
+            item = by_student[student.id]
+            if check_and_append_error(usn=student.usn, errors=[], code=code):
+                item.state = ScrapeJobItem.FAILED
+                item.error = status_code_str(code)
+            else:
+                pending_scores += build_scores(
+                    semester, student, score["Marks"], subjects
+                )
+                item.state = ScrapeJobItem.DONE
+            pending_items.append(item)
             incr_scraping_progress(redis_name)
-
-        update_semester_metrics(semester, student.section)
+            if (
+                len(pending_scores) >= settings.SCORE_UPSERT_CHUNK
+                or len(pending_items) >= settings.SCRAPE_CHECKPOINT_STUDENTS
+                or time.monotonic() - checkpointed_at
+                >= settings.SCRAPE_CHECKPOINT_INTERVAL
+            ):
+                checkpoint_scores(pending_scores, pending_items)
+                pending_scores, pending_items = [], []
+                checkpointed_at = time.monotonic()
+        checkpoint_scores(pending_scores, pending_items)
+
+        errors = [
+            {"usn": usn, "error": error}
+            for usn, error in job.items.filter(state=ScrapeJobItem.FAILED).values_list(
+                "student__usn", "error"
+            )
+        ]
         log_scraping_errors(name=redis_name, errors=errors)
+        job.status = ScrapeJob.COMPLETED
+        job.error = ""
 
     except Exception as e:
-        change_stop_field(name=redis_name, value=str(e))
+        job.error = str(e)
+        if retry:
+            job.status = ScrapeJob.PENDING
+        else:
+            job.status = ScrapeJob.FAILED
+            change_stop_field(name=redis_name, value=str(e))
+    finally:
+        job.save(update_fields=["status", "error", "updated_at"])
+        connections.close_all()
+    return job
+
+
+def scrape_students(students, result_url, use_cache=True, on_idle=None):
+    """
+    Yield `(student, score, code)` for every student, serving fresh cache hits first.
+
+    Only cache misses are scraped, successful scrapes are written back to the cache.
+    Students that failed on a captcha, cooldown or unexpected error are scraped
+    again at the end of the run (SCRAPE_REQUEUE_ROUNDS). `on_idle()` is called
+    whenever no scrape finished for SCRAPE_CHECKPOINT_INTERVAL seconds.
+    """
+    students = list(students)
+    cached = {}
+    if use_cache:
+        cached = get_cached_results([s.usn for s in students], result_url)
+    for student in students:
+        if student.usn in cached:
+            print(f"Using cached result for usn: {student.usn}", flush=True)
+            yield student, cached[student.usn], 0
+
+    idle = {"on_idle": on_idle, "idle_interval": settings.SCRAPE_CHECKPOINT_INTERVAL}
+
+    def scrape(pending):
+        if settings.SCRAPER_BACKEND == "async":
+            return scrape_students_async(pending, result_url, **idle)
+        return get_scheduler().scrape(
+            pending, result_url, scrape_fn=scrape_student, **idle
+        )
+
+    pending = [s for s in students if s.usn not in cached]
+    scraped = requeue_failures(scrape, pending, settings.SCRAPE_REQUEUE_ROUNDS)
+    for student, score, code in scraped:
+        if code == 0:
+            store_result(student.usn, result_url, score)
+        yield student, score, code
+
+
+def fetch_student_result(usn, result_url, use_cache=True, wait=True):
+    """
+    Cached single student scrape, returns the same tuple as `scrape_result`.
+
+    With `wait=False` an open cooldown breaker raises CooldownActive instead of
+    blocking, for callers serving a request.
+    """
+    if use_cache:
+        score = get_cached_result(usn, result_url)
+        if score is not None:
+            return score, 0
+
+    score, code = scrape_student(usn, result_url, wait=wait)
+    if code == 0:
+        store_result(usn, result_url, score)
+    return score, code
+
+
+def add_scores(semester, student, scores, update_performance=False):
+    """Store a student's scores, leaving performance and section metrics stale."""
+    subjects = semester_subjects(semester)
+    try:
+        upsert_scores(build_scores(semester, student, scores, subjects))
+        if update_performance:
+            update_student_performance(student, semester)
+    except Exception as e:
+        raise Exception(
+            f"Failed to process scores for student {student.id}: {str(e)}"
+        ) from e
+    return subjects
 
 
 def add_scores_and_update_metrics(semester, student, scores):
     try:
-        subjects, existing_scores = fetch_related_objects(semester, student)
-        batch_add_scores(student, semester, scores, subjects, existing_scores)
+        subjects = add_scores(semester, student, scores, update_performance=True)
         update_subject_metrics(subjects, semester, student.section)
     except Exception as e:
         raise e
 
 
+def recompute_section_metrics(semester, section):
+    """
+    Recompute everything derived from a section's scores once a scrape is done.
+
+    Student performances, the students' cgpa/backlogs, every subject metric,
+    the semester metric and the batch/department rollups, each in a handful of
+    bulk queries.
+    """
+    students = Student.objects.filter(section=section)
+    StudentPerformance.calculate_section(semester, section)
+    Student.bulk_rollup(students)
+    SubjectMetrics.calculate_section_metrics(semester, section)
+    update_semester_metrics(semester, section)
+    mark_dirty("batch_rollup", semester.pk)
+    invalidate(
+        score_tags([section.pk], semester.pk, students.values_list("pk", flat=True))
+    )
+
+
 def calculate_grade(total, result_code):
     """Calculate the grade based on total marks and result code."""
     if result_code == "P":
@@ -52,65 +270,76 @@ def calculate_grade(total, result_code):
     return result_code
 
 
-def fetch_related_objects(semester, student):
-    """Prefetch subjects and existing scores."""
-    subjects = {
+def semester_subjects(semester):
+    """`{sub_code: subject}` of a semester."""
+    return {
         subject.sub_code: subject
         for subject in Subject.objects.filter(semester=semester)
     }
-    existing_scores = {
-        (score.subject.sub_code, score.subject.semester): score
-        for score in Score.objects.filter(student=student, semester=semester)
-    }
-    return subjects, existing_scores
-
-
-def handle_score_update_or_create(
-    s, subjects, student, existing_scores, marks_new, marks_update
-):
-    """Handle the logic for updating or creating scores."""
-    sub_code = s["Subject Code"]
-    internal = int(s["INT"])
-    external = int(s["EXT"])
-    total = int(s["TOT"])
-    result_code = s["Result"]
-
-    grade = calculate_grade(total, result_code)
-
-    subject = subjects.get(sub_code)
-    if not subject:
-        raise ValueError(f"Subject with code {sub_code} not found for semester.")
-
-    score_key = (subject.sub_code, subject.semester)
-    if score_key in existing_scores:
-        score_obj = existing_scores[score_key]
-        score_obj.internal = internal
-        score_obj.external = external
-        score_obj.total = total
-        score_obj.grade = grade
-        marks_update.append(score_obj)
-    else:
-        marks_new.append(
+
+
+def build_scores(semester, student, scores, subjects):
+    """Unsaved Score rows of a student's scraped marks, `subjects` by sub_code."""
+    rows = []
+    for s in scores:
+        sub_code = s["Subject Code"]
+        subject = subjects.get(sub_code)
+        if not subject:
+            raise ValueError(f"Subject with code {sub_code} not found for semester.")
+
+        total = int(s["TOT"])
+        rows.append(
             Score(
                 student=student,
-                semester=subject.semester,
+                semester=semester,
                 subject=subject,
-                internal=internal,
-                external=external,
+                internal=int(s["INT"]),
+                external=int(s["EXT"]),
                 total=total,
-                grade=grade,
+                grade=calculate_grade(total, s["Result"]),
             )
         )
+    return rows
+
+
+def upsert_scores(scores):
+    """
+    Insert or overwrite scores on their (student, semester, subject) key.
+
+    One INSERT ... ON CONFLICT DO UPDATE per SCORE_UPSERT_CHUNK rows, nothing is
+    read first. Like any bulk write it fires no signals, the metrics are left to
+    the caller. The cached responses are invalidated once the rows committed,
+    a request in between would cache the old scores under the new versions.
+    """
+    with transaction.atomic(savepoint=False):
+        scores = Score.objects.bulk_create(
+            scores,
+            batch_size=settings.SCORE_UPSERT_CHUNK,
+            update_conflicts=True,
+            unique_fields=["student", "semester", "subject"],
+            update_fields=["internal", "external", "total", "grade"],
+        )
+        invalidate(
+            {
+                tag
+                for score in scores
+                for tag in score_tags(
+                    semester_id=score.semester_id, student_ids=[score.student_id]
+                )
+            }
+        )
+    return scores
 
 
-def process_scores(marks_new, marks_update):
-    """Bulk create or update scores."""
-    if marks_new:
-        Score.objects.bulk_create(marks_new)
-    if marks_update:
-        Score.objects.bulk_update(
-            marks_update, ["internal", "external", "total", "grade"]
-        )
+def checkpoint_scores(scores, items):
+    """Upsert a chunk of scraped scores, then checkpoint the chunk's job items."""
+    if scores:
+        upsert_scores(scores)
+    if items:
+        now = timezone.now()
+        for item in items:
+            item.updated_at = now
+        ScrapeJobItem.objects.bulk_update(items, ["state", "error", "updated_at"])
 
 
 def update_student_performance(student, semester):
@@ -118,8 +347,8 @@ def update_student_performance(student, semester):
     student_performance, _ = StudentPerformance.objects.get_or_create(
         student=student, semester=semester
     )
+    # the student's cgpa and backlogs follow through gradesync.metrics
     student_performance.calculate_all()
-    student.count_num_backlogs()
 
 
 def update_subject_metrics(subjects, semester, section):
@@ -139,37 +368,44 @@ def update_semester_metrics(semester, section):
     semester_metrics.calculate_metrics()
 
 
-def batch_add_scores(student, semester, scores, subjects, existing_scores):
-    """Main function to batch add scores."""
-    try:
-        marks_new = []
-        marks_update = []
-
-        # Process each score
-        for s in scores:
-            handle_score_update_or_create(
-                s, subjects, student, existing_scores, marks_new, marks_update
-            )
-
-        # Perform bulk database operations
-        process_scores(marks_new, marks_update)
-
-        # Update student performance
-        update_student_performance(student, semester)
+def scrape_student(usn, result_url, wait=True):
+    """
+    Scrape one student once the cooldown circuit breaker is closed, or raise
+    CooldownActive while it is open if `wait` is False.
+    """
+    breaker = get_circuit_breaker()
+    if wait:
+        breaker.wait()
+    else:
+        breaker.check()
+    score, code = scrape_student_once(usn, result_url)
+    breaker.record(code)
+    return score, code
 
-    except Exception as e:
-        raise Exception(
-            f"Failed to process scores for student {student.id}: {str(e)}"
-        ) from e
 
+def scrape_student_once(usn, result_url):
+    # a single student gains nothing from the event loop, "async" uses the http path
+    if settings.SCRAPER_BACKEND in ("http", "async"):
+        print(f"Scraping for usn: {usn}", flush=True)
+        return scrape_result_http(USN=usn, url=result_url)
 
-def scrape_student(usn, result_url):
+    pool = get_driver_pool()
+    try:
+        driver = pool.checkout(timeout=settings.DRIVER_CHECKOUT_TIMEOUT)
+    except DriverPoolTimeout:
+        # every browser is busy, retry the student later like an unreachable site
+        print(f"No free browser for usn: {usn}", flush=True)
+        return None, NETWORK_ERROR
+    healthy = False
     try:
-        driver = initialise_driver()
         print(f"Scraping for usn: {usn}", flush=True)
-        return scrape_result(USN=usn, url=result_url, driver=driver)
-    except Exception as e:
-        raise e
+        score, code = scrape_result(USN=usn, url=result_url, driver=driver)
+        # a cooldown is tied to the browser session and a network error may have
+        # left the browser broken, so don't hand the driver out again
+        healthy = code not in (COOLDOWN, NETWORK_ERROR)
+        return score, code
+    finally:
+        pool.checkin(driver, healthy=healthy)
 
 
 def check_error(code):
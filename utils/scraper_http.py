@@ -0,0 +1,152 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from utils.captcha_solvers import CaptchaSolveError, get_captcha_solver
+from utils.scraper import ALERTS, alert_code, construct_dump_student_data
+from utils.trueCaptcha import TrueCaptchaConfigError
+
+ALERT_RE = re.compile(r"alert\(\s*['\"](.*?)['\"]\s*\)", re.DOTALL)
+
+
+def parse_form(html, url):
+    """
+    Extracts the result form from the VTU index page.
+
+    Returns:
+        tuple: (absolute form action url, hidden form fields, absolute captcha image url)
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    form = soup.find("form")
+    if form is None:
+        raise ValueError("Result form not found on the page.")
+
+    action = urljoin(url, form.get("action") or url)
+    hidden = {
+        field["name"]: field.get("value", "")
+        for field in form.find_all("input", type="hidden")
+        if field.get("name")
+    }
+
+    captcha = soup.select_one("#raj div:nth-of-type(2) div:nth-of-type(2) img")
+    if captcha is None:
+        captcha = soup.select_one("#raj img")
+    if captcha is None or not captcha.get("src"):
+        raise ValueError("Captcha image not found on the page.")
+
+    return action, hidden, urljoin(url, captcha["src"])
+
+
+def parse_alert(html) -> Optional[str]:
+    """Returns the text of a known VTU javascript alert in the response, if any."""
+    for text in ALERT_RE.findall(html):
+        text = text.strip()
+        if text in ALERTS:
+            return text
+    return None
+
+
+def parse_student_details(html):
+    """
+    Parses the result page into the same structure `extract_student_details` returns.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    details = [td.get_text(strip=True) for td in soup.select("table tr td")]
+    # details table rows -> "University Seat Number", ":", usn, "Student Name", ":", name
+    values = [value.lstrip(":").strip() for value in details[1::2]]
+    usn_text = values[0] if values else ""
+    stud_text = values[1] if len(values) > 1 else ""
+
+    rows = soup.select("div.divTableBody > div.divTableRow")
+    if not rows:
+        raise ValueError("Results table not found on the page.")
+
+    marks_list = []
+    # first row is the table header
+    for row in rows[1:]:
+        cells = [cell.get_text(strip=True) for cell in row.select("div.divTableCell")]
+        if len(cells) < 6:
+            continue
+        marks_list.append(
+            {
+                "Subject Code": cells[0],
+                "Subject Name": cells[1],
+                "INT": cells[2],
+                "EXT": cells[3],
+                "TOT": cells[4],
+                "Result": cells[5],
+            }
+        )
+    marks_list.sort(key=lambda x: x["Subject Code"])
+
+    print("Student Name:" + stud_text + " | USN: " + usn_text.upper())
+    return construct_dump_student_data(usn_text, stud_text, marks_list)
+
+
+def fetch_captcha(session, captcha_url) -> str:
+    response = session.get(captcha_url, timeout=10)
+    response.raise_for_status()
+    return get_captcha_solver().solve(response.content)
+
+
+def scrape_result_http(USN: str, url: str, session=None) -> Tuple[Optional[dict], int]:
+    """
+    Scrapes a student's result without a browser.
+
+    Fetches the index page with a `requests` session, solves the captcha from the
+    image bytes, posts the form and parses the result HTML. Returns the same
+    `(marks, status code)` tuple as `utils.scraper.scrape_result`.
+    """
+    owns_session = session is None
+    session = session or requests.Session()
+    session.verify = False
+
+    try:
+        retries = 0
+        while retries < settings.SCRAPE_CAPTCHA_RETRIES:
+            page = session.get(url, timeout=10)
+            page.raise_for_status()
+            action, fields, captcha_url = parse_form(page.text, url)
+
+            try:
+                captcha = fetch_captcha(session, captcha_url)
+            except CaptchaSolveError:
+                captcha = fetch_captcha(session, captcha_url)
+
+            fields.update({"lns": USN, "captchacode": captcha})
+            response = session.post(action, data=fields, timeout=10)
+            response.raise_for_status()
+
+            alert_text = parse_alert(response.text)
+            if alert_text is None:
+                get_captcha_solver().report(captcha, correct=True)
+                return parse_student_details(response.text), 0
+
+            code = alert_code(alert_text, USN)
+            if code == 2:
+                get_captcha_solver().report(captcha, correct=False)
+            if code in (1, 3):
+                return None, code
+            retries += 1
+        return None, 2
+    except requests.exceptions.RequestException as e:
+        print(e, flush=True)
+        return None, 5
+    except TrueCaptchaConfigError as e:
+        print(e, flush=True)
+        raise e
+    except CaptchaSolveError as e:
+        # the retry with a fresh captcha couldn't be solved either
+        print(e, flush=True)
+        return None, 2
+    except Exception as e:
+        print(e, flush=True)
+        return None, 4
+    finally:
+        if owns_session:
+            session.close()
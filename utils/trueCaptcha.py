@@ -20,27 +20,38 @@ class TrueCaptchaConfigError(Exception):
         super().__init__(self.message)
 
 
-def solve_captcha(imagePath):
+def _captcha_payload(image_bytes):
     if not TRUE_CAPTCHA_API_KEY or not TRUE_CAPTCHA_USER_ID:
         raise TrueCaptchaConfigError()
 
+    return {
+        "userid": TRUE_CAPTCHA_USER_ID,
+        "apikey": TRUE_CAPTCHA_API_KEY,
+        "data": base64.b64encode(image_bytes).decode("ascii"),
+        "mode": "auto",
+        "len_str": "6",
+    }
+
+
+def solve_captcha(image_bytes):
+    """Solves a captcha from the raw PNG bytes of the captcha image."""
+    data = _captcha_payload(image_bytes)
+
     try:
-        with open(imagePath, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode("ascii")
-            url = TRUE_CAPTCHA_URL
-
-            data = {
-                "userid": TRUE_CAPTCHA_USER_ID,
-                "apikey": TRUE_CAPTCHA_API_KEY,
-                "data": encoded_string,
-                "mode": "auto",
-                "len_str": "6",
-            }
-            response = requests.post(url=url, json=data, timeout=5)
-            response.raise_for_status()
-            return response.json()["result"]
+        response = requests.post(url=TRUE_CAPTCHA_URL, json=data, timeout=5)
+        response.raise_for_status()
+        return response.json()["result"]
     except Exception as e:
         raise Exception(f"Error in solving captcha: {str(e)}")
 
 
-print(solve_captcha("utils/captcha.png"))
+async def solve_captcha_async(image_bytes, client):
+    """Same as `solve_captcha` but non-blocking, `client` is an httpx.AsyncClient."""
+    data = _captcha_payload(image_bytes)
+
+    try:
+        response = await client.post(TRUE_CAPTCHA_URL, json=data, timeout=5)
+        response.raise_for_status()
+        return response.json()["result"]
+    except Exception as e:
+        raise Exception(f"Error in solving captcha: {str(e)}")